@@ -0,0 +1,134 @@
+"""
+Container mode benchmark: submissions per second from one process
+Sends N POST /forms submissions through lambda_handler one at a time (what a
+single Lambda container does) and through the ASGI app with C requests in
+flight, against local_aws stand-ins with a simulated DynamoDB round trip.
+The app is driven in-process, so socket and HTTP parsing costs are left out.
+
+Usage: python benchmarks/bench_asgi.py [--items N] [--concurrency C] [--latency-ms MS] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, '..', 'lambda')
+sys.path[:0] = [LAMBDA_DIR, BENCH_DIR]
+os.environ.setdefault('ENVIRONMENT', 'dev')
+os.environ.setdefault('FORM_SUBMISSIONS_TABLE', 'form_submissions')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import handler  # noqa: E402
+import local_aws  # noqa: E402
+from asgi import FormsApp, InvocationContext, build_event  # noqa: E402
+
+
+def body(index: int) -> bytes:
+    return json.dumps({
+        'client': 'noclient',
+        'type': 'contacts',
+        'data': {
+            'firstName': 'John',
+            'lastName': 'Doe',
+            'email': f"user{index}@example.com",
+            'message': f"Submission number {index}, please get back to me."
+        }
+    }).encode('utf-8')
+
+
+def scope(index: int) -> dict:
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'POST',
+        'path': '/forms',
+        'query_string': b'',
+        'headers': [(b'content-type', b'application/json'), (b'user-agent', b'bench')],
+        'client': (f"10.0.{index // 250 % 250}.{index % 250}", 40000)
+    }
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def summary(latencies: list, elapsed: float) -> dict:
+    return {
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5),
+        'p99_ms': percentile(latencies, 0.99)
+    }
+
+
+def run_lambda(items: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for index in range(items):
+        request_started = time.perf_counter()
+        event = build_event(scope(index), body(index))
+        result = handler.lambda_handler(event, InvocationContext(str(index), 29))
+        assert result['statusCode'] == 201, result['body']
+        latencies.append((time.perf_counter() - request_started) * 1000)
+    return summary(latencies, time.perf_counter() - started)
+
+
+async def run_asgi(items: int, concurrency: int) -> dict:
+    app = FormsApp(handler.lambda_handler, handler.warm_up, max_workers=concurrency)
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def request(index: int):
+        messages = [{'type': 'http.request', 'body': body(index), 'more_body': False}]
+        statuses = []
+
+        async def receive():
+            return messages.pop()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        async with slots:
+            request_started = time.perf_counter()
+            await app(scope(index), receive, send)
+            latencies.append((time.perf_counter() - request_started) * 1000)
+        assert statuses == [201], statuses
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(index) for index in range(items)))
+    elapsed = time.perf_counter() - started
+    app.executor.shutdown()
+    return summary(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=48)
+    parser.add_argument('--latency-ms', type=float, default=8.0, help='simulated DynamoDB round trip')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    local_aws.install(handler, latency_ms=args.latency_ms)
+    handler.warm_up()
+
+    results = {
+        'lambda': run_lambda(args.items),
+        'asgi': asyncio.run(run_asgi(args.items, args.concurrency))
+    }
+    print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<8}{result['requests_per_second']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'items': args.items, 'concurrency': args.concurrency, 'latency_ms': args.latency_ms,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Batch endpoint benchmark: per-submission cost of POST /forms vs POST /forms/batch
+Sends the same N submissions one request at a time and as one batch through
+lambda_handler, against local_aws stand-ins with a simulated DynamoDB round
+trip. Reports handler time and DynamoDB requests per submission; the API
+Gateway and Lambda invocation saved per batched submission come on top.
+
+Usage: python benchmarks/bench_batch.py [--items N] [--latency-ms MS] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, '..', 'lambda')
+sys.path[:0] = [LAMBDA_DIR, BENCH_DIR]
+os.environ.setdefault('ENVIRONMENT', 'dev')
+os.environ.setdefault('FORM_SUBMISSIONS_TABLE', 'form_submissions')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import handler  # noqa: E402
+import local_aws  # noqa: E402
+from read_api import hash_api_key  # noqa: E402
+
+API_KEY = 'bench-batch-key'
+
+
+def submission(index: int) -> dict:
+    return {
+        'type': 'contacts',
+        'data': {
+            'firstName': 'John',
+            'lastName': 'Doe',
+            'email': f"user{index}@example.com",
+            'message': f"Offline submission number {index}, please get back to me."
+        }
+    }
+
+
+def event(path: str, body: dict, headers: dict = None) -> dict:
+    return {
+        'requestContext': {'http': {'method': 'POST', 'path': path, 'sourceIp': '127.0.0.1', 'userAgent': 'bench'}},
+        'headers': headers or {},
+        'body': json.dumps(body)
+    }
+
+
+def run(mode: str, items: int, latency_ms: float) -> dict:
+    clients = dict(local_aws.DEFAULT_CLIENTS)
+    clients['noclient'] = dict(clients['noclient'], batchApiKeySha256=hash_api_key(API_KEY))
+    stand_ins = local_aws.install(handler, clients, latency_ms=latency_ms)
+    handler.batch_writer = None
+    handler.get_client_config('noclient')
+
+    started = time.perf_counter()
+    if mode == 'single':
+        for index in range(items):
+            body = dict(submission(index), client='noclient')
+            assert handler.lambda_handler(event('/forms', body), None)['statusCode'] == 201
+    else:
+        body = {'client': 'noclient', 'submissions': [submission(index) for index in range(items)]}
+        result = handler.lambda_handler(event('/forms/batch', body, {'authorization': f"Bearer {API_KEY}"}), None)
+        assert result['statusCode'] == 201, result['body']
+    elapsed = time.perf_counter() - started
+
+    requests = sum(stand_ins['table'].calls.values())
+    return {
+        'invocations': items if mode == 'single' else 1,
+        'dynamodb_requests': requests,
+        'ms_per_submission': elapsed * 1000 / items,
+        'dynamodb_requests_per_submission': requests / items
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=8.0, help='simulated DynamoDB round trip')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args.items, args.latency_ms) for mode in ('single', 'batch')}
+    print(f"{'mode':<8}{'invocations':>13}{'ddb requests':>14}{'ms/submission':>15}{'ddb req/submission':>20}")
+    for mode, result in results.items():
+        print(f"{mode:<8}{result['invocations']:>13}{result['dynamodb_requests']:>14}"
+              f"{result['ms_per_submission']:>15.3f}{result['dynamodb_requests_per_submission']:>20.3f}")
+    print(f"speedup: {results['single']['ms_per_submission'] / results['batch']['ms_per_submission']:.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'items': args.items, 'latency_ms': args.latency_ms, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
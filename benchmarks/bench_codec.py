@@ -0,0 +1,132 @@
+"""
+JSON codec benchmark: parse and serialize cost across accepted payload sizes
+Times stdlib json against codec.loads/dumps (orjson when installed) on
+submission-shaped bodies from 1 KB up to security.max_payload_size (POST
+/forms) and batch.max_payload_size (POST /forms/batch), then the response
+envelopes: a fixed error body and GET /forms/info built per call versus
+served from the precomputed copies.
+
+Usage: python benchmarks/bench_codec.py [--repeat N] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, '..', 'lambda')
+sys.path[:0] = [LAMBDA_DIR, BENCH_DIR]
+os.environ.setdefault('ENVIRONMENT', 'dev')
+os.environ.setdefault('FORM_SUBMISSIONS_TABLE', 'form_submissions')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import codec  # noqa: E402
+import handler  # noqa: E402
+import local_aws  # noqa: E402
+from metrics import metrics  # noqa: E402
+
+
+def submission(index: int, message_bytes: int) -> dict:
+    message = 'Hello, I would like to know more about your services. ' * (message_bytes // 50 + 1)
+    return {
+        'client': 'noclient',
+        'type': 'contacts',
+        'data': {'firstName': 'Jürgen', 'lastName': 'Doe', 'email': f"user{index}@example.com",
+                 'phone': '+44 20 7946 0958', 'subscribe': True, 'rating': 4.5,
+                 'message': message[:message_bytes]}
+    }
+
+
+def payload(size: int):
+    """A body of about size bytes: one submission up to 16 KB, a batch above that"""
+    if size <= 16384:
+        return submission(0, max(size - 200, 16))
+    return {'submissions': [submission(index, 3000) for index in range(size // 3200)]}
+
+
+def best(function, repeat: int) -> float:
+    """Microseconds per call (best of repeat runs)"""
+    number = max(1, int(0.05 / max(timeit.timeit(function, number=1), 1e-7)))
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def codec_costs(sizes, repeat: int) -> dict:
+    results = {}
+    for size in sizes:
+        value = payload(size)
+        text = json.dumps(value)
+        results[str(size)] = {
+            'bytes': len(text.encode('utf-8')),
+            'parse_us': {'stdlib': best(lambda: json.loads(text), repeat),
+                         'codec': best(lambda: codec.loads(text), repeat)},
+            'serialize_us': {'stdlib': best(lambda: json.dumps(value), repeat),
+                             'codec': best(lambda: codec.dumps(value), repeat)}
+        }
+    return results
+
+
+def built_response(status_code: int, body: dict) -> dict:
+    """response() as it was: header dict and body built on every call"""
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'X-API-Version': handler.CONFIG['api_version']
+        },
+        'body': json.dumps(body)
+    }
+
+
+def built_info() -> dict:
+    config = handler.CONFIG
+    info = {'name': config['name'], 'version': config['version'], 'api_version': config['api_version'],
+            'supported_versions': config['supported_versions'], 'buildTime': config['buildTime']}
+    client_names = handler.load_remote_config().client_names()
+    if client_names is not None:
+        info['allowed_clients'] = list(client_names)
+    return built_response(200, info)
+
+
+def envelope_costs(repeat: int) -> dict:
+    return {
+        'not_found_us': {'built': best(lambda: built_response(404, {'error': 'Endpoint not found'}), repeat),
+                         'precomputed': best(handler.NOT_FOUND.respond, repeat)},
+        'info_us': {'built': best(built_info, repeat), 'precomputed': best(handler.get_info, repeat)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    local_aws.install(handler)
+    metrics.write = lambda line: None
+
+    sizes = sorted({1024, handler.CONFIG['security']['max_payload_size'], 65536,
+                    handler.CONFIG['batch']['max_payload_size']})
+    results = {
+        'orjson': codec.ORJSON_AVAILABLE,
+        'payloads': codec_costs(sizes, args.repeat),
+        'envelopes': envelope_costs(args.repeat)
+    }
+
+    print(f"codec backend: {'orjson' if codec.ORJSON_AVAILABLE else 'stdlib json'}")
+    print(f"{'bytes':>9} {'parse stdlib':>13} {'parse codec':>12} {'dumps stdlib':>13} {'dumps codec':>12}")
+    for row in results['payloads'].values():
+        parse, serialize = row['parse_us'], row['serialize_us']
+        print(f"{row['bytes']:>9} {parse['stdlib']:>11.1f}us {parse['codec']:>10.1f}us "
+              f"{serialize['stdlib']:>11.1f}us {serialize['codec']:>10.1f}us")
+    for name, row in results['envelopes'].items():
+        print(f"{name[:-3]}: {row['built']:.2f} us built, {row['precomputed']:.2f} us precomputed")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Startup benchmark: import time plus time to first response, per endpoint
+Each sample runs in a fresh interpreter, the way a Lambda cold start does.
+AWS clients are replaced by the in-memory stand-ins in local_aws.py, so the
+numbers cover this code's startup work, not network latency.
+
+Usage: python benchmarks/bench_cold_start.py [--runs N] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, '..', 'lambda')
+
+ENDPOINTS = {
+    'GET /forms/health': ('GET', '/forms/health', None),
+    'GET /forms/info': ('GET', '/forms/info', None),
+    'POST /forms': ('POST', '/forms', {
+        'client': 'noclient',
+        'type': 'contacts',
+        'data': {
+            'firstName': 'John',
+            'lastName': 'Doe',
+            'email': 'john@example.com',
+            'message': 'This is a cold start benchmark message'
+        }
+    })
+}
+
+# Runs inside the child interpreter; prints one JSON line of timings in milliseconds
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path[:0] = [{lambda_dir!r}, {bench_dir!r}]
+import handler
+imported = time.perf_counter()
+import local_aws
+local_aws.install(handler)
+method, path, body = json.loads({endpoint!r})
+event = {{
+    'requestContext': {{'http': {{'method': method, 'path': path, 'sourceIp': '127.0.0.1', 'userAgent': 'bench'}}}},
+    'headers': {{}},
+    'body': json.dumps(body) if body is not None else None
+}}
+installed = time.perf_counter()
+result = handler.lambda_handler(event, None)
+finished = time.perf_counter()
+print(json.dumps({{
+    'status': result['statusCode'],
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (finished - installed) * 1000,
+    'boto3_imported': 'boto3' in sys.modules
+}}))
+'''
+
+
+def sample(endpoint) -> dict:
+    code = CHILD.format(lambda_dir=LAMBDA_DIR, bench_dir=BENCH_DIR, endpoint=json.dumps(endpoint))
+    env = dict(os.environ, ENVIRONMENT=os.environ.get('ENVIRONMENT', 'dev'))
+    env.setdefault('FORM_SUBMISSIONS_TABLE', 'form_submissions')
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'endpoint':<20}{'status':>8}{'import ms':>12}{'first resp ms':>16}{'total ms':>11}  boto3")
+    for name, endpoint in ENDPOINTS.items():
+        samples = [sample(endpoint) for _ in range(args.runs)]
+        import_ms = statistics.median(s['import_ms'] for s in samples)
+        first_ms = statistics.median(s['first_response_ms'] for s in samples)
+        results[name] = {
+            'status': samples[0]['status'],
+            'import_ms_median': round(import_ms, 3),
+            'first_response_ms_median': round(first_ms, 3),
+            'boto3_imported': samples[0]['boto3_imported'],
+            'runs': args.runs
+        }
+        print(f"{name:<20}{samples[0]['status']:>8}{import_ms:>12.2f}{first_ms:>16.2f}"
+              f"{import_ms + first_ms:>11.2f}  {'yes' if samples[0]['boto3_imported'] else 'no'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
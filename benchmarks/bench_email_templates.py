@@ -0,0 +1,123 @@
+"""
+Benchmark: notification email render throughput
+Compares the per-call f-string rendering that send_notification_email used
+to do with EmailRenderer's compiled templates, on survey submissions with
+large responses objects
+
+Usage: python benchmarks/bench_email_templates.py [--iterations N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+from email_templates import EmailRenderer  # noqa: E402
+
+
+def render_fstrings(templates: dict, client: str, client_config: dict, submission_id: str,
+                    form_type: str, form_data: dict, timestamp: str):
+    """Baseline: the rendering send_notification_email did on every call before compiled templates"""
+    template = templates.get(form_type, templates['contacts'])
+    subject = template['subject'].replace('{{client_name}}', client_config.get('name', client))
+    form_data_text = "\n".join([f"{key}: {value}" for key, value in form_data.items()])
+    form_data_rows = "".join([
+        f"<tr><td style='padding:8px;border:1px solid #ddd;'>{key}</td>"
+        f"<td style='padding:8px;border:1px solid #ddd;'>{value}</td></tr>"
+        for key, value in form_data.items()
+    ])
+    client_name = client_config.get('name', client)
+    body_text = f"""
+New form submission received!
+
+Client: {client_name}
+Submission ID: {submission_id}
+Form Type: {form_type}
+Timestamp: {timestamp}
+
+Form Data:
+{form_data_text}
+
+---
+This is an automated notification from GadgetCloud Forms.
+"""
+    body_html = f"""
+<html>
+<head></head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+  <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">
+      New Form Submission Received
+    </h2>
+
+    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+      <p><strong>Client:</strong> {client_name}</p>
+      <p><strong>Submission ID:</strong> {submission_id}</p>
+      <p><strong>Form Type:</strong> {form_type}</p>
+      <p><strong>Timestamp:</strong> {timestamp}</p>
+    </div>
+
+    <h3 style="color: #2c3e50;">Form Data:</h3>
+    <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
+      <thead>
+        <tr style="background-color: #3498db; color: white;">
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Field</th>
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Value</th>
+        </tr>
+      </thead>
+      <tbody>
+        {form_data_rows}
+      </tbody>
+    </table>
+
+    <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
+    <p style="color: #7f8c8d; font-size: 12px;">
+      This is an automated notification from GadgetCloud Forms.
+    </p>
+  </div>
+</body>
+</html>
+"""
+    return subject, body_text, body_html
+
+
+def survey_payload(questions: int) -> dict:
+    return {
+        'email': 'survey@example.com',
+        'responses': {f'question{i}': f'Answer {i}: very satisfied' for i in range(questions)},
+        **{f'comment{i}': 'Additional free-text feedback from the survey' for i in range(questions // 10)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(os.path.join(LAMBDA_DIR, 'config.json'), 'r') as f:
+        templates = json.load(f)['email_templates']
+    client_config = {'name': 'FixMyCar', 'notification_email': 'fixmycar@example.com'}
+    renderer = EmailRenderer(templates)
+
+    def render_compiled(form_data):
+        compiled = renderer.compiled('fixmycar', 'survey', client_config, 1)
+        return renderer.render_notification(compiled, 'sub-123', '2025-12-01T10:00:00', form_data)
+
+    print(f"{'questions':>10}{'fields':>8}{'before/s':>12}{'after/s':>12}{'speedup':>10}")
+    for questions in (10, 100, 500):
+        form_data = survey_payload(questions)
+        before = timeit.timeit(
+            lambda: render_fstrings(templates, 'fixmycar', client_config, 'sub-123', 'survey',
+                                    form_data, '2025-12-01T10:00:00'),
+            number=args.iterations
+        )
+        after = timeit.timeit(lambda: render_compiled(form_data), number=args.iterations)
+        print(f"{questions:>10}{len(form_data):>8}{args.iterations / before:>12.0f}"
+              f"{args.iterations / after:>12.0f}{before / after:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Bulk export benchmark: throughput and peak RSS on a million-item table
+Compares the old approach (single-threaded scan that collects every item
+before encoding) with the streaming export over parallel scan segments
+and ClientIndex time slices. The table is SyntheticSubmissions from
+local_aws.py with a simulated per-call latency; each mode runs in a fresh
+interpreter so its peak RSS is its own.
+
+Usage: python benchmarks/bench_export.py [--items N] [--latency-ms MS] [--segments N] [--json results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, '..', 'lambda')
+
+MODES = ('baseline-scan', 'stream-scan-ndjson', 'stream-scan-csv', 'stream-client-ndjson')
+
+# Runs inside the child interpreter; prints one JSON line
+CHILD = '''
+import json, os, resource, sys, time
+sys.path[:0] = [{lambda_dir!r}, {bench_dir!r}]
+from local_aws import SyntheticSubmissions
+from export import encode_default, export_submissions
+
+mode, items, latency_ms, segments = {mode!r}, {items}, {latency_ms}, {segments}
+table = SyntheticSubmissions(items, latency_ms=latency_ms)
+out = open(os.devnull, 'w')
+started = time.perf_counter()
+rows = 0
+
+if mode == 'baseline-scan':
+    # Previous approach: one Scan loop that materialises the whole result
+    collected = []
+    kwargs = {{'Limit': 1000}}
+    while True:
+        result = table.scan(**kwargs)
+        collected.extend(result['Items'])
+        if 'LastEvaluatedKey' not in result:
+            break
+        kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+    out.write(json.dumps(collected, default=encode_default))
+    rows = len(collected)
+else:
+    output_format = 'csv' if mode.endswith('csv') else 'ndjson'
+    client = 'fixmycar' if '-client-' in mode else None
+    end = table.base_timestamp + items
+    for chunk in export_submissions(table, client=client, output_format=output_format, end=end,
+                                    segments=segments, page_size=1000):
+        rows += chunk.count('\\n')
+        out.write(chunk)
+    if output_format == 'csv':
+        rows -= 1
+
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'rows': rows,
+    'seconds': elapsed,
+    'rows_per_second': rows / elapsed,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'calls': table.calls
+}}))
+'''
+
+
+def run_mode(mode: str, items: int, latency_ms: float, segments: int) -> dict:
+    code = CHILD.format(lambda_dir=LAMBDA_DIR, bench_dir=BENCH_DIR, mode=mode, items=items,
+                        latency_ms=latency_ms, segments=segments)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--items', type=int, default=1000000)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='simulated latency per Scan/Query page')
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'mode':<24}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>14}")
+    for mode in args.modes.split(','):
+        result = run_mode(mode, args.items, args.latency_ms, args.segments)
+        results[mode] = result
+        print(f"{mode:<24}{result['rows']:>10}{result['seconds']:>10.2f}"
+              f"{result['rows_per_second']:>12.0f}{result['peak_rss_mb']:>14.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'items': args.items, 'latency_ms': args.latency_ms, 'segments': args.segments,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+"""
+Load and latency benchmark: lambda_handler under a realistic POST /forms mix
+Builds request bodies from the Bruno collection (bruno/forms-api): the
+Submit Form requests are the valid entries, the Validation Tests requests
+the invalid ones, and honeypot and oversized variants are derived from the
+valid bodies. Requests are drawn from the mix with a fixed seed and sent one
+at a time (one Lambda container) against local_aws stand-ins with per-service
+latency, with rate limiting, idempotency, stats and a client webhook wired to
+local tables so their calls are measured too.
+
+Reports per request kind and overall:
+- throughput (requests/s)
+- p50/p95/p99 latency of the whole request and of each stage:
+  time inside each stand-in (dynamodb, ses, ssm, webhook) and the rest (app)
+- allocations: tracemalloc peak and retained bytes per request (a separate pass)
+With the outbox enabled (the default) side effects are delivered afterwards
+by the outbox worker and reported as 'outbox'; --inline-effects runs them in
+the request. --json saves the results (with the git commit) and --compare
+prints the change against a saved run.
+
+Usage: python benchmarks/bench_load.py [--requests N] [--mix valid=80,invalid=10,honeypot=5,oversized=5]
+                                       [--latency-ms MS] [--ses-latency-ms MS] [--webhook-latency-ms MS]
+                                       [--inline-effects | --outbox-items N] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import copy
+import glob
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, '..', 'lambda')
+BRUNO_DIR = os.path.join(BENCH_DIR, '..', 'bruno', 'forms-api')
+sys.path[:0] = [LAMBDA_DIR, BENCH_DIR]
+os.environ.setdefault('ENVIRONMENT', 'dev')
+os.environ.setdefault('FORM_SUBMISSIONS_TABLE', 'form_submissions')
+os.environ.setdefault('LOG_LEVEL', 'INFO')
+
+import handler  # noqa: E402
+import local_aws  # noqa: E402
+from logger import log  # noqa: E402
+
+CLIENT = 'noclient'
+STAGES = ('dynamodb', 'ses', 'ssm', 'webhook', 'app')
+EXPECTED_STATUS = {'valid': 201, 'invalid': 400, 'honeypot': 201, 'oversized': 413}
+BODY_BLOCK = re.compile(r'^body:json \{\n(.*?)\n\}$', re.MULTILINE | re.DOTALL)
+
+
+def bruno_bodies(folder: str) -> list:
+    """JSON bodies of the POST requests in a Bruno collection folder, {{client}} filled in"""
+    bodies = []
+    for path in sorted(glob.glob(os.path.join(BRUNO_DIR, folder, '*.bru'))):
+        with open(path, 'r') as f:
+            match = BODY_BLOCK.search(f.read())
+        if match:
+            bodies.append(json.loads(match.group(1).replace('{{client}}', CLIENT)))
+    return bodies
+
+
+def request_kinds() -> dict:
+    """Request kind -> list of body templates"""
+    valid = bruno_bodies('Submit Form')
+    honeypot_field = handler.CONFIG['security']['honeypot_field']
+    padding = 'x' * handler.CONFIG['security']['max_payload_size']
+    honeypot = [dict(body, formData=dict(body['formData'], **{honeypot_field: 'http://spam.example'}))
+                for body in valid]
+    oversized = [dict(body, formData=dict(body['formData'], notes=padding)) for body in valid]
+    return {'valid': valid, 'invalid': bruno_bodies('Validation Tests'), 'honeypot': honeypot, 'oversized': oversized}
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in EXPECTED_STATUS:
+            raise SystemExit(f"Unknown request kind in --mix: {kind}")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def build_requests(count: int, mix: dict, seed: int) -> list:
+    """(kind, event) pairs; each request gets its own email and source IP so none is a replay"""
+    kinds = request_kinds()
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    requests = []
+    for index in range(count):
+        kind = rng.choices(names, weights)[0]
+        body = copy.deepcopy(rng.choice(kinds[kind]))
+        email = body['formData'].get('email', '')
+        if '@' in email:
+            local, _, domain = email.partition('@')
+            body['formData']['email'] = f"{local}+{index}@{domain}"
+        event = {
+            'requestContext': {
+                'http': {
+                    'method': 'POST',
+                    'path': '/forms',
+                    'sourceIp': f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+                    'userAgent': 'bench-load'
+                }
+            },
+            'headers': {'content-type': 'application/json', 'user-agent': 'bench-load'},
+            'body': json.dumps(body)
+        }
+        requests.append((kind, event))
+    return requests
+
+
+def setup(args) -> dict:
+    """Point handler at the stand-ins, with every optional table the request path can use"""
+    handler.CONFIG['outbox']['enabled'] = not args.inline_effects
+    handler.CONFIG['rate_limiting'].update(enabled=True, max_requests_per_ip=10 ** 6, max_requests_per_client=10 ** 9)
+    handler.RATE_LIMIT_TABLE = 'rate_limits'
+    handler.IDEMPOTENCY_TABLE = 'form_idempotency'
+    handler.STATS_TABLE = 'form_stats'
+
+    clients = dict(local_aws.DEFAULT_CLIENTS)
+    clients[CLIENT] = dict(clients[CLIENT], webhookUrl='https://hooks.example.com/forms')
+    stand_ins = local_aws.install(
+        handler, clients,
+        latency_ms=args.latency_ms,
+        ses_latency_ms=args.ses_latency_ms,
+        ssm_latency_ms=args.latency_ms,
+        webhook_latency_ms=args.webhook_latency_ms
+    )
+    handler.warm_up()
+
+    # Log lines are formatted as usual but not written, so the terminal stays quiet
+    log.write = lambda line: None
+    return stand_ins
+
+
+def percentiles(values: list) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    pick = lambda fraction: round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 3)  # noqa: E731
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+
+def timed_call(function, *args) -> tuple:
+    """Run function with stand-in time tracked; returns (result, seconds, {stage: seconds})"""
+    stages = local_aws.track_stages()
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - started
+    stages['app'] = max(elapsed - sum(stages.values()), 0.0)
+    return result, elapsed, stages
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """samples: (seconds, stages) per request"""
+    return {
+        'count': len(samples),
+        'requests_per_second': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': percentiles([seconds for seconds, _ in samples]),
+        'stages_ms': {stage: percentiles([stages.get(stage, 0.0) for _, stages in samples]) for stage in STAGES}
+    }
+
+
+def run_requests(requests: list) -> dict:
+    samples = {}
+    started = time.perf_counter()
+    for kind, event in requests:
+        result, seconds, stages = timed_call(handler.lambda_handler, event, None)
+        assert result['statusCode'] == EXPECTED_STATUS[kind], (kind, result['statusCode'], result['body'])
+        samples.setdefault(kind, []).append((seconds, stages))
+    elapsed = time.perf_counter() - started
+
+    results = {kind: summarize(kind_samples, sum(seconds for seconds, _ in kind_samples))
+               for kind, kind_samples in samples.items()}
+    results['all'] = summarize([sample for kind_samples in samples.values() for sample in kind_samples], elapsed)
+    return results
+
+
+def run_outbox(table, limit: int) -> dict:
+    """Drain up to limit pending submissions through the outbox worker, one at a time"""
+    worker = handler.get_outbox_worker()
+    pending = [dict(item) for item in table.items.values() if item.get('outboxState')][:limit]
+    samples = []
+    started = time.perf_counter()
+    for item in pending:
+        summary, seconds, stages = timed_call(worker.drain, [item])
+        assert summary['processed'] == 1, summary
+        samples.append((seconds, stages))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def run_allocations(requests: list) -> dict:
+    """tracemalloc peak above the starting point, and bytes still held afterwards, per request"""
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for _, event in requests:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            handler.lambda_handler(event, None)
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+    return {
+        'requests': len(requests),
+        'peak_kib_p50': round(peaks[len(peaks) // 2] / 1024, 1),
+        'peak_kib_p95': round(peaks[min(int(len(peaks) * 0.95), len(peaks) - 1)] / 1024, 1),
+        'retained_bytes_mean': round(sum(retained) / len(retained), 1)
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_results(results: dict):
+    print(f"{'kind':<11}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}   "
+          + ''.join(f"{stage + ' p95':>14}" for stage in STAGES))
+    for kind, result in results.items():
+        latency = result['latency_ms']
+        print(f"{kind:<11}{result['count']:>7}{result['requests_per_second']:>9.1f}{latency['p50']:>9.3f}"
+              f"{latency['p95']:>9.3f}{latency['p99']:>9.3f}   "
+              + ''.join(f"{result['stages_ms'][stage]['p95']:>14.3f}" for stage in STAGES))
+
+
+def print_comparison(results: dict, baseline: dict):
+    print(f"\nvs {baseline['meta'].get('commit', '?')}:")
+    for kind, result in results.items():
+        before = baseline['results'].get(kind)
+        if not before:
+            continue
+        changes = [f"req/s {before['requests_per_second']:.1f} -> {result['requests_per_second']:.1f}"]
+        for mark in ('p50', 'p95', 'p99'):
+            old, new = before['latency_ms'][mark], result['latency_ms'][mark]
+            change = (new - old) / old * 100 if old else 0.0
+            changes.append(f"{mark} {old:.3f} -> {new:.3f} ms ({change:+.1f}%)")
+        print(f"  {kind:<11}" + ', '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--alloc-requests', type=int, default=200, help='requests in the tracemalloc pass')
+    parser.add_argument('--mix', default='valid=80,invalid=10,honeypot=5,oversized=5')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated DynamoDB/SSM round trip')
+    parser.add_argument('--ses-latency-ms', type=float, default=30.0)
+    parser.add_argument('--webhook-latency-ms', type=float, default=50.0)
+    parser.add_argument('--outbox-items', type=int, default=200, help='pending submissions drained by the outbox worker')
+    parser.add_argument('--inline-effects', action='store_true', help='run side effects in the request (outbox off)')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='results file from an earlier run to compare against')
+    args = parser.parse_args()
+
+    stand_ins = setup(args)
+    mix = parse_mix(args.mix)
+    requests = build_requests(args.warmup + args.requests + args.alloc_requests, mix, args.seed)
+    warmup, measured, allocation = (requests[:args.warmup], requests[args.warmup:args.warmup + args.requests],
+                                    requests[args.warmup + args.requests:])
+
+    run_requests(warmup)
+    results = run_requests(measured)
+    if not args.inline_effects:
+        results['outbox'] = run_outbox(stand_ins['table'], args.outbox_items)
+    allocations = run_allocations(allocation)
+
+    print_results(results)
+    print(f"\nallocations ({allocations['requests']} requests): peak p50 {allocations['peak_kib_p50']} KiB, "
+          f"p95 {allocations['peak_kib_p95']} KiB, retained {allocations['retained_bytes_mean']} B/request")
+
+    output = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'time': int(time.time()),
+            'args': vars(args)
+        },
+        'results': results,
+        'allocations': allocations
+    }
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print_comparison(results, json.load(f))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Metrics overhead benchmark: cost of stage timing per stage and per request
+Times Metrics.observe() (the perf_counter() start plus the record) with
+metrics on and off, then POST /forms through lambda_handler against local_aws
+stand-ins with no simulated latency, with monitoring.track_metrics on and
+off. EMF lines go to a discarding sink.
+
+Usage: python benchmarks/bench_metrics.py [--iterations N] [--requests N] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, '..', 'lambda')
+sys.path[:0] = [LAMBDA_DIR, BENCH_DIR]
+os.environ.setdefault('ENVIRONMENT', 'dev')
+os.environ.setdefault('FORM_SUBMISSIONS_TABLE', 'form_submissions')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import handler  # noqa: E402
+import local_aws  # noqa: E402
+from metrics import Metrics, metrics  # noqa: E402
+
+
+def observe_cost(enabled: bool, iterations: int) -> float:
+    """Microseconds per observed stage"""
+    instance = Metrics(enabled=enabled, flush_interval_seconds=3600, write=lambda line: None)
+    token = instance.begin_request()
+    perf_counter = time.perf_counter
+    elapsed = timeit.timeit(lambda: instance.observe('submit.validate', perf_counter()), number=iterations)
+    instance.end_request(token, error=False)
+    return elapsed / iterations * 1e6
+
+
+def event(index: int) -> dict:
+    return {
+        'requestContext': {'http': {'method': 'POST', 'path': '/forms', 'sourceIp': '127.0.0.1', 'userAgent': 'bench'}},
+        'headers': {},
+        'body': json.dumps({
+            'client': 'noclient',
+            'type': 'contacts',
+            'data': {'firstName': 'John', 'lastName': 'Doe', 'email': f"user{index}@example.com",
+                     'message': 'Hello, I would like to know more about your services.'}
+        })
+    }
+
+
+def request_cost(enabled: bool, requests: int) -> dict:
+    """Microseconds per POST /forms request, and stages observed per request"""
+    metrics.enabled = enabled
+    events = [event(index) for index in range(requests)]
+    for warm in events[:50]:
+        handler.lambda_handler(warm, None)
+    before = sum(histogram.count for histogram in metrics.histograms.values())
+    started = time.perf_counter()
+    for request in events:
+        assert handler.lambda_handler(request, None)['statusCode'] == 201
+    elapsed = time.perf_counter() - started
+    stages = sum(histogram.count for histogram in metrics.histograms.values()) - before
+    return {'us_per_request': elapsed / requests * 1e6, 'stages_per_request': stages / requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    local_aws.install(handler)
+    metrics.write = lambda line: None
+
+    results = {
+        'observe_us': {'on': observe_cost(True, args.iterations), 'off': observe_cost(False, args.iterations)},
+        'request_us': {'off': request_cost(False, args.requests), 'on': request_cost(True, args.requests)}
+    }
+    on, off = results['request_us']['on'], results['request_us']['off']
+    results['overhead_us_per_stage'] = (
+        (on['us_per_request'] - off['us_per_request']) / on['stages_per_request'] if on['stages_per_request'] else 0.0
+    )
+
+    print(f"observe(): {results['observe_us']['on']:.3f} us on, {results['observe_us']['off']:.3f} us off")
+    print(f"POST /forms: {off['us_per_request']:.1f} us off, {on['us_per_request']:.1f} us on "
+          f"({on['stages_per_request']:.1f} stages/request)")
+    print(f"overhead: {results['overhead_us_per_stage']:.3f} us per stage")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Storage report: bytes and write units per submission, before and after storage encoding
+Sizes each item with DynamoDB's item size rules for the previous layout
+(formData map, timestampIso, three query indexes projecting ALL) and the
+current one (StorageEncoder items, INCLUDE projections). Every index item
+adds 100 bytes of overhead; write units are 1 per started KB, for the table
+write and for each index write.
+
+Usage: python benchmarks/bench_storage.py [--json results.json]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+from outbox import outbox_attributes  # noqa: E402
+from storage import StorageEncoder, INDEX_ATTRIBUTES  # noqa: E402
+
+INDEX_OVERHEAD = 100
+INDEX_KEYS = ('formType', 'client', 'email')
+
+
+def value_size(value) -> int:
+    """Bytes DynamoDB counts for an attribute value"""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, float, Decimal)):
+        digits = len(str(abs(value)).replace('.', '').lstrip('0')) or 1
+        return math.ceil(digits / 2) + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(key.encode('utf-8')) + value_size(item) + 1 for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return 3 + sum(value_size(item) + 1 for item in value)
+    raise TypeError(type(value).__name__)
+
+
+def item_size(item: dict) -> int:
+    return sum(len(name.encode('utf-8')) + value_size(value) for name, value in item.items())
+
+
+def write_units(size: int) -> int:
+    return max(1, math.ceil(size / 1024))
+
+
+def submission(client: str, form_type: str, form_data: dict) -> dict:
+    """An item as build_submission_item produces it (outbox enabled)"""
+    now = datetime.utcnow()
+    timestamp = int(now.timestamp())
+    item = {
+        'submissionId': str(uuid.uuid4()),
+        'timestamp': timestamp,
+        'timestampIso': now.isoformat(),
+        'client': client,
+        'formType': form_type,
+        'email': form_data.get('email', ''),
+        'formData': form_data,
+        'sourceIp': '203.0.113.10',
+        'userAgent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                     'Chrome/120.0.0.0 Safari/537.36',
+        'status': 'received',
+        'tags': ''
+    }
+    item.update(outbox_attributes(['notification', 'autoReply'], timestamp))
+    return item
+
+
+def samples() -> dict:
+    return {
+        'contacts': submission('fixmycar', 'contacts', {
+            'firstName': 'John', 'lastName': 'Doe', 'email': 'john.doe@example.com',
+            'message': 'Hello, I would like to know more about your services.'
+        }),
+        'serviceRequests': submission('fixmycar', 'serviceRequests', {
+            'firstName': 'Jane', 'lastName': 'Smith', 'email': 'jane.smith@example.com',
+            'serviceType': 'Repair', 'mobile': '+919876543210',
+            'description': 'The screen flickers after the latest update and the battery drains overnight. ' * 20
+        }),
+        'survey': submission('noclient', 'survey', {
+            'email': 'survey@example.com',
+            'responses': {
+                f'question{index}': {'answer': 'Very satisfied with the repair', 'score': index % 5 + 1}
+                for index in range(40)
+            }
+        })
+    }
+
+
+def layout(item: dict, index_item) -> dict:
+    size = item_size(item)
+    index_sizes = [item_size(index_item(item)) + INDEX_OVERHEAD for _ in INDEX_KEYS]
+    return {
+        'item_bytes': size,
+        'index_bytes': sum(index_sizes),
+        'total_bytes': size + sum(index_sizes),
+        'write_units': write_units(size) + sum(write_units(index_size) for index_size in index_sizes)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    with open(os.path.join(LAMBDA_DIR, 'config.json'), 'r') as f:
+        encoder = StorageEncoder.from_config(json.load(f)['storage'])
+
+    results = {}
+    print(f"{'form type':<17}{'layout':<8}{'item B':>9}{'index B':>10}{'total B':>10}{'WCU':>6}")
+    for form_type, item in samples().items():
+        before = layout(item, lambda stored: stored)
+        after = layout(
+            encoder.encode(item),
+            lambda stored: {name: value for name, value in stored.items() if name in INDEX_ATTRIBUTES}
+        )
+        results[form_type] = {'before': before, 'after': after}
+        for name, result in (('before', before), ('after', after)):
+            print(f"{form_type:<17}{name:<8}{result['item_bytes']:>9}{result['index_bytes']:>10}"
+                  f"{result['total_bytes']:>10}{result['write_units']:>6}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
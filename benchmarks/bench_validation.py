@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: per-submission validation cost
+Compares validate_form_data (interpreted constraints) with a compiled
+validation plan on payloads close to security.max_payload_size
+
+Usage: python benchmarks/bench_validation.py [--iterations N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+sys.path.insert(0, LAMBDA_DIR)
+
+from validators import validate_form_data, compile_validation_plans, run_validation_plan  # noqa: E402
+
+
+def load_base_config() -> dict:
+    with open(os.path.join(LAMBDA_DIR, 'config.json'), 'r') as f:
+        return json.load(f)
+
+
+def build_payload(form_type: str, max_size: int) -> dict:
+    """Build form data for a form type, padded with extra fields up to ~95% of max_size"""
+    samples = {
+        'contacts': {
+            'firstName': 'John', 'lastName': 'Doe', 'email': 'john.doe@example.com',
+            'message': 'Hello, I would like to know more about your services. ' * 15
+        },
+        'feedback': {'email': 'feedback@example.com', 'comments': 'Great service, thanks! ' * 40},
+        'survey': {
+            'email': 'survey@example.com',
+            'responses': {f'question{i}': 'Very Satisfied' for i in range(20)}
+        },
+        'serviceRequests': {
+            'firstName': 'Jane', 'lastName': 'Smith', 'email': 'jane.smith@example.com',
+            'serviceType': 'Repair', 'mobile': '+919876543210',
+            'description': 'The screen flickers after the latest update. ' * 40
+        }
+    }
+    form_data = dict(samples[form_type])
+    target = int(max_size * 0.95)
+    index = 0
+    while len(json.dumps({'client': 'noclient', 'type': form_type, 'data': form_data})) < target:
+        form_data[f'extra{index}'] = 'x' * 40
+        index += 1
+    return form_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    config = load_base_config()
+    rules = config['validation_rules']
+    constraints = config['field_constraints']
+    max_size = config['security']['max_payload_size']
+    plans = compile_validation_plans(rules, constraints)
+
+    print(f"{'form type':<18}{'fields':>8}{'bytes':>8}{'before (us)':>14}{'after (us)':>13}{'speedup':>10}")
+    for form_type, required_fields in rules.items():
+        form_data = build_payload(form_type, max_size)
+        plan = plans[form_type]
+
+        # Both paths must agree before timing them
+        assert validate_form_data(form_data, required_fields, constraints) == run_validation_plan(plan, form_data)
+
+        before = timeit.timeit(
+            lambda: validate_form_data(form_data, required_fields, constraints),
+            number=args.iterations
+        )
+        after = timeit.timeit(lambda: run_validation_plan(plan, form_data), number=args.iterations)
+
+        size = len(json.dumps(form_data))
+        before_us = before / args.iterations * 1e6
+        after_us = after / args.iterations * 1e6
+        print(f"{form_type:<18}{len(form_data):>8}{size:>8}{before_us:>14.2f}{after_us:>13.2f}{before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
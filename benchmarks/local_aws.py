@@ -0,0 +1,623 @@
+"""
+In-memory stand-ins for the AWS clients used by the forms lambda
+Enough of DynamoDB, SES, SSM and webhook HTTP to drive handler.py without
+credentials. Each stand-in sleeps a configurable latency per call, and the
+time spent in them can be attributed per service to the current request
+(track_stages).
+"""
+import contextvars
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+_stages = contextvars.ContextVar('local_aws_stages', default=None)
+
+
+def track_stages() -> Dict[str, float]:
+    """
+    Attribute stand-in call time to the current context from now on
+    Returns the dict that collects seconds per service ('dynamodb', 'ses',
+    'ssm', 'webhook'); threads started with a copy of the context (inline
+    side effects) add to the same dict.
+    """
+    stages: Dict[str, float] = {}
+    _stages.set(stages)
+    return stages
+
+
+def _timed(service: str):
+    def decorate(method):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stages = _stages.get()
+                if stages is not None:
+                    stages[service] = stages.get(service, 0.0) + time.perf_counter() - started
+        return timed
+    return decorate
+
+
+class ConditionalCheckFailed(Exception):
+    """Mimics botocore's ClientError for ConditionalCheckFailedException"""
+
+    def __init__(self, operation: str = 'UpdateItem'):
+        self.response = {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}}
+        self.operation_name = operation
+        super().__init__(f"An error occurred (ConditionalCheckFailedException) when calling the {operation} operation")
+
+
+_MISSING = object()
+_TOKENS = re.compile(r"<>|<=|>=|[=<>(),]|[#:]?[\w.]+")
+_CLAUSES = re.compile(r'\b(SET|ADD|REMOVE|DELETE)\b')
+
+
+def _split(text: str, separator: str = ',') -> List[str]:
+    """Split on separator outside parentheses"""
+    parts, depth, current = [], 0, []
+    for char in text:
+        depth += char == '('
+        depth -= char == ')'
+        if char == separator and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts]
+
+
+def _name(token: str, names: Dict) -> str:
+    return names.get(token, token) if token.startswith('#') else token
+
+
+def _value(text: str, item: Dict, names: Dict, values: Dict) -> Any:
+    """An update expression operand: :value, attribute, if_not_exists(), list_append(), a + b, a - b"""
+    for operator in (' + ', ' - '):
+        left, found, right = text.rpartition(operator)
+        if found and left.count('(') == left.count(')'):
+            left_value = _value(left.strip(), item, names, values)
+            right_value = _value(right.strip(), item, names, values)
+            return left_value + right_value if operator == ' + ' else left_value - right_value
+
+    function, _, arguments = text.partition('(')
+    function = function.strip()
+    if function in ('if_not_exists', 'list_append'):
+        first, second = _split(arguments.rstrip()[:-1])
+        if function == 'if_not_exists':
+            name = _name(first, names)
+            return item[name] if name in item else _value(second, item, names, values)
+        return list(_value(first, item, names, values)) + list(_value(second, item, names, values))
+    if text.startswith(':'):
+        return values[text]
+    return item.get(_name(text, names))
+
+
+def apply_update(item: Dict, expression: str, names: Dict, values: Dict):
+    """Apply a SET / ADD / REMOVE / DELETE update expression to item in place (top-level attributes)"""
+    parts = _CLAUSES.split(expression)
+    for clause, body in zip(parts[1::2], parts[2::2]):
+        for action in _split(body):
+            if not action:
+                continue
+            if clause == 'SET':
+                target, _, operand = action.partition('=')
+                item[_name(target.strip(), names)] = _value(operand.strip(), item, names, values)
+            elif clause == 'REMOVE':
+                item.pop(_name(action, names), None)
+            else:
+                target, operand = action.split(None, 1)
+                name, value = _name(target, names), values[operand.strip()]
+                current = item.get(name)
+                if clause == 'DELETE':
+                    if current is not None:
+                        item[name] = set(current) - set(value)
+                elif isinstance(value, (set, frozenset)):
+                    item[name] = set(current or ()) | set(value)
+                else:
+                    item[name] = (current or 0) + value
+
+
+class _Condition:
+    """Evaluates a condition expression against an item (comparisons, AND/OR/NOT, BETWEEN, IN and functions)"""
+
+    def __init__(self, expression: str, item: Optional[Dict], names: Dict, values: Dict):
+        self.tokens = _TOKENS.findall(expression)
+        self.position = 0
+        self.item = item or {}
+        self.names = names
+        self.values = values
+
+    def evaluate(self) -> bool:
+        result = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unsupported condition expression near {self.tokens[self.position]!r}")
+        return result
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _take(self) -> str:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _or(self) -> bool:
+        result = self._and()
+        while self._peek() == 'OR':
+            self._take()
+            result = self._and() or result
+        return result
+
+    def _and(self) -> bool:
+        result = self._not()
+        while self._peek() == 'AND':
+            self._take()
+            result = self._not() and result
+        return result
+
+    def _not(self) -> bool:
+        if self._peek() == 'NOT':
+            self._take()
+            return not self._not()
+        if self._peek() == '(':
+            self._take()
+            result = self._or()
+            self._take()
+            return result
+        return self._predicate()
+
+    def _arguments(self) -> List[str]:
+        self._take()
+        arguments = []
+        while self._peek() != ')':
+            token = self._take()
+            if token != ',':
+                arguments.append(token)
+        self._take()
+        return arguments
+
+    def _operand(self) -> Any:
+        token = self._take()
+        if token == 'size':
+            value = self.item.get(_name(self._arguments()[0], self.names), _MISSING)
+            return len(value) if value is not _MISSING else _MISSING
+        if token.startswith(':'):
+            return self.values[token]
+        return self.item.get(_name(token, self.names), _MISSING)
+
+    def _predicate(self) -> bool:
+        token = self._peek()
+        if token in ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains'):
+            self._take()
+            arguments = self._arguments()
+            value = self.item.get(_name(arguments[0], self.names), _MISSING)
+            if token == 'attribute_exists':
+                return value is not _MISSING
+            if token == 'attribute_not_exists':
+                return value is _MISSING
+            other = self.values[arguments[1]]
+            if value is _MISSING:
+                return False
+            return str(value).startswith(other) if token == 'begins_with' else other in value
+
+        left = self._operand()
+        operator = self._take()
+        if operator == 'BETWEEN':
+            low = self._operand()
+            self._take()
+            high = self._operand()
+            return _MISSING not in (left, low, high) and low <= left <= high
+        if operator == 'IN':
+            self._take()
+            options = []
+            while self._peek() != ')':
+                if self._peek() == ',':
+                    self._take()
+                else:
+                    options.append(self._operand())
+            self._take()
+            return left in options
+        right = self._operand()
+        if left is _MISSING or right is _MISSING:
+            return operator == '<>' and left is not right
+        return {
+            '=': left == right, '<>': left != right, '<': left < right,
+            '<=': left <= right, '>': left > right, '>=': left >= right
+        }[operator]
+
+
+def check_condition(expression: Optional[str], item: Optional[Dict], names: Dict, values: Dict, operation: str):
+    """Raise ConditionalCheckFailed when a condition expression does not hold for item"""
+    if expression and not _Condition(expression, item, names or {}, values or {}).evaluate():
+        raise ConditionalCheckFailed(operation)
+
+
+class LocalTable:
+    """
+    DynamoDB Table stand-in keyed by the table's key attributes; latency_ms is slept per call
+    put_item, update_item and delete_item apply condition expressions, and
+    update_item applies its update expression; scan returns every item that
+    matches its filter expression in one page. query evaluates the key
+    condition against the table or a global secondary index from INDEX_KEYS
+    (items missing an index key attribute are not in that index, as with
+    sparse indexes), orders by the sort key and pages with Limit and
+    ExclusiveStartKey.
+    """
+
+    def __init__(self, name: str = 'local', key_names: tuple = ('submissionId', 'timestamp'),
+                 latency_ms: float = 0.0):
+        self.name = name
+        self.key_names = key_names
+        self.latency_ms = latency_ms
+        self.items: Dict[tuple, Dict] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, operation: str):
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def _delay(self):
+        # Simulated round trip, outside the lock so concurrent calls overlap
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def _key(self, item: Dict) -> tuple:
+        return tuple(item.get(name) for name in self.key_names)
+
+    @_timed('dynamodb')
+    def put_item(self, Item: Dict, ConditionExpression: Optional[str] = None, ExpressionAttributeNames: Dict = None,
+                 ExpressionAttributeValues: Dict = None, **kwargs) -> Dict:
+        self._delay()
+        with self._lock:
+            self._count('put_item')
+            key = self._key(Item)
+            check_condition(ConditionExpression, self.items.get(key), ExpressionAttributeNames,
+                            ExpressionAttributeValues, 'PutItem')
+            self.items[key] = dict(Item)
+        return {}
+
+    @_timed('dynamodb')
+    def get_item(self, Key: Dict, **kwargs) -> Dict:
+        self._delay()
+        with self._lock:
+            self._count('get_item')
+            item = self.items.get(self._key(Key))
+        return {'Item': dict(item)} if item is not None else {}
+
+    @_timed('dynamodb')
+    def update_item(self, Key: Dict, UpdateExpression: str = '', ConditionExpression: Optional[str] = None,
+                    ExpressionAttributeNames: Dict = None, ExpressionAttributeValues: Dict = None, **kwargs) -> Dict:
+        self._delay()
+        with self._lock:
+            self._count('update_item')
+            key = self._key(Key)
+            check_condition(ConditionExpression, self.items.get(key), ExpressionAttributeNames,
+                            ExpressionAttributeValues, 'UpdateItem')
+            item = dict(self.items.get(key) or Key)
+            apply_update(item, UpdateExpression, ExpressionAttributeNames or {}, ExpressionAttributeValues or {})
+            self.items[key] = item
+        return {'Attributes': dict(item)}
+
+    @_timed('dynamodb')
+    def delete_item(self, Key: Dict, ConditionExpression: Optional[str] = None, ExpressionAttributeNames: Dict = None,
+                    ExpressionAttributeValues: Dict = None, **kwargs) -> Dict:
+        self._delay()
+        with self._lock:
+            self._count('delete_item')
+            key = self._key(Key)
+            check_condition(ConditionExpression, self.items.get(key), ExpressionAttributeNames,
+                            ExpressionAttributeValues, 'DeleteItem')
+            self.items.pop(key, None)
+        return {}
+
+    @_timed('dynamodb')
+    def scan(self, FilterExpression: Optional[str] = None, ExpressionAttributeNames: Dict = None,
+             ExpressionAttributeValues: Dict = None, **kwargs) -> Dict:
+        self._delay()
+        with self._lock:
+            self._count('scan')
+            items = [
+                dict(item) for item in self.items.values()
+                if not FilterExpression or _Condition(FilterExpression, item, ExpressionAttributeNames or {},
+                                                      ExpressionAttributeValues or {}).evaluate()
+            ]
+        return {'Items': items, 'Count': len(items)}
+
+    @_timed('dynamodb')
+    def query(self, KeyConditionExpression: str, IndexName: Optional[str] = None, FilterExpression: Optional[str] = None,
+              ExpressionAttributeNames: Dict = None, ExpressionAttributeValues: Dict = None,
+              ScanIndexForward: bool = True, Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict] = None,
+              ProjectionExpression: Optional[str] = None, **kwargs) -> Dict:
+        self._delay()
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        index_keys = INDEX_KEYS[IndexName] if IndexName else self.key_names
+        sort_key = index_keys[1] if len(index_keys) > 1 else None
+        with self._lock:
+            self._count('query')
+            matched = [
+                dict(item) for item in self.items.values()
+                if all(name in item for name in index_keys)
+                and _Condition(KeyConditionExpression, item, names, values).evaluate()
+            ]
+        if sort_key:
+            matched.sort(key=lambda item: (item[sort_key], self._key(item)), reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            start = self._key(ExclusiveStartKey)
+            position = next((index for index, item in enumerate(matched) if self._key(item) == start), None)
+            matched = matched[position + 1:] if position is not None else []
+
+        evaluated = matched[:Limit] if Limit else matched
+        items = [
+            item for item in evaluated
+            if not FilterExpression or _Condition(FilterExpression, item, names, values).evaluate()
+        ]
+        if ProjectionExpression:
+            fields = [_name(token.strip(), names) for token in ProjectionExpression.split(',')]
+            items = [{field: item[field] for field in fields if field in item} for item in items]
+        result = {'Items': items, 'Count': len(items)}
+        if Limit and len(matched) > Limit:
+            last = evaluated[-1]
+            result['LastEvaluatedKey'] = {name: last[name] for name in (*self.key_names, *index_keys)}
+        return result
+
+
+class SyntheticSubmissions:
+    """
+    Read-only form_submissions stand-in with `count` generated items
+    Items are built on demand from their index (timestamp = base_timestamp + i,
+    client = clients[i % len(clients)]), so a million-item table costs no
+    memory. Supports paginated Scan with Segment/TotalSegments and ClientIndex
+    Query with a timestamp range; latency_ms is slept per call.
+    """
+
+    def __init__(self, count: int, clients: tuple = ('noclient', 'fixmycar', 'repairodo', 'fixmygadgets'),
+                 latency_ms: float = 0.0, base_timestamp: int = 1700000000):
+        self.count = count
+        self.clients = clients
+        self.latency_ms = latency_ms
+        self.base_timestamp = base_timestamp
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def item(self, index: int) -> Dict:
+        timestamp = self.base_timestamp + index
+        return {
+            'submissionId': f"{index:08x}-0000-4000-8000-{index:012x}",
+            'timestamp': Decimal(timestamp),
+            'timestampIso': datetime.utcfromtimestamp(timestamp).isoformat(),
+            'client': self.clients[index % len(self.clients)],
+            'formType': 'contacts',
+            'email': f"user{index}@example.com",
+            'status': 'processed',
+            'sourceIp': '203.0.113.10',
+            'userAgent': 'Mozilla/5.0 (bench)',
+            'tags': '',
+            'formData': {
+                'firstName': 'John',
+                'lastName': 'Doe',
+                'email': f"user{index}@example.com",
+                'message': 'I would like to know more about your services, please call me back.',
+                'rating': Decimal(index % 5 + 1)
+            },
+            'effectAttempts': {'notification': Decimal(1)}
+        }
+
+    def _call(self, operation: str):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    @staticmethod
+    def _project(item: Dict, kwargs: Dict) -> Dict:
+        expression = kwargs.get('ProjectionExpression')
+        if not expression:
+            return item
+        names = kwargs.get('ExpressionAttributeNames', {})
+        fields = [names.get(token.strip(), token.strip()) for token in expression.split(',')]
+        return {field: item[field] for field in fields if field in item}
+
+    def _page(self, indexes: range, limit: int, kwargs: Dict) -> Dict:
+        page = indexes[:limit]
+        result = {'Items': [self._project(self.item(index), kwargs) for index in page], 'Count': len(page)}
+        if len(indexes) > limit:
+            last = self.item(page[-1])
+            result['LastEvaluatedKey'] = {
+                key: last[key] for key in ('submissionId', 'timestamp', 'client')
+            }
+        return result
+
+    def _start_after(self, kwargs: Dict) -> int:
+        start_key = kwargs.get('ExclusiveStartKey')
+        return int(start_key['timestamp']) - self.base_timestamp + 1 if start_key else 0
+
+    def scan(self, Segment: int = 0, TotalSegments: int = 1, Limit: int = 1000, **kwargs) -> Dict:
+        self._call('scan')
+        first = max(self._start_after(kwargs), Segment)
+        first += (Segment - first) % TotalSegments
+        return self._page(range(first, self.count, TotalSegments), Limit, kwargs)
+
+    def query(self, Limit: int = 1000, **kwargs) -> Dict:
+        self._call('query')
+        values = kwargs['ExpressionAttributeValues']
+        stride = len(self.clients)
+        offset = self.clients.index(values[':client']) if values[':client'] in self.clients else None
+        if offset is None:
+            return {'Items': [], 'Count': 0}
+        low = max(values.get(':start', self.base_timestamp) - self.base_timestamp, 0)
+        high = min(values.get(':end', self.base_timestamp + self.count) - self.base_timestamp + 1, self.count)
+        if kwargs.get('ScanIndexForward', True) is False:
+            last = high - 1
+            if 'ExclusiveStartKey' in kwargs:
+                last = min(last, self._start_after(kwargs) - 2)
+            last -= (last - offset) % stride
+            return self._page(range(last, low - 1, -stride), Limit, kwargs)
+        first = max(low, self._start_after(kwargs))
+        first += (offset - first) % stride
+        return self._page(range(first, high, stride), Limit, kwargs)
+
+
+# Table name suffix -> key attributes (anything else is keyed like form_submissions)
+TABLE_KEYS = {
+    'rate_limits': ('limitKey',),
+    'form_idempotency': ('idempotencyKey',),
+    'form_clients': ('client',),
+    'form_digests': ('digestKey',),
+    'form_stats': ('statsKey', 'bucket'),
+    'form_blocklist': ('blockKey',),
+    'form_attachments': ('attachmentId',),
+    'form_fingerprints': ('fingerprint',)
+}
+
+
+# Global secondary index name -> (partition key, sort key), as in terraform/dynamodb.tf
+INDEX_KEYS = {
+    'ClientIndex': ('client', 'timestamp'),
+    'FormTypeIndex': ('clientFormType', 'timestamp'),
+    'EmailIndex': ('clientEmail', 'timestamp'),
+    'OutboxIndex': ('outboxState', 'nextAttemptAt'),
+    'PendingIndex': ('pending', 'windowEnd')
+}
+
+
+class LocalDynamoDB:
+    """DynamoDB service resource stand-in; Table() returns one LocalTable per name"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.tables: Dict[str, LocalTable] = {}
+
+    def Table(self, name: str) -> LocalTable:
+        if name not in self.tables:
+            key_names = next(
+                (keys for suffix, keys in TABLE_KEYS.items() if name.endswith(suffix)),
+                ('submissionId', 'timestamp')
+            )
+            self.tables[name] = LocalTable(name, key_names, latency_ms=self.latency_ms)
+        return self.tables[name]
+
+    @_timed('dynamodb')
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict]], **kwargs) -> Dict:
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise ValueError('Too many items requested for the BatchWriteItem call')
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            table._delay()
+            with table._lock:
+                table._count('batch_write_item')
+                for request in requests:
+                    if 'DeleteRequest' in request:
+                        table.items.pop(table._key(request['DeleteRequest']['Key']), None)
+                    else:
+                        item = request['PutRequest']['Item']
+                        table.items[table._key(item)] = dict(item)
+        return {'UnprocessedItems': {}}
+
+    @_timed('dynamodb')
+    def batch_get_item(self, RequestItems: Dict[str, Dict], **kwargs) -> Dict:
+        if sum(len(request['Keys']) for request in RequestItems.values()) > 100:
+            raise ValueError('Too many items requested for the BatchGetItem call')
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            table._delay()
+            with table._lock:
+                table._count('batch_get_item')
+                found = [table.items.get(table._key(key)) for key in request['Keys']]
+            responses[name] = [dict(item) for item in found if item is not None]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+
+class LocalSES:
+    """SES client stand-in that records sent messages"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.sent: List[Dict] = []
+
+    @_timed('ses')
+    def send_email(self, **kwargs) -> Dict:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        self.sent.append(kwargs)
+        return {'MessageId': f"local-{len(self.sent)}"}
+
+
+class LocalSSM:
+    """SSM client stand-in serving fixed parameters"""
+
+    def __init__(self, parameters: Optional[Dict[str, str]] = None, latency_ms: float = 0.0):
+        self.parameters = parameters or {}
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    @_timed('ssm')
+    def get_parameter(self, Name: str, **kwargs) -> Dict:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        self.calls += 1
+        if Name not in self.parameters:
+            error = Exception(f"An error occurred (ParameterNotFound) when calling the GetParameter operation: {Name}")
+            error.response = {'Error': {'Code': 'ParameterNotFound'}}
+            raise error
+        return {'Parameter': {'Name': Name, 'Version': 1, 'Value': self.parameters[Name]}}
+
+
+class LocalWebhookTransport:
+    """Webhook HTTP stand-in for WebhookClient.transport; answers every POST with status"""
+
+    def __init__(self, latency_ms: float = 0.0, status: int = 200):
+        self.latency_ms = latency_ms
+        self.status = status
+        self.posts = 0
+
+    @_timed('webhook')
+    def post(self, url: str, body: bytes, headers: Dict, timeout: float) -> int:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        self.posts += 1
+        return self.status
+
+
+DEFAULT_CLIENTS = {
+    'noclient': {
+        'name': 'GadgetCloud',
+        'notification_email': 'notifications@example.com',
+        'form_types': ['contacts', 'feedback', 'survey', 'serviceRequests']
+    },
+    'fixmycar': {
+        'name': 'FixMyCar',
+        'notification_email': 'fixmycar@example.com',
+        'form_types': ['contacts', 'serviceRequests']
+    }
+}
+
+
+def install(handler, clients: Optional[Dict] = None, latency_ms: float = 0.0, ses_latency_ms: float = 0.0,
+            ssm_latency_ms: float = 0.0, webhook_latency_ms: float = 0.0) -> Dict:
+    """
+    Point an imported handler module at local stand-ins
+    latency_ms is the simulated DynamoDB round trip; the other services have their own
+    Returns the stand-ins so callers can inspect them
+    """
+    dynamodb = LocalDynamoDB(latency_ms)
+    table = dynamodb.Table(handler.FORM_SUBMISSIONS_TABLE or 'form_submissions')
+    ses = LocalSES(ses_latency_ms)
+    ssm = LocalSSM({handler.CLIENTS_PARAM_NAME: json.dumps(clients or DEFAULT_CLIENTS)}, ssm_latency_ms)
+    webhook = LocalWebhookTransport(webhook_latency_ms)
+
+    handler.dynamodb = dynamodb
+    handler.submissions_table = table
+    handler.ses_client = ses
+    handler.ssm_client = ssm
+    handler.get_webhook_client().transport = webhook
+    return {'dynamodb': dynamodb, 'table': table, 'ses': ses, 'ssm': ssm, 'webhook': webhook}
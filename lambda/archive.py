@@ -0,0 +1,172 @@
+"""
+Archival of old submissions
+Moves submissions older than a cutoff out of the table into gzip-compressed
+NDJSON files, a series of parts per client and run:
+
+    {prefix}{client}/{run}/part-00000.ndjson.gz
+
+on S3 (S3Sink) or a local directory (LocalSink, for tests and local runs).
+Items are decoded (storage.decode_item) so archive lines are plain
+submissions. A part is written before its items are deleted, so an
+interrupted run can leave duplicates in the archive but never loses a
+submission; the next run picks up whatever is left.
+
+Usage: python lambda/archive.py --table TABLE --before TIME (--output-dir DIR | --bucket BUCKET)
+                                [--prefix PREFIX] [--segments N] [--keep]
+"""
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from export import encode_default, iter_parallel, scan_sources
+from logger import log
+from storage import decode_item
+
+
+class S3Sink:
+    """Writes archive parts to an S3 bucket"""
+
+    def __init__(self, s3, bucket: str):
+        self.s3 = s3
+        self.bucket = bucket
+
+    def write(self, key: str, data: bytes):
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType='application/gzip')
+
+
+class LocalSink:
+    """Writes archive parts under a local directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def write(self, key: str, data: bytes):
+        path = os.path.join(self.directory, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+class Archiver:
+    """
+    Buffers decoded submissions per client and writes them out as parts
+
+    Everything buffered is flushed once the NDJSON reaches max_buffer_bytes,
+    and on flush() at the end of a run. After each part is written its items
+    are passed to delete(keys), which returns the keys it could not delete;
+    without delete the table is left untouched.
+    """
+
+    def __init__(
+        self,
+        sink,
+        delete: Optional[Callable[[List[Dict]], List[Dict]]] = None,
+        prefix: str = 'archive/',
+        run_id: Optional[str] = None,
+        max_buffer_bytes: int = 32 * 1024 * 1024,
+        compression_level: int = 6
+    ):
+        self.sink = sink
+        self.delete = delete
+        self.prefix = prefix
+        self.run_id = run_id or datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        self.max_buffer_bytes = max_buffer_bytes
+        self.compression_level = compression_level
+        self.summary = {'archived': 0, 'parts': 0, 'bytes': 0, 'notDeleted': 0}
+
+        self._dumps = json.JSONEncoder(default=encode_default, separators=(',', ':'), ensure_ascii=False).encode
+        self._lines: Dict[str, List[str]] = {}
+        self._keys: Dict[str, List[Dict]] = {}
+        self._buffered = 0
+        self._parts: Dict[str, int] = {}
+
+    def add(self, item: Dict):
+        client = str(item.get('client') or 'unknown')
+        line = self._dumps(decode_item(item))
+        self._lines.setdefault(client, []).append(line)
+        self._keys.setdefault(client, []).append({'submissionId': item['submissionId'], 'timestamp': item['timestamp']})
+        self._buffered += len(line) + 1
+        if self._buffered >= self.max_buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        """Write a part per buffered client, then delete what it holds"""
+        for client, lines in self._lines.items():
+            part = self._parts.get(client, 0)
+            self._parts[client] = part + 1
+            data = gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'), self.compression_level)
+            self.sink.write(f"{self.prefix}{client}/{self.run_id}/part-{part:05d}.ndjson.gz", data)
+
+            self.summary['archived'] += len(lines)
+            self.summary['parts'] += 1
+            self.summary['bytes'] += len(data)
+            if self.delete is not None:
+                not_deleted = self.delete(self._keys[client])
+                if not_deleted:
+                    log.warning('Archived submissions not deleted', client=client, count=len(not_deleted))
+                    self.summary['notDeleted'] += len(not_deleted)
+
+        self._lines = {}
+        self._keys = {}
+        self._buffered = 0
+
+
+def archive_submissions(table, archiver: Archiver, before: int, segments: int = 8, page_size: int = 500,
+                        max_pending_pages: int = 16, should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+    """
+    Archive every submission with a timestamp before `before`
+    Scans the table in parallel segments. When should_stop() turns true the
+    scan is abandoned after flushing what was read (summary['complete'] is
+    False) and a later run continues.
+    """
+    items = iter_parallel(
+        scan_sources(table, segments, page_size, older_than=before),
+        max_workers=segments,
+        max_pending_pages=max_pending_pages
+    )
+    complete = True
+    try:
+        for item in items:
+            archiver.add(item)
+            if should_stop is not None and should_stop():
+                complete = False
+                break
+    finally:
+        items.close()
+    archiver.flush()
+    return dict(archiver.summary, complete=complete)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move old form submissions to compressed NDJSON archives')
+    parser.add_argument('--table', required=True, help='form_submissions table name')
+    parser.add_argument('--before', required=True, help='Archive submissions before this time (epoch seconds or ISO 8601)')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output-dir', help='Write archive parts under this directory')
+    target.add_argument('--bucket', help='Write archive parts to this S3 bucket')
+    parser.add_argument('--prefix', default='archive/')
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--keep', action='store_true', help='Do not delete archived submissions from the table')
+    args = parser.parse_args()
+
+    import boto3
+    from batch import BatchWriter
+    from read_api import parse_time
+
+    dynamodb = boto3.resource('dynamodb')
+    sink = LocalSink(args.output_dir) if args.output_dir else S3Sink(boto3.client('s3'), args.bucket)
+    delete = None if args.keep else BatchWriter(dynamodb, args.table).delete
+    summary = archive_submissions(
+        dynamodb.Table(args.table),
+        Archiver(sink, delete, prefix=args.prefix),
+        parse_time(args.before, None),
+        segments=args.segments
+    )
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+"""
+ASGI entry point for container hosting
+Serves the same routes as lambda_handler from a long-lived process. Each
+HTTP request becomes an API Gateway HTTP API (v2) event and is handled on a
+shared worker pool, so one process keeps many submissions in flight while
+their DynamoDB/SES calls block worker threads, not the event loop. The AWS
+clients are created once at startup and shared by every request (boto3
+clients are thread-safe; their connection pools are sized by
+runtime.max_pool_connections).
+
+Run it under any ASGI server (uvicorn asgi:app), or with the stdlib asyncio
+dev server below; --local-aws swaps in the benchmarks/local_aws stand-ins
+for load testing without AWS.
+
+Usage: python lambda/asgi.py [--host HOST] [--port PORT] [--local-aws [--latency-ms MS]]
+"""
+import argparse
+import asyncio
+import base64
+import contextvars
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import handler
+from logger import log
+
+
+class InvocationContext:
+    """The parts of the Lambda context object handler.py reads"""
+    __slots__ = ('aws_request_id', 'deadline')
+
+    def __init__(self, request_id: str, timeout_seconds: float):
+        self.aws_request_id = request_id
+        self.deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(int((self.deadline - time.monotonic()) * 1000), 0)
+
+
+def _join(values: Dict[str, str], name: str, value: str):
+    # API Gateway joins repeated headers and query parameters with commas
+    values[name] = f"{values[name]},{value}" if name in values else value
+
+
+def build_event(scope: Dict, body: bytes, forwarded_hops: int = 0) -> Dict:
+    """
+    HTTP API (v2) event for an ASGI http scope
+    With forwarded_hops > 0 (behind that many proxies, e.g. a load balancer)
+    the source IP is taken from X-Forwarded-For, counting from the right so
+    that a client can't spoof it; otherwise it is the peer address.
+    """
+    headers: Dict[str, str] = {}
+    for name, value in scope.get('headers', ()):
+        _join(headers, name.decode('latin-1').lower(), value.decode('latin-1'))
+
+    query = scope.get('query_string', b'').decode('latin-1')
+    params: Dict[str, str] = {}
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        _join(params, name, value)
+
+    client = scope.get('client')
+    source_ip = client[0] if client else '127.0.0.1'
+    if forwarded_hops > 0 and headers.get('x-forwarded-for'):
+        hops = [hop.strip() for hop in headers['x-forwarded-for'].split(',')]
+        source_ip = hops[-min(forwarded_hops, len(hops))]
+
+    # Binary bodies (attachment parts) are base64-encoded, as API Gateway does
+    try:
+        text, encoded = body.decode('utf-8'), False
+    except UnicodeDecodeError:
+        text, encoded = base64.b64encode(body).decode('ascii'), True
+
+    event = {
+        'version': '2.0',
+        'rawPath': scope['path'],
+        'rawQueryString': query,
+        'headers': headers,
+        'requestContext': {
+            'http': {
+                'method': scope['method'],
+                'path': scope['path'],
+                'protocol': f"HTTP/{scope.get('http_version', '1.1')}",
+                'sourceIp': source_ip,
+                'userAgent': headers.get('user-agent', 'Unknown')
+            }
+        },
+        'body': text,
+        'isBase64Encoded': encoded
+    }
+    if params:
+        event['queryStringParameters'] = params
+    return event
+
+
+def error_result(status_code: int, message: str) -> Dict:
+    """Response for requests rejected before they reach lambda_handler"""
+    return {
+        'statusCode': status_code,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'error': message})
+    }
+
+
+class FormsApp:
+    """
+    ASGI application running handle(event, context) on a worker pool
+
+    max_workers bounds the requests handled at once; further requests wait
+    for a worker on the event loop. Bodies larger than max_request_bytes are
+    rejected with 413 without being buffered. The lifespan startup event runs
+    warm_up() so the shared clients exist before the first request.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[Dict, InvocationContext], Dict],
+        warm_up: Optional[Callable[[], None]] = None,
+        max_workers: int = 48,
+        request_timeout_seconds: float = 29,
+        max_request_bytes: int = 1024 * 1024,
+        forwarded_hops: int = 0
+    ):
+        self.handle = handle
+        self.warm_up = warm_up
+        self.request_timeout_seconds = request_timeout_seconds
+        self.max_request_bytes = max_request_bytes
+        self.forwarded_hops = forwarded_hops
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi')
+
+    @classmethod
+    def from_config(cls, config: Dict, handle, warm_up=None) -> 'FormsApp':
+        """Build the app from the runtime config block"""
+        return cls(
+            handle,
+            warm_up,
+            max_workers=config.get('max_workers', 48),
+            request_timeout_seconds=config.get('request_timeout_seconds', 29),
+            max_request_bytes=config.get('max_request_bytes', 1024 * 1024),
+            forwarded_hops=config.get('forwarded_hops', 0)
+        )
+
+    async def __call__(self, scope: Dict, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if self.warm_up is not None:
+                        await asyncio.get_running_loop().run_in_executor(self.executor, self.warm_up)
+                except Exception as e:
+                    log.error('Startup failed', error=str(e))
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope: Dict, receive, send):
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_request_bytes:
+                await self._send(send, error_result(413, 'Request body too large'))
+                return
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+
+        event = build_event(scope, b''.join(chunks), self.forwarded_hops)
+        request_id = event['headers'].get('x-request-id') or str(uuid.uuid4())
+        context = InvocationContext(request_id, self.request_timeout_seconds)
+        # A fresh copy of the context per request, so request log fields never leak between requests
+        result = await asyncio.get_running_loop().run_in_executor(
+            self.executor, contextvars.copy_context().run, self.handle, event, context
+        )
+        await self._send(send, result)
+
+    async def _send(self, send, result: Dict):
+        body = result.get('body') or ''
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        headers = [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                   for name, value in (result.get('headers') or {}).items()]
+        headers.append((b'content-length', str(len(data)).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': result['statusCode'], 'headers': headers})
+        await send({'type': 'http.response.body', 'body': data})
+
+
+app = FormsApp.from_config(handler.CONFIG['runtime'], handler.lambda_handler, handler.warm_up)
+
+
+async def _start(application) -> Callable:
+    """Run the lifespan startup; returns a coroutine function that shuts the app down"""
+    messages: asyncio.Queue = asyncio.Queue()
+    started = asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        if message['type'].startswith('lifespan.startup') and not started.done():
+            started.set_result(message)
+
+    task = asyncio.ensure_future(application({'type': 'lifespan', 'asgi': {'version': '3.0'}}, messages.get, send))
+    await messages.put({'type': 'lifespan.startup'})
+    message = await started
+    if message['type'] == 'lifespan.startup.failed':
+        raise RuntimeError(message.get('message', 'startup failed'))
+
+    async def stop():
+        await messages.put({'type': 'lifespan.shutdown'})
+        await task
+    return stop
+
+
+def _reply(writer, status: int, headers: List, body: bytes, keep_alive: bool):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines.extend(f"{name.decode('latin-1')}: {value.decode('latin-1')}" for name, value in headers)
+    lines.append(f"connection: {'keep-alive' if keep_alive else 'close'}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+
+async def _connection(application, reader, writer):
+    """One HTTP/1.1 connection: keep-alive requests with Content-Length bodies, answered in order"""
+    peer = writer.get_extra_info('peername')
+    server = writer.get_extra_info('sockname')
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                return
+            try:
+                request_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+                method, target, version = request_line.split(' ', 2)
+                headers = []
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+                fields = dict(headers)
+                length = int(fields.get(b'content-length', b'0') or 0)
+            except ValueError:
+                _reply(writer, 400, [(b'content-length', b'0')], b'', False)
+                return
+            if b'chunked' in fields.get(b'transfer-encoding', b'').lower():
+                _reply(writer, 411, [(b'content-length', b'0')], b'', False)
+                return
+            if length > application.max_request_bytes:
+                result = error_result(413, 'Request body too large')
+                _reply(writer, 413, [(b'content-type', b'application/json')], result['body'].encode('utf-8'), False)
+                return
+            body = await reader.readexactly(length) if length else b''
+
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': version.split('/', 1)[-1],
+                'method': method.upper(),
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode('latin-1'),
+                'query_string': query.encode('latin-1'),
+                'headers': headers,
+                'client': peer[:2] if peer else None,
+                'server': server[:2] if server else None
+            }
+            keep_alive = version == 'HTTP/1.1' and fields.get(b'connection', b'').lower() != b'close'
+
+            pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+            start: Dict = {}
+            chunks: List[bytes] = []
+
+            async def receive():
+                return pending.pop() if pending else {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    start.update(message)
+                elif message['type'] == 'http.response.body':
+                    chunks.append(message.get('body', b''))
+
+            await application(scope, receive, send)
+            _reply(writer, start.get('status', 500), start.get('headers', []), b''.join(chunks), keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                return
+    finally:
+        writer.close()
+
+
+async def serve(application, host: str = '127.0.0.1', port: int = 8000):
+    """Stdlib asyncio HTTP/1.1 server for the ASGI app (development and local load tests)"""
+    stop = await _start(application)
+    server = await asyncio.start_server(lambda reader, writer: _connection(application, reader, writer), host, port)
+    log.info('Serving', host=host, port=port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the forms API from a long-lived process')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--local-aws', action='store_true', help='Use in-memory AWS stand-ins (benchmarks/local_aws.py)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated DynamoDB round trip with --local-aws')
+    args = parser.parse_args()
+
+    if args.local_aws:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+        import local_aws
+        local_aws.install(handler, latency_ms=args.latency_ms)
+
+    try:
+        asyncio.run(serve(app, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,517 @@
+"""
+File attachments for forms lambda
+Files are uploaded outside the JSON submission, in parts, to an object store:
+
+    POST /forms/attachments                          session: attachmentId, uploadToken, partBytes and
+                                                     one URL per part
+    PUT  <part URL>                                  one request per part (a presigned S3 UploadPart URL,
+                                                     or /forms/attachments/{id}/parts/{n} for LocalObjects)
+    POST /forms/attachments/{id}/complete            assemble, verify and mark ready
+
+Requests to /forms/attachments/{id}/... carry the session's upload token as
+a bearer token; only its SHA-256 is stored.
+
+Completing streams the assembled object back once in read_bytes chunks: the
+size and SHA-256 are computed incrementally and the type is sniffed from the
+first bytes, so no file is ever held in memory whole. Submissions reference
+ready attachments by ID; notification emails link to them through signed,
+expiring GET /forms/attachments/{id} URLs that redirect to the file.
+"""
+import hashlib
+import hmac
+import math
+import os
+import secrets
+import shutil
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+# S3 rejects multipart parts smaller than this (except the last one)
+S3_MIN_PART_BYTES = 5 * 1024 * 1024
+
+# Leading bytes inspected by sniff_type
+SNIFF_BYTES = 16
+
+_SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif')
+)
+
+_HEIF_BRANDS = (b'heic', b'heix', b'hevc', b'heim', b'heis', b'mif1', b'msf1')
+
+
+class AttachmentError(Exception):
+    """A rejected attachment request; status is the HTTP status to return"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def sniff_type(head: bytes) -> Optional[str]:
+    """Content type from a file's leading bytes, or None when it is not a supported type"""
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp' and head[8:12] in _HEIF_BRANDS:
+        return 'image/heic'
+    return None
+
+
+def attachment_limits(client_config: Dict, defaults: Dict) -> Optional[Dict]:
+    """Size, type and count limits for a client (its attachments block over the defaults), or None when disabled"""
+    overrides = client_config.get('attachments') or {}
+    if not overrides.get('enabled', defaults['enabled']):
+        return None
+    return {
+        'max_bytes': int(overrides.get('max_bytes', defaults['max_bytes'])),
+        'allowed_types': tuple(overrides.get('allowed_types', defaults['allowed_types'])),
+        'max_per_submission': int(overrides.get('max_per_submission', defaults['max_per_submission']))
+    }
+
+
+def _conditional_check_failed(error: Exception) -> bool:
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+
+def hash_upload_token(token: str) -> str:
+    """Hex SHA-256 of an upload token, as stored in the session's uploadTokenSha256"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def sign_link(attachment_id: str, expires: int, secret: str) -> str:
+    return hmac.new(secret.encode('utf-8'), f"{attachment_id}:{expires}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def link_path(attachment_id: str, expires: int, secret: str) -> str:
+    """Path of a signed download link (relative to the API base URL)"""
+    return f"/forms/attachments/{attachment_id}?expires={expires}&signature={sign_link(attachment_id, expires, secret)}"
+
+
+def check_link(attachment_id: str, params: Dict, secret: str, now: float):
+    """Verify a download link's expiry and signature; raises AttachmentError"""
+    expires = params.get('expires', '')
+    signature = params.get('signature', '')
+    if not secret or not expires.isdigit() or not signature:
+        raise AttachmentError(403, 'Invalid link')
+    if not hmac.compare_digest(sign_link(attachment_id, int(expires), secret), signature):
+        raise AttachmentError(403, 'Invalid link')
+    if int(expires) < now:
+        raise AttachmentError(410, 'Link expired')
+
+
+def _content_disposition(filename: str) -> str:
+    fallback = ''.join(c if c.isalnum() or c in '._- ' else '_' for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class S3Objects:
+    """
+    Attachment objects in an S3 bucket, uploaded with multipart uploads
+    Browsers upload parts straight to S3 through presigned URLs, which keeps
+    file bytes out of API Gateway and Lambda (whose 6 MB payload limit is
+    below the 5 MiB minimum part once base64-encoded); write_part is there
+    for long-lived servers (asgi.py).
+    """
+
+    def __init__(self, s3, bucket: str, part_bytes: int = S3_MIN_PART_BYTES):
+        self.s3 = s3
+        self.bucket = bucket
+        self.part_bytes = max(part_bytes, S3_MIN_PART_BYTES)
+
+    def begin(self, key: str, content_type: str) -> str:
+        return self.s3.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)['UploadId']
+
+    def part_url(self, key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        return self.s3.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': self.bucket, 'Key': key, 'UploadId': upload_id, 'PartNumber': part_number},
+            ExpiresIn=expires_in
+        )
+
+    def write_part(self, key: str, upload_id: str, part_number: int, data: bytes):
+        self.s3.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data)
+
+    def finish(self, key: str, upload_id: str, expected_parts: int) -> bool:
+        """Assemble the uploaded parts; False (and nothing assembled) while any are missing"""
+        parts = []
+        kwargs = {'Bucket': self.bucket, 'Key': key, 'UploadId': upload_id}
+        while True:
+            result = self.s3.list_parts(**kwargs)
+            parts.extend({'PartNumber': part['PartNumber'], 'ETag': part['ETag']} for part in result.get('Parts', []))
+            if not result.get('IsTruncated'):
+                break
+            kwargs['PartNumberMarker'] = result['NextPartNumberMarker']
+        if len(parts) != expected_parts:
+            return False
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+        )
+        return True
+
+    def read(self, key: str, chunk_bytes: int) -> Iterator[bytes]:
+        body = self.s3.get_object(Bucket=self.bucket, Key=key)['Body']
+        try:
+            yield from body.iter_chunks(chunk_bytes)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.s3.delete_object(Bucket=self.bucket, Key=key)
+
+    def download_url(self, key: str, filename: str, content_type: str, expires_in: int) -> str:
+        return self.s3.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': key,
+                'ResponseContentType': content_type,
+                'ResponseContentDisposition': _content_disposition(filename)
+            },
+            ExpiresIn=expires_in
+        )
+
+
+class LocalObjects:
+    """Attachment objects under a local directory (tests and local runs); parts go through the API"""
+
+    def __init__(self, directory: str, part_bytes: int = 1024 * 1024):
+        self.directory = directory
+        self.part_bytes = part_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, *key.split('/'))
+
+    def _part_path(self, upload_id: str, part_number: int) -> str:
+        return os.path.join(self.directory, '.uploads', upload_id, f"{part_number:05d}")
+
+    def begin(self, key: str, content_type: str) -> str:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.directory, '.uploads', upload_id))
+        return upload_id
+
+    def part_url(self, key: str, upload_id: str, part_number: int, expires_in: int) -> Optional[str]:
+        return None
+
+    def write_part(self, key: str, upload_id: str, part_number: int, data: bytes):
+        with open(self._part_path(upload_id, part_number), 'wb') as f:
+            f.write(data)
+
+    def finish(self, key: str, upload_id: str, expected_parts: int) -> bool:
+        directory = os.path.join(self.directory, '.uploads', upload_id)
+        names = sorted(os.listdir(directory))
+        if len(names) != expected_parts:
+            return False
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as target:
+            for name in names:
+                with open(os.path.join(directory, name), 'rb') as part:
+                    shutil.copyfileobj(part, target)
+        shutil.rmtree(directory)
+        return True
+
+    def read(self, key: str, chunk_bytes: int) -> Iterator[bytes]:
+        with open(self._path(key), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_bytes)
+                if not chunk:
+                    return
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def download_url(self, key: str, filename: str, content_type: str, expires_in: int) -> str:
+        return f"file://{os.path.abspath(self._path(key))}"
+
+
+class AttachmentStore:
+    """
+    Upload sessions and attachment records in the attachments table
+
+    Items are keyed by attachmentId and hold client, filename, contentType,
+    size, sha256, objectKey, uploadTokenSha256 and status: 'uploading' (with
+    uploadId and parts) until completed, 'completing' while one complete call
+    holds it (until lockedUntil), then 'ready'. Sessions expire after session_ttl_seconds
+    and ready attachments after retention_days (DynamoDB TTL on expiresAt;
+    the bucket's lifecycle rules clean up the objects).
+    """
+
+    def __init__(
+        self,
+        table,
+        objects,
+        prefix: str = 'attachments/',
+        session_ttl_seconds: int = 3600,
+        retention_days: int = 90,
+        read_bytes: int = 1024 * 1024,
+        upload_url_expiry_seconds: int = 3600,
+        complete_lock_seconds: int = 300,
+        clock=time.time
+    ):
+        self.table = table
+        self.objects = objects
+        self.prefix = prefix
+        self.session_ttl_seconds = session_ttl_seconds
+        self.retention_seconds = retention_days * 86400
+        self.read_bytes = read_bytes
+        self.upload_url_expiry_seconds = upload_url_expiry_seconds
+        self.complete_lock_seconds = complete_lock_seconds
+        self.clock = clock
+
+    @classmethod
+    def from_config(cls, config: Dict, table, objects) -> 'AttachmentStore':
+        """Build a store from the attachments config block"""
+        return cls(
+            table,
+            objects,
+            prefix=config.get('prefix', 'attachments/'),
+            session_ttl_seconds=config.get('session_ttl_seconds', 3600),
+            retention_days=config.get('retention_days', 90),
+            read_bytes=config.get('read_bytes', 1024 * 1024),
+            upload_url_expiry_seconds=config.get('upload_url_expiry_seconds', 3600),
+            complete_lock_seconds=config.get('complete_lock_seconds', 300)
+        )
+
+    def create(self, client: str, request: Dict, limits: Dict) -> Dict:
+        """
+        Open an upload session for {filename, contentType, size, sha256?}
+        Returns: the session response (attachmentId, uploadToken, partBytes and the part upload URLs)
+        """
+        filename = str(request.get('filename') or '').strip()
+        content_type = str(request.get('contentType') or '').lower()
+        size = request.get('size')
+        sha256 = str(request.get('sha256') or '').lower() or None
+        if not filename or len(filename) > 255 or '/' in filename or '\\' in filename:
+            raise AttachmentError(400, 'filename is required (at most 255 characters, no path)')
+        if content_type not in limits['allowed_types']:
+            raise AttachmentError(400, f"contentType must be one of: {', '.join(limits['allowed_types'])}")
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise AttachmentError(400, 'size must be a positive integer (bytes)')
+        if size > limits['max_bytes']:
+            raise AttachmentError(413, f"Attachments may be at most {limits['max_bytes']} bytes")
+        if sha256 is not None and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256)):
+            raise AttachmentError(400, 'sha256 must be a hex SHA-256 digest')
+
+        now = int(self.clock())
+        attachment_id = str(uuid.uuid4())
+        key = f"{self.prefix}{client}/{attachment_id}"
+        part_bytes = self.objects.part_bytes
+        parts = math.ceil(size / part_bytes)
+        upload_id = self.objects.begin(key, content_type)
+        upload_token = secrets.token_urlsafe(32)
+
+        item = {
+            'attachmentId': attachment_id,
+            'client': client,
+            'filename': filename,
+            'contentType': content_type,
+            'size': size,
+            'objectKey': key,
+            'uploadId': upload_id,
+            'parts': parts,
+            'partBytes': part_bytes,
+            'uploadTokenSha256': hash_upload_token(upload_token),
+            'status': 'uploading',
+            'createdAt': now,
+            'expiresAt': now + self.session_ttl_seconds
+        }
+        if sha256 is not None:
+            item['sha256'] = sha256
+        self.table.put_item(Item=item)
+
+        return {
+            'attachmentId': attachment_id,
+            'uploadToken': upload_token,
+            'partBytes': part_bytes,
+            'expiresAt': item['expiresAt'],
+            'parts': [
+                {
+                    'partNumber': number,
+                    'method': 'PUT',
+                    'url': (self.objects.part_url(key, upload_id, number, self.upload_url_expiry_seconds)
+                            or f"/forms/attachments/{attachment_id}/parts/{number}")
+                }
+                for number in range(1, parts + 1)
+            ],
+            'completeUrl': f"/forms/attachments/{attachment_id}/complete"
+        }
+
+    def _session(self, attachment_id: str, upload_token: str) -> Dict:
+        item = self.table.get_item(Key={'attachmentId': attachment_id}, ConsistentRead=True).get('Item')
+        if item is None or int(item['expiresAt']) < self.clock():
+            raise AttachmentError(404, 'Attachment not found')
+        if not upload_token:
+            raise AttachmentError(401, 'Missing upload token')
+        if not hmac.compare_digest(hash_upload_token(upload_token), item.get('uploadTokenSha256', '')):
+            raise AttachmentError(403, 'Invalid upload token')
+        return item
+
+    def write_part(self, attachment_id: str, upload_token: str, part_number: int, data: bytes):
+        """Store one part sent through the API; every part but the last must be exactly partBytes"""
+        item = self._session(attachment_id, upload_token)
+        if item['status'] != 'uploading':
+            raise AttachmentError(409, 'Attachment upload is already complete')
+        parts, part_bytes, size = int(item['parts']), int(item['partBytes']), int(item['size'])
+        if not 1 <= part_number <= parts:
+            raise AttachmentError(400, f"partNumber must be between 1 and {parts}")
+        expected = part_bytes if part_number < parts else size - part_bytes * (parts - 1)
+        if len(data) != expected:
+            raise AttachmentError(400, f"Part {part_number} must be {expected} bytes")
+        self.objects.write_part(item['objectKey'], item['uploadId'], part_number, data)
+
+    def complete(self, attachment_id: str, upload_token: str, limits_for: Callable[[str], Optional[Dict]]) -> Dict:
+        """
+        Assemble and verify an upload (size, checksum and sniffed type) against its client's limits,
+        then mark it ready. A rejected upload is deleted; completing a ready attachment returns it again.
+        Raises: AttachmentError (409) while a concurrent call is completing it
+        """
+        item = self._session(attachment_id, upload_token)
+        if item['status'] == 'ready':
+            return self.summary(item)
+        limits = limits_for(item['client'])
+        if limits is None:
+            raise AttachmentError(400, 'Attachments are not enabled for this client')
+        if not self._claim(item):
+            return self._completed(attachment_id)
+
+        key = item['objectKey']
+        try:
+            finished = self.objects.finish(key, item['uploadId'], int(item['parts']))
+        except Exception:
+            self._release(item)
+            raise
+        if not finished:
+            self._release(item)
+            raise AttachmentError(400, 'Upload is missing parts')
+
+        digest = hashlib.sha256()
+        head = b''
+        size = 0
+        for chunk in self.objects.read(key, self.read_bytes):
+            if len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+            digest.update(chunk)
+            size += len(chunk)
+            if size > limits['max_bytes']:
+                break
+
+        content_type = sniff_type(head)
+        error = None
+        if size != int(item['size']):
+            error = (413 if size > limits['max_bytes'] else 400, f"Uploaded {size} bytes, expected {item['size']}")
+        elif item.get('sha256') and digest.hexdigest() != item['sha256']:
+            error = (400, 'Checksum mismatch')
+        elif content_type is None or content_type not in limits['allowed_types']:
+            error = (400, 'File content is not an allowed type')
+        if error is not None:
+            self.objects.delete(key)
+            self._reject(item)
+            raise AttachmentError(*error)
+
+        now = int(self.clock())
+        item.update(contentType=content_type, sha256=digest.hexdigest(), status='ready',
+                    completedAt=now, expiresAt=now + self.retention_seconds)
+        self.table.update_item(
+            Key={'attachmentId': attachment_id},
+            UpdateExpression='SET #status = :ready, contentType = :type, sha256 = :sha256, '
+                             'completedAt = :now, expiresAt = :expires REMOVE uploadId, lockedUntil',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':ready': 'ready',
+                ':type': content_type,
+                ':sha256': item['sha256'],
+                ':now': now,
+                ':expires': item['expiresAt']
+            }
+        )
+        return self.summary(item)
+
+    def _claim(self, item: Dict) -> bool:
+        """Move an upload to 'completing' (or take over an expired claim); False when another call holds it"""
+        now = int(self.clock())
+        try:
+            self.table.update_item(
+                Key={'attachmentId': item['attachmentId']},
+                UpdateExpression='SET #status = :completing, lockedUntil = :locked',
+                ConditionExpression='#status = :uploading OR (#status = :completing AND lockedUntil < :now)',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={
+                    ':completing': 'completing',
+                    ':uploading': 'uploading',
+                    ':locked': now + self.complete_lock_seconds,
+                    ':now': now
+                }
+            )
+            return True
+        except Exception as e:
+            if _conditional_check_failed(e):
+                return False
+            raise
+
+    def _completed(self, attachment_id: str) -> Dict:
+        """The result of the call that claimed the upload: its summary once ready"""
+        item = self.table.get_item(Key={'attachmentId': attachment_id}, ConsistentRead=True).get('Item')
+        if item is None:
+            raise AttachmentError(404, 'Attachment not found')
+        if item['status'] != 'ready':
+            raise AttachmentError(409, 'Attachment upload is being completed, retry shortly')
+        return self.summary(item)
+
+    def _release(self, item: Dict):
+        """Hand a claimed upload back to 'uploading' so missing parts can still be sent"""
+        self.table.update_item(
+            Key={'attachmentId': item['attachmentId']},
+            UpdateExpression='SET #status = :uploading REMOVE lockedUntil',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':uploading': 'uploading'}
+        )
+
+    def _reject(self, item: Dict):
+        self.table.delete_item(Key={'attachmentId': item['attachmentId']})
+
+    def resolve(self, client: str, attachment_ids: List, limits: Optional[Dict]) -> List[Dict]:
+        """Summaries of a submission's ready attachments, in order; raises AttachmentError"""
+        if not isinstance(attachment_ids, list) or not all(isinstance(value, str) for value in attachment_ids):
+            raise AttachmentError(400, 'attachments must be a list of attachment IDs')
+        if limits is None:
+            raise AttachmentError(400, 'Attachments are not enabled for this client')
+        if len(attachment_ids) > limits['max_per_submission']:
+            raise AttachmentError(400, f"A submission may reference at most {limits['max_per_submission']} attachments")
+
+        summaries = []
+        for attachment_id in dict.fromkeys(attachment_ids):
+            item = self.table.get_item(Key={'attachmentId': attachment_id}).get('Item')
+            if item is None or item['client'] != client or item['status'] != 'ready':
+                raise AttachmentError(400, f"Attachment {attachment_id} not found or not uploaded")
+            summaries.append(self.summary(item))
+        return summaries
+
+    def download(self, attachment_id: str, expires_in: int) -> str:
+        """Short-lived URL of a ready attachment's file"""
+        item = self.table.get_item(Key={'attachmentId': attachment_id}).get('Item')
+        if item is None or item['status'] != 'ready':
+            raise AttachmentError(404, 'Attachment not found')
+        return self.objects.download_url(item['objectKey'], item['filename'], item['contentType'], expires_in)
+
+    @staticmethod
+    def summary(item: Dict) -> Dict:
+        return {
+            'attachmentId': item['attachmentId'],
+            'filename': item['filename'],
+            'contentType': item['contentType'],
+            'size': int(item['size']),
+            'sha256': item.get('sha256')
+        }
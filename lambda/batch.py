@@ -0,0 +1,102 @@
+"""
+Batch writes for POST /forms/batch and the archive job
+Puts (or deletes) items with batch_write_item in chunks of up to 25
+(the DynamoDB maximum), chunks in parallel, retrying UnprocessedItems
+with exponential backoff and jitter
+"""
+import random
+import time
+from typing import Dict, List
+
+from fanout import get_executor
+from logger import log
+
+MAX_CHUNK_SIZE = 25
+
+
+class BatchWriter:
+    """
+    Writes to one table in parallel batch_write_item chunks
+
+    Chunks run on the named fan-out pool (max_workers threads, shared by
+    writers with the same pool name). Each chunk retries its UnprocessedItems
+    up to max_attempts times. Items (or keys) that are still unprocessed, or
+    whose chunk failed outright, are returned to the caller so they can be
+    reported per item.
+    """
+
+    def __init__(
+        self,
+        dynamodb,
+        table_name: str,
+        chunk_size: int = MAX_CHUNK_SIZE,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 0.05,
+        retry_max_seconds: float = 1.0,
+        max_workers: int = 4,
+        pool: str = 'batch_write',
+        sleep=time.sleep
+    ):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_workers = max_workers
+        self.pool = pool
+        self.sleep = sleep
+
+    @classmethod
+    def from_config(cls, config: Dict, dynamodb, table_name: str) -> 'BatchWriter':
+        """Build a writer from the batch config block"""
+        return cls(
+            dynamodb,
+            table_name,
+            chunk_size=config.get('chunk_size', MAX_CHUNK_SIZE),
+            max_attempts=config.get('max_write_attempts', 5),
+            retry_base_seconds=config.get('retry_base_seconds', 0.05),
+            retry_max_seconds=config.get('retry_max_seconds', 1.0),
+            max_workers=config.get('max_workers', 4)
+        )
+
+    def write(self, items: List[Dict]) -> List[Dict]:
+        """
+        Write items; returns the ones that could not be written
+        """
+        unwritten = self._run([{'PutRequest': {'Item': item}} for item in items])
+        return [request['PutRequest']['Item'] for request in unwritten]
+
+    def delete(self, keys: List[Dict]) -> List[Dict]:
+        """
+        Delete items by key; returns the keys that could not be deleted
+        """
+        unwritten = self._run([{'DeleteRequest': {'Key': key}} for key in keys])
+        return [request['DeleteRequest']['Key'] for request in unwritten]
+
+    def _run(self, requests: List[Dict]) -> List[Dict]:
+        chunks = [requests[start:start + self.chunk_size] for start in range(0, len(requests), self.chunk_size)]
+        if len(chunks) <= 1:
+            return self.write_chunk(chunks[0]) if chunks else []
+        executor = get_executor(self.pool, self.max_workers)
+        futures = [executor.submit(self.write_chunk, chunk) for chunk in chunks]
+        unwritten = []
+        for future in futures:
+            unwritten.extend(future.result())
+        return unwritten
+
+    def write_chunk(self, requests: List[Dict]) -> List[Dict]:
+        """Send one chunk of write requests; returns the requests left unprocessed"""
+        for attempt in range(self.max_attempts):
+            try:
+                result = self.dynamodb.batch_write_item(RequestItems={self.table_name: requests})
+            except Exception as e:
+                log.error('Batch write failed', items=len(requests), error=str(e))
+                break
+            requests = result.get('UnprocessedItems', {}).get(self.table_name, [])
+            if not requests:
+                return []
+            if attempt + 1 < self.max_attempts:
+                delay = min(self.retry_base_seconds * 2 ** attempt, self.retry_max_seconds)
+                self.sleep(delay * (0.5 + random.random() / 2))
+        return requests
@@ -0,0 +1,274 @@
+"""
+Client registry for forms lambda
+Two backends behind the same lookups (client(), `in`, client_names()):
+
+- ClientRegistry: every client in one SSM parameter. Caches it with a TTL,
+  refreshes it off the request path (stale-while-revalidate), keeps the last
+  known good copy when the source fails, and skips re-parsing when the
+  parameter version is unchanged.
+- ClientStore: one record per client (an SSM parameter per client, or an
+  item in a DynamoDB clients table), loaded on demand into a bounded LRU
+  with a TTL, with a negative cache for unknown names.
+"""
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from logger import log
+
+# Names that can be looked up in a per-client backend (SSM parameter path segment, DynamoDB key)
+CLIENT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+class ClientRecord(NamedTuple):
+    """One client's config, with its form types as a set"""
+    name: str
+    config: Dict
+    form_types: FrozenSet[str]
+    version: Any
+
+
+def build_record(name: str, version: Any, config: Dict) -> ClientRecord:
+    return ClientRecord(name, config, frozenset(config.get('form_types', ())), version)
+
+
+class ClientSnapshot(NamedTuple):
+    """Immutable view of the registry at one parameter version"""
+    version: Any
+    clients: Dict[str, Dict]
+    allowed_clients: FrozenSet[str]
+    client_list: Tuple[str, ...]
+    records: Dict[str, ClientRecord]
+
+
+EMPTY_SNAPSHOT = ClientSnapshot(None, {}, frozenset(), (), {})
+
+
+def build_snapshot(version: Any, clients: Dict[str, Dict]) -> ClientSnapshot:
+    """Index a parsed clients document"""
+    records = {name: build_record(name, version, config) for name, config in clients.items()}
+    return ClientSnapshot(version, clients, frozenset(clients), tuple(clients), records)
+
+
+class ClientRegistry:
+    """
+    TTL-cached client registry
+
+    fetch() returns (version, raw_json). The first read loads synchronously;
+    after that a snapshot older than ttl_seconds is still served while a
+    single background thread re-fetches it. If the version has not changed
+    the raw value is not parsed again. Fetch or parse errors keep the last
+    known good snapshot; with nothing loaded yet, reads retry at most every
+    error_retry_seconds.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Tuple[Any, str]],
+        ttl_seconds: float = 60,
+        error_retry_seconds: float = 10,
+        clock=time.monotonic
+    ):
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.error_retry_seconds = error_retry_seconds
+        self.clock = clock
+
+        self._snapshot = EMPTY_SNAPSHOT
+        self._loaded = False
+        self._fetched_at = 0.0
+        self._failed_at = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, fetch: Callable[[], Tuple[Any, str]]) -> 'ClientRegistry':
+        """Build a registry from the client_registry config block"""
+        return cls(
+            fetch,
+            ttl_seconds=config.get('ttl_seconds', 60),
+            error_retry_seconds=config.get('error_retry_seconds', 10)
+        )
+
+    def snapshot(self) -> ClientSnapshot:
+        """Current snapshot; never blocks once something has been loaded"""
+        now = self.clock()
+        if not self._loaded:
+            if self._failed_at is None or now - self._failed_at >= self.error_retry_seconds:
+                self.refresh()
+            return self._snapshot
+
+        if now - self._fetched_at >= self.ttl_seconds:
+            self._refresh_in_background()
+        return self._snapshot
+
+    def get(self, client: str) -> Optional[Dict]:
+        return self.snapshot().clients.get(client)
+
+    def client(self, name: str) -> Optional[ClientRecord]:
+        return self.snapshot().records.get(name)
+
+    def client_names(self) -> Optional[Tuple[str, ...]]:
+        return self.snapshot().client_list
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.snapshot().allowed_clients
+
+    def refresh(self) -> bool:
+        """Fetch synchronously; returns False (keeping the current snapshot) on error"""
+        try:
+            version, raw = self.fetch()
+            if not self._loaded or version != self._snapshot.version:
+                self._snapshot = build_snapshot(version, json.loads(raw))
+            self._loaded = True
+            self._fetched_at = self.clock()
+            self._failed_at = None
+            return True
+        except Exception as e:
+            self._failed_at = self.clock()
+            log.error('Error loading clients', serving='last known good' if self._loaded else 'empty', error=str(e))
+            if self._loaded:
+                # Back off before the next background attempt
+                self._fetched_at = self._failed_at - self.ttl_seconds + self.error_retry_seconds
+            return False
+        finally:
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name='client-registry-refresh', daemon=True).start()
+
+
+class ClientStore:
+    """
+    Per-client registry with a bounded, TTL'd LRU and a negative cache
+
+    fetch(name) returns (version, raw JSON) for a client, or None when it
+    does not exist. A record is loaded on its first lookup and kept for
+    ttl_seconds; when it expires with the version unchanged the raw value is
+    not parsed again. Unknown names are remembered for negative_ttl_seconds,
+    and names that no backend could store are rejected without a fetch, so a
+    flood of invalid clients costs at most one fetch per name. Fetch errors
+    are not cached as misses: an expired record keeps being served (retried
+    every error_retry_seconds), and without one the lookup fails closed.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Optional[Tuple[Any, str]]],
+        ttl_seconds: float = 60,
+        max_entries: int = 2048,
+        negative_ttl_seconds: float = 30,
+        negative_max_entries: int = 4096,
+        error_retry_seconds: float = 10,
+        clock=time.monotonic
+    ):
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.negative_max_entries = negative_max_entries
+        self.error_retry_seconds = error_retry_seconds
+        self.clock = clock
+
+        self._records: 'OrderedDict[str, Tuple[float, ClientRecord]]' = OrderedDict()
+        self._missing: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, fetch: Callable[[str], Optional[Tuple[Any, str]]]) -> 'ClientStore':
+        """Build a store from the client_registry config block"""
+        return cls(
+            fetch,
+            ttl_seconds=config.get('ttl_seconds', 60),
+            max_entries=config.get('max_entries', 2048),
+            negative_ttl_seconds=config.get('negative_ttl_seconds', 30),
+            negative_max_entries=config.get('negative_max_entries', 4096),
+            error_retry_seconds=config.get('error_retry_seconds', 10)
+        )
+
+    def client(self, name: str) -> Optional[ClientRecord]:
+        """A client's record, loading it on a miss; None for unknown clients"""
+        if not isinstance(name, str) or not CLIENT_NAME_PATTERN.match(name):
+            return None
+
+        now = self.clock()
+        with self._lock:
+            entry = self._records.get(name)
+            if entry is not None:
+                self._records.move_to_end(name)
+                if entry[0] > now:
+                    return entry[1]
+            else:
+                missing_until = self._missing.get(name)
+                if missing_until is not None:
+                    if missing_until > now:
+                        return None
+                    del self._missing[name]
+
+        stale = entry[1] if entry is not None else None
+        try:
+            fetched = self.fetch(name)
+            if fetched is None:
+                self._forget(name, now + self.negative_ttl_seconds)
+                return None
+            version, raw = fetched
+            record = stale if stale is not None and stale.version == version else build_record(
+                name, version, json.loads(raw)
+            )
+        except Exception as e:
+            log.error('Error loading client', client=name, serving='last known good' if stale else 'none',
+                      error=str(e))
+            if stale is not None:
+                self._remember(name, now + self.error_retry_seconds, stale)
+            return stale
+
+        self._remember(name, now + self.ttl_seconds, record)
+        return record
+
+    def get(self, client: str) -> Optional[Dict]:
+        record = self.client(client)
+        return record.config if record is not None else None
+
+    def client_names(self) -> Optional[Tuple[str, ...]]:
+        """Per-client backends are not enumerated"""
+        return None
+
+    def __contains__(self, name: str) -> bool:
+        return self.client(name) is not None
+
+    def _remember(self, name: str, expires_at: float, record: ClientRecord):
+        with self._lock:
+            self._records[name] = (expires_at, record)
+            self._records.move_to_end(name)
+            if len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def _forget(self, name: str, missing_until: float):
+        with self._lock:
+            self._records.pop(name, None)
+            self._missing[name] = missing_until
+            self._missing.move_to_end(name)
+            if len(self._missing) > self.negative_max_entries:
+                self._missing.popitem(last=False)
+
+
+def build_client_registry(config: Dict, fetch_all: Callable[[], Tuple[Any, str]],
+                          fetchers: Dict[str, Callable[[str], Optional[Tuple[Any, str]]]]):
+    """
+    Build the registry for client_registry.backend
+    'ssm' reads every client from one parameter with fetch_all; any other
+    backend names a per-client fetcher in fetchers
+    """
+    backend = config.get('backend', 'ssm')
+    if backend == 'ssm':
+        return ClientRegistry.from_config(config, fetch_all)
+    if backend not in fetchers:
+        raise ValueError(f"Unknown client_registry.backend: {backend}")
+    return ClientStore.from_config(config, fetchers[backend])
@@ -0,0 +1,82 @@
+"""
+JSON codec for forms lambda
+Request bodies, response bodies, log lines and stored form data go through
+loads/dumps here. orjson is used when the layer is installed (several times
+faster in both directions), otherwise stdlib json configured to produce the
+same text: compact separators, non-ASCII left as UTF-8. Decimal (what boto3
+returns for numbers), datetime/date, sets and bytes are encoded the same way
+by both.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Union
+
+# Optional: orjson (a compiled wheel; shipped as a Lambda layer when wanted)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Raised by loads for malformed input, whichever library parsed it (orjson's error subclasses it)
+JSONDecodeError = json.JSONDecodeError
+
+
+def encode_default(value: Any) -> Any:
+    """Encoder fallback for the types boto3 and the handler produce (Decimal numbers, datetimes, sets, bytes)"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', 'replace')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if ORJSON_AVAILABLE:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(value: Any, default: Callable[[Any], Any] = encode_default) -> str:
+        # orjson renders datetimes itself (isoformat, as encode_default does)
+        return orjson.dumps(value, default=default, option=_OPTIONS).decode('utf-8')
+
+    def dumps_bytes(value: Any, default: Callable[[Any], Any] = encode_default) -> bytes:
+        return orjson.dumps(value, default=default, option=_OPTIONS)
+else:
+    _decode = json.JSONDecoder().decode
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return _decode(data.decode('utf-8') if isinstance(data, (bytes, bytearray)) else data)
+
+    _encode = json.JSONEncoder(default=encode_default, separators=(',', ':'), ensure_ascii=False).encode
+
+    def dumps(value: Any, default: Callable[[Any], Any] = encode_default) -> str:
+        if default is encode_default:
+            return _encode(value)
+        return json.dumps(value, default=default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps_bytes(value: Any, default: Callable[[Any], Any] = encode_default) -> bytes:
+        return dumps(value, default).encode('utf-8')
+
+
+class Envelope:
+    """
+    An API response serialized once (fixed error bodies, /forms/info)
+    respond() returns a new top-level dict each time; headers and body are
+    shared, so callers must not mutate them.
+    """
+    __slots__ = ('status_code', 'headers', 'body')
+
+    def __init__(self, status_code: int, body: Any, headers: Dict[str, str]):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = dumps(body)
+
+    def respond(self) -> Dict:
+        return {'statusCode': self.status_code, 'headers': self.headers, 'body': self.body}
@@ -0,0 +1,224 @@
+"""
+Notification digests for forms lambda
+Clients in digest mode get one summary email per window instead of one
+email per submission. Submissions are buffered in a DynamoDB item per
+(client, window); a scheduled sender mails each window once it has closed.
+"""
+import time
+from typing import Callable, Dict, List, Optional
+
+from logger import log
+from validators import escape_html
+
+DIGEST_PENDING = '1'
+
+
+def is_digest_client(client_config: Dict) -> bool:
+    return client_config.get('notification_mode') == 'digest'
+
+
+def digest_settings(client_config: Dict, defaults: Dict) -> Optional[Dict]:
+    """Window length (seconds) and item cap for a digest-mode client, or None in immediate mode"""
+    if not is_digest_client(client_config):
+        return None
+    return {
+        'window_seconds': int(client_config.get('digest_window_minutes', defaults['window_minutes'])) * 60,
+        'max_items': int(client_config.get('digest_max_items', defaults['max_items']))
+    }
+
+
+def _conditional_check_failed(error: Exception) -> bool:
+    # botocore ClientError, matched by code so this module doesn't import botocore
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+
+class DigestStore:
+    """
+    Buffers digest entries and finds windows that are due
+
+    Each window item holds itemCount (every buffered submission) and an
+    items list capped at max_items. Until it is sent the item also carries
+    pending/windowEnd, which key the sparse PendingIndex that the sender
+    queries; sending removes them.
+    """
+
+    def __init__(self, table, index_name: str = 'PendingIndex', retention_seconds: int = 7 * 86400,
+                 clock=time.time):
+        self.table = table
+        self.index_name = index_name
+        self.retention_seconds = retention_seconds
+        self.clock = clock
+
+    def add(self, client: str, entry: Dict, window_seconds: int, max_items: int) -> bool:
+        """
+        Buffer an entry in the client's current window
+        Returns: False if that window was already sent (caller should notify immediately)
+        """
+        now = int(self.clock())
+        window_start = now - now % window_seconds
+        window_end = window_start + window_seconds
+        key = {'digestKey': f"{client}#{window_start}"}
+        values = {
+            ':one': 1,
+            ':client': client,
+            ':start': window_start,
+            ':end': window_end,
+            ':pending': DIGEST_PENDING,
+            ':ttl': window_end + self.retention_seconds
+        }
+        names = {'#client': 'client', '#pending': 'pending'}
+        base = ('ADD itemCount :one SET #client = :client, windowStart = :start, windowEnd = :end, '
+                'expiresAt = :ttl, #pending = if_not_exists(#pending, :pending)')
+
+        try:
+            self.table.update_item(
+                Key=key,
+                UpdateExpression=base + ', #items = list_append(if_not_exists(#items, :empty), :entry)',
+                ConditionExpression='attribute_not_exists(sentAt) AND (attribute_not_exists(#items) OR size(#items) < :cap)',
+                ExpressionAttributeNames=dict(names, **{'#items': 'items'}),
+                ExpressionAttributeValues=dict(values, **{':empty': [], ':entry': [entry], ':cap': max_items})
+            )
+            return True
+        except Exception as e:
+            if not _conditional_check_failed(e):
+                raise
+
+        # Item list is full (or the window was sent): count it without listing it
+        try:
+            self.table.update_item(
+                Key=key,
+                UpdateExpression=base,
+                ConditionExpression='attribute_not_exists(sentAt)',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except Exception as e:
+            if not _conditional_check_failed(e):
+                raise
+        return False
+
+    def due(self, limit: int = 50) -> List[Dict]:
+        """Windows that have closed and not been sent"""
+        result = self.table.query(
+            IndexName=self.index_name,
+            KeyConditionExpression='#pending = :pending AND windowEnd <= :now',
+            ExpressionAttributeNames={'#pending': 'pending'},
+            ExpressionAttributeValues={':pending': DIGEST_PENDING, ':now': int(self.clock())},
+            Limit=limit
+        )
+        return result.get('Items', [])
+
+    def claim(self, window: Dict) -> bool:
+        """Mark a window as sent; False if another sender got there first"""
+        try:
+            self.table.update_item(
+                Key={'digestKey': window['digestKey']},
+                UpdateExpression='SET sentAt = :now REMOVE #pending',
+                ConditionExpression='attribute_not_exists(sentAt)',
+                ExpressionAttributeNames={'#pending': 'pending'},
+                ExpressionAttributeValues={':now': int(self.clock())}
+            )
+            return True
+        except Exception as e:
+            if _conditional_check_failed(e):
+                return False
+            raise
+
+    def release(self, window: Dict):
+        """Undo a claim after a failed send so the next run retries it"""
+        self.table.update_item(
+            Key={'digestKey': window['digestKey']},
+            UpdateExpression='SET #pending = :pending REMOVE sentAt',
+            ExpressionAttributeNames={'#pending': 'pending'},
+            ExpressionAttributeValues={':pending': DIGEST_PENDING}
+        )
+
+    def send_due(self, send: Callable[[Dict], None], limit: int = 50) -> Dict[str, int]:
+        """
+        Send every due window with send(window)
+        Returns: counts of sent, failed and skipped windows
+        """
+        summary = {'sent': 0, 'failed': 0, 'skipped': 0}
+        for window in self.due(limit):
+            if not self.claim(window):
+                summary['skipped'] += 1
+                continue
+            try:
+                send(window)
+                summary['sent'] += 1
+            except Exception as e:
+                log.error('Digest send failed', digestKey=window['digestKey'], error=str(e))
+                self.release(window)
+                summary['failed'] += 1
+        return summary
+
+
+def digest_entry(item: Dict) -> Dict:
+    """Compact summary of a submission for the digest list"""
+    return {
+        'submissionId': item['submissionId'],
+        'formType': item['formType'],
+        'timestamp': item['timestampIso'],
+        'email': item.get('email', '')
+    }
+
+
+def render_digest(client_name: str, window: Dict) -> Dict[str, str]:
+    """Render a digest window as subject, text and HTML bodies"""
+    count = int(window.get('itemCount', 0))
+    items = window.get('items') or []
+    hidden = count - len(items)
+    start = time.strftime('%Y-%m-%d %H:%M', time.gmtime(int(window['windowStart'])))
+    end = time.strftime('%Y-%m-%d %H:%M', time.gmtime(int(window['windowEnd'])))
+
+    lines = [f"{entry['timestamp']}  {entry['formType']}  {entry['email']}  {entry['submissionId']}" for entry in items]
+    rows = ''.join(
+        f"<tr><td style='padding:8px;border:1px solid #ddd;'>{escape_html(entry['timestamp'])}</td>"
+        f"<td style='padding:8px;border:1px solid #ddd;'>{escape_html(entry['formType'])}</td>"
+        f"<td style='padding:8px;border:1px solid #ddd;'>{escape_html(entry['email'])}</td>"
+        f"<td style='padding:8px;border:1px solid #ddd;'>{escape_html(entry['submissionId'])}</td></tr>"
+        for entry in items
+    )
+    more = f"...and {hidden} more" if hidden > 0 else ""
+
+    text = (f"\n{count} new form submission(s) for {client_name}\n"
+            f"Window: {start} - {end} UTC\n\n" + "\n".join(lines) + (f"\n{more}" if more else "") +
+            "\n\n---\nThis is an automated digest from GadgetCloud Forms.\n")
+    html = f"""
+<html>
+<head></head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+  <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">
+      {count} New Form Submission(s)
+    </h2>
+    <p><strong>Client:</strong> {escape_html(client_name)}<br>
+       <strong>Window:</strong> {start} - {end} UTC</p>
+    <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
+      <thead>
+        <tr style="background-color: #3498db; color: white;">
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Submitted</th>
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Form Type</th>
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Email</th>
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Submission ID</th>
+        </tr>
+      </thead>
+      <tbody>
+        {rows}
+      </tbody>
+    </table>
+    <p>{more}</p>
+    <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
+    <p style="color: #7f8c8d; font-size: 12px;">
+      This is an automated digest from GadgetCloud Forms.
+    </p>
+  </div>
+</body>
+</html>
+"""
+    return {
+        'subject': f"{count} new form submission(s) - {client_name}",
+        'text': text,
+        'html': html
+    }
@@ -0,0 +1,297 @@
+"""
+Duplicate and near-duplicate detection for form submissions
+Double-clicks and spam waves send the same (or almost the same) body from
+many sources, so idempotency keys don't catch them. Each sanitized
+submission gets an exact fingerprint (a hash of its normalized form data)
+and, when its long text fields have enough words, a MinHash signature of
+their word shingles split into bands. Fingerprints are looked up in a
+warm-container LRU and a TTL'd DynamoDB table; the client's policy then
+decides whether a repeat is stored as usual, tagged, stored without
+notifications, or dropped.
+"""
+import hashlib
+import html
+import json
+import string
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from batch import BatchWriter
+
+POLICIES = ('allow', 'tag', 'suppress', 'drop')
+
+# Side effects a suppressed duplicate skips (stats still count it)
+NOTIFY_EFFECTS = frozenset(('notification', 'autoReply', 'webhook'))
+
+DEFAULT_TEXT_FIELDS = ('message', 'comments', 'description')
+
+# MinHash values are 16-bit, so one 64-byte blake2b digest yields up to 32 of them per shingle
+MAX_SIGNATURE_SIZE = 32
+
+# Stripped from the ends of words before shingling
+_PUNCTUATION = string.punctuation + '\u2018\u2019\u201c\u201d\u2013\u2014\u2026'
+
+
+class Fingerprints(NamedTuple):
+    """A submission's table keys (the exact key first, then one per band) and its MinHash signature"""
+    keys: Tuple[str, ...]
+    signature: Optional[Tuple[int, ...]]
+
+
+class Match(NamedTuple):
+    """An earlier submission with the same (exact) or similar (near) content"""
+    kind: str
+    submission_id: str
+    similarity: float
+
+
+class Duplicate(NamedTuple):
+    """A match and the policy that applies to it (tag, suppress or drop)"""
+    kind: str
+    submission_id: str
+    policy: str
+
+
+def duplicate_policy(client_config: Dict, defaults: Dict) -> Optional[Dict]:
+    """
+    A client's policies and window (its duplicates block over the defaults), or None when disabled
+    A client block that sets a policy turns detection on unless it also sets enabled
+    """
+    overrides = client_config.get('duplicates') or {}
+    if not overrides.get('enabled', 'policy' in overrides or defaults['enabled']):
+        return None
+    policy = overrides.get('policy', defaults['policy'])
+    near_policy = overrides.get('near_policy', defaults.get('near_policy')) or policy
+    return {
+        'policy': policy if policy in POLICIES else 'tag',
+        'near_policy': near_policy if near_policy in POLICIES else 'tag',
+        'window_seconds': int(overrides.get('window_seconds', defaults['window_seconds']))
+    }
+
+
+def duplicate_tags(tags):
+    """Submission tags with 'duplicate' added (tags are a list or a comma-separated string)"""
+    if isinstance(tags, list):
+        return tags if 'duplicate' in tags else [*tags, 'duplicate']
+    if isinstance(tags, str) and tags:
+        return tags if 'duplicate' in tags.split(',') else f"{tags},duplicate"
+    return 'duplicate'
+
+
+def normalize(value):
+    """Strings unescaped, case-folded and whitespace-collapsed, at any depth"""
+    if isinstance(value, str):
+        return ' '.join(html.unescape(value).split()).casefold()
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    return value
+
+
+def minhash(tokens: Sequence[str], shingle_size: int = 3, size: int = 24) -> Tuple[int, ...]:
+    """MinHash signature of the distinct word shingles of tokens (size 16-bit values)"""
+    if len(tokens) <= shingle_size:
+        shingles = {' '.join(tokens)}
+    else:
+        shingles = {' '.join(tokens[start:start + shingle_size]) for start in range(len(tokens) - shingle_size + 1)}
+    # One digest per shingle holds every hash function's value; each function's minimum is a strided slice
+    blake2b = hashlib.blake2b
+    data = b''.join([blake2b(shingle.encode('utf-8'), digest_size=size * 2).digest() for shingle in shingles])
+    values = struct.unpack(f"<{len(data) // 2}H", data)
+    return tuple([min(values[function::size]) for function in range(size)])
+
+
+def similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures (the fraction of equal values)"""
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+def _pack_signature(signature: Optional[Sequence[int]]) -> str:
+    return ''.join(f"{value:04x}" for value in signature) if signature else ''
+
+
+def _unpack_signature(packed: Optional[str]) -> Optional[Tuple[int, ...]]:
+    if not packed:
+        return None
+    return tuple(int(packed[start:start + 4], 16) for start in range(0, len(packed), 4))
+
+
+class DuplicateDetector:
+    """
+    Fingerprints submissions and finds earlier ones with the same content
+
+    The exact key is 'exact#{client}#{formType}#{hash}' over the normalized
+    form data minus ignore_fields. When the text_fields together have at
+    least min_text_tokens words, the MinHash signature of their first
+    max_text_tokens words (signature_size values) is cut into bands and
+    each band becomes a key
+    'near#{client}#{formType}#{band}#{values}'. Texts that share a band are
+    candidates; one whose signatures agree on at least min_similarity of
+    their values is a near match, so finding one costs a few key lookups,
+    not a scan. find() answers from the LRU when it can and otherwise reads
+    the missing keys with one batch_get_item; record() writes them with one
+    batch_write_item, each item holding the submissionId, the signature and
+    an expiresAt TTL. Keys the table leaves unprocessed count as misses.
+    """
+
+    def __init__(
+        self,
+        dynamodb=None,
+        table_name: Optional[str] = None,
+        text_fields: Sequence[str] = DEFAULT_TEXT_FIELDS,
+        ignore_fields: Sequence[str] = (),
+        min_text_tokens: int = 8,
+        max_text_tokens: int = 500,
+        shingle_size: int = 3,
+        signature_size: int = 24,
+        bands: int = 8,
+        min_similarity: float = 0.7,
+        window_seconds: int = 86400,
+        cache_entries: int = 4096,
+        clock=time.time
+    ):
+        if not 0 < signature_size <= MAX_SIGNATURE_SIZE or signature_size % bands:
+            raise ValueError(f"signature_size must be at most {MAX_SIGNATURE_SIZE} and a multiple of bands")
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.text_fields = tuple(text_fields)
+        self.ignore_fields = frozenset(ignore_fields)
+        self.min_text_tokens = min_text_tokens
+        self.max_text_tokens = max_text_tokens
+        self.shingle_size = shingle_size
+        self.signature_size = signature_size
+        self.bands = bands
+        self.min_similarity = min_similarity
+        self.window_seconds = window_seconds
+        self.cache_entries = cache_entries
+        self.clock = clock
+
+        self._writer = (BatchWriter(dynamodb, table_name, max_attempts=3, max_workers=1, pool='fingerprint_write')
+                        if table_name else None)
+        # key -> (expiresAt, submissionId, signature)
+        self._cache: 'OrderedDict[str, Tuple[float, str, Optional[Tuple[int, ...]]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, dynamodb=None, table_name: Optional[str] = None) -> 'DuplicateDetector':
+        """Build a detector from the duplicates config block"""
+        return cls(
+            dynamodb,
+            table_name,
+            text_fields=config.get('text_fields', DEFAULT_TEXT_FIELDS),
+            ignore_fields=config.get('ignore_fields', ()),
+            min_text_tokens=config.get('min_text_tokens', 8),
+            max_text_tokens=config.get('max_text_tokens', 500),
+            shingle_size=config.get('shingle_size', 3),
+            signature_size=config.get('signature_size', 24),
+            bands=config.get('bands', 8),
+            min_similarity=config.get('min_similarity', 0.7),
+            window_seconds=config.get('window_seconds', 86400),
+            cache_entries=config.get('cache_entries', 4096)
+        )
+
+    def fingerprint(self, client: str, form_type: str, form_data: Dict) -> Fingerprints:
+        """Exact and band keys for a sanitized submission"""
+        normalized = {key: normalize(value) for key, value in form_data.items() if key not in self.ignore_fields}
+        raw = json.dumps([client, form_type, normalized], sort_keys=True, separators=(',', ':'),
+                         ensure_ascii=False, default=str)
+        keys = [f"exact#{client}#{form_type}#{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]}"]
+
+        text = ' '.join(normalized[field] for field in self.text_fields if isinstance(normalized.get(field), str))
+        # Signing costs about a microsecond per word, so very long texts are signed by their opening words
+        words = text.split(maxsplit=self.max_text_tokens)[:self.max_text_tokens]
+        tokens = [token for token in (word.strip(_PUNCTUATION) for word in words) if token]
+        if len(tokens) < self.min_text_tokens:
+            return Fingerprints(tuple(keys), None)
+        signature = minhash(tokens, self.shingle_size, self.signature_size)
+        rows = self.signature_size // self.bands
+        for band in range(self.bands):
+            keys.append(f"near#{client}#{form_type}#{band}#{_pack_signature(signature[band * rows:(band + 1) * rows])}")
+        return Fingerprints(tuple(keys), signature)
+
+    def find(self, fingerprints: Fingerprints) -> Optional[Match]:
+        """The closest earlier submission within the window, or None"""
+        now = self.clock()
+        entries = {}
+        missing = []
+        for key in fingerprints.keys:
+            entry = self._cached(key, now)
+            if entry is None:
+                missing.append(key)
+            else:
+                entries[key] = entry
+
+        match = self._match(fingerprints, entries)
+        if match is not None or not missing or self._writer is None:
+            return match
+        for item in self._fetch(missing):
+            expires_at = int(item['expiresAt'])
+            # TTL deletion is lazy
+            if expires_at <= now:
+                continue
+            entry = (expires_at, item['submissionId'], _unpack_signature(item.get('signature')))
+            self._remember(item['fingerprint'], entry)
+            entries[item['fingerprint']] = entry
+        return self._match(fingerprints, entries)
+
+    def record(self, fingerprints: Fingerprints, submission_id: str, window_seconds: Optional[int] = None) -> int:
+        """
+        Remember a stored submission's fingerprints for window_seconds
+        Returns: the number of keys the table did not take
+        """
+        expires_at = int(self.clock()) + (window_seconds or self.window_seconds)
+        packed = _pack_signature(fingerprints.signature)
+        items = []
+        for key in fingerprints.keys:
+            self._remember(key, (expires_at, submission_id, fingerprints.signature))
+            item = {'fingerprint': key, 'submissionId': submission_id, 'expiresAt': expires_at}
+            if packed:
+                item['signature'] = packed
+            items.append(item)
+        if self._writer is None:
+            return 0
+        return len(self._writer.write(items))
+
+    def _match(self, fingerprints: Fingerprints, entries: Dict) -> Optional[Match]:
+        exact = entries.get(fingerprints.keys[0])
+        if exact is not None:
+            return Match('exact', exact[1], 1.0)
+        best = None
+        for key in fingerprints.keys[1:]:
+            entry = entries.get(key)
+            if entry is None or not entry[2] or len(entry[2]) != len(fingerprints.signature):
+                continue
+            score = similarity(fingerprints.signature, entry[2])
+            if score >= self.min_similarity and (best is None or score > best.similarity):
+                best = Match('near', entry[1], score)
+        return best
+
+    def _fetch(self, keys: List[str]) -> List[Dict]:
+        result = self.dynamodb.batch_get_item(RequestItems={self.table_name: {
+            'Keys': [{'fingerprint': key} for key in keys],
+            'ProjectionExpression': '#key, submissionId, signature, expiresAt',
+            'ExpressionAttributeNames': {'#key': 'fingerprint'}
+        }})
+        return result.get('Responses', {}).get(self.table_name, [])
+
+    def _cached(self, key: str, now: float) -> Optional[Tuple[float, str, Optional[Tuple[int, ...]]]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry
+
+    def _remember(self, key: str, entry: Tuple[float, str, Optional[Tuple[int, ...]]]):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
@@ -0,0 +1,308 @@
+"""
+Email templates for forms lambda
+Each email_templates entry is compiled once per (client, form type) into
+literal fragments with the static parts (client name, form type, subject,
+auto-reply message) already substituted and escaped; rendering only fills
+in the per-submission values
+"""
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from logger import log
+# The storage sanitizer's escaping: values already sanitized for storage pass through unchanged
+from validators import escape_html
+
+_PLACEHOLDER = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+# Every placeholder works in every subject and body
+PLACEHOLDERS = frozenset((
+    'client_name', 'form_type', 'submission_id', 'timestamp', 'form_data', 'message', 'submitted'
+))
+# Subject placeholder from before templates were compiled; registry entries may still use it
+_LEGACY_CLIENT = '{client}'
+
+NOTIFICATION_TEXT = """
+New form submission received!
+
+Client: {{client_name}}
+Submission ID: {{submission_id}}
+Form Type: {{form_type}}
+Timestamp: {{timestamp}}
+
+Form Data:
+{{form_data}}
+
+---
+This is an automated notification from GadgetCloud Forms.
+"""
+
+NOTIFICATION_HTML = """
+<html>
+<head></head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+  <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">
+      New Form Submission Received
+    </h2>
+
+    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+      <p><strong>Client:</strong> {{client_name}}</p>
+      <p><strong>Submission ID:</strong> {{submission_id}}</p>
+      <p><strong>Form Type:</strong> {{form_type}}</p>
+      <p><strong>Timestamp:</strong> {{timestamp}}</p>
+    </div>
+
+    <h3 style="color: #2c3e50;">Form Data:</h3>
+    <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
+      <thead>
+        <tr style="background-color: #3498db; color: white;">
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Field</th>
+          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Value</th>
+        </tr>
+      </thead>
+      <tbody>
+        {{form_data}}
+      </tbody>
+    </table>
+
+    <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
+    <p style="color: #7f8c8d; font-size: 12px;">
+      This is an automated notification from GadgetCloud Forms.
+    </p>
+  </div>
+</body>
+</html>
+"""
+
+AUTO_REPLY_HTML = """
+<html>
+<head></head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+  <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+    <h2 style="color: #2c3e50;">{{client_name}}</h2>
+    <p>{{message}}</p>
+
+    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+      <p><strong>Your submission details:</strong></p>
+      <p>Form Type: {{form_type}}</p>
+      <p>Submitted: {{submitted}} UTC</p>
+    </div>
+
+    <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
+    <p style="color: #7f8c8d; font-size: 12px;">
+      This is an automated message. Please do not reply to this email.
+    </p>
+  </div>
+</body>
+</html>
+"""
+
+_ROW_OPEN = "<tr><td style='padding:8px;border:1px solid #ddd;'>"
+_ROW_MID = "</td><td style='padding:8px;border:1px solid #ddd;'>"
+_ROW_CLOSE = "</td></tr>"
+
+DEFAULT_AUTO_REPLY_SUBJECT = 'Thank you for your submission'
+DEFAULT_AUTO_REPLY_MESSAGE = 'We have received your submission and will get back to you soon.'
+
+
+def escape_text(value: Any) -> str:
+    """
+    Escape a value placed in element content (form data table cells)
+    Quotes are inert there, so only tags need neutralising; the substring
+    checks are memchr scans, cheap even for large nested values
+    """
+    value = str(value)
+    if '<' not in value and '>' not in value:
+        return value
+    return value.replace('<', '&lt;').replace('>', '&gt;')
+
+
+class Template:
+    """
+    A template source split into literal fragments and dynamic placeholder names
+    Names outside PLACEHOLDERS are collected in unknown and render as nothing
+    """
+    __slots__ = ('parts', 'names', 'unknown')
+
+    def __init__(self, source: str, static: Dict[str, str]):
+        parts = []
+        literal = []
+        unknown = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            literal.append(source[position:match.start()])
+            name = match.group(1)
+            if name in static:
+                literal.append(static[name])
+            elif name not in PLACEHOLDERS:
+                unknown.append(name)
+            else:
+                parts.append(''.join(literal))
+                parts.append(name)
+                literal = []
+            position = match.end()
+        literal.append(source[position:])
+        parts.append(''.join(literal))
+        # Even indexes are literals, odd indexes are dynamic names
+        self.parts = tuple(parts)
+        self.names = frozenset(parts[1::2])
+        self.unknown = tuple(unknown)
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = self.parts
+        if len(parts) == 1:
+            return parts[0]
+        out = [parts[0]]
+        for index in range(1, len(parts), 2):
+            out.append(values.get(parts[index], ''))
+            out.append(parts[index + 1])
+        return ''.join(out)
+
+
+class CompiledEmails(NamedTuple):
+    """Compiled notification and auto-reply templates for one (client, form type)"""
+    recipient: Optional[str]
+    subject: Template
+    text: Template
+    html: Template
+    auto_reply: bool
+    auto_reply_subject: Template
+    auto_reply_html: Template
+
+
+def render_rows(form_data: Dict) -> Tuple[str, str]:
+    """Render form data as (text lines, HTML table rows)"""
+    text = []
+    html = []
+    for key, value in form_data.items():
+        value_str = str(value)
+        text.append(f"{key}: {value_str}")
+        html.append(f"{_ROW_OPEN}{escape_text(key)}{_ROW_MID}{escape_text(value_str)}{_ROW_CLOSE}")
+    return "\n".join(text), "".join(html)
+
+
+def render_attachment_rows(attachments: List[Tuple[str, int, str]]) -> Tuple[str, str]:
+    """Render (filename, size, URL) attachments as (text lines, HTML table rows with links)"""
+    text = []
+    html = []
+    for filename, size, url in attachments:
+        size_text = f"{size / 1024:.0f} KB" if size >= 1024 else f"{size} bytes"
+        text.append(f"Attachment: {filename} ({size_text}) {url}")
+        html.append(f"{_ROW_OPEN}Attachment{_ROW_MID}<a href=\"{escape_html(url)}\">{escape_html(filename)}</a> "
+                    f"({size_text}){_ROW_CLOSE}")
+    return "\n".join(text), "".join(html)
+
+
+class EmailRenderer:
+    """
+    Renders notification and auto-reply emails from compiled templates
+
+    Compiled templates are cached per (client, form type, registry version),
+    so a client registry update recompiles them. A client's own
+    email_templates entry (from the client registry) overrides the global
+    entry field by field. Subjects and the optional notificationText,
+    notificationHtml and autoReplyHtml sources all use {{placeholders}};
+    unknown names are logged when compiled and render as nothing.
+    """
+
+    def __init__(self, templates: Dict[str, Dict], max_entries: int = 512):
+        self.templates = templates
+        self.max_entries = max_entries
+        self._cache: Dict[Tuple[str, str, Any], CompiledEmails] = {}
+        self._lock = threading.Lock()
+
+    def compiled(self, client: str, form_type: str, client_config: Dict, version: Any = None) -> CompiledEmails:
+        """Compiled templates for a (client, form type), compiling on first use"""
+        key = (client, form_type, version)
+        compiled = self._cache.get(key)
+        if compiled is None:
+            compiled = self._compile(client, form_type, client_config)
+            with self._lock:
+                if len(self._cache) >= self.max_entries:
+                    self._cache.clear()
+                self._cache[key] = compiled
+        return compiled
+
+    def render_notification(
+        self,
+        compiled: CompiledEmails,
+        submission_id: str,
+        timestamp: str,
+        form_data: Dict,
+        attachments: Optional[List[Tuple[str, int, str]]] = None,
+        submitted: Optional[datetime] = None
+    ) -> Tuple[str, str, str]:
+        """
+        attachments: (filename, size, download URL) each, listed after the form data as links
+        Returns: (subject, text body, HTML body)
+        """
+        rows_text, rows_html = render_rows(form_data)
+        if attachments:
+            links_text, links_html = render_attachment_rows(attachments)
+            rows_text = f"{rows_text}\n{links_text}"
+            rows_html += links_html
+        values, html_values = _values(submission_id, timestamp, rows_text, rows_html, submitted,
+                                      compiled.subject, compiled.text, compiled.html)
+        html = compiled.html.render(html_values)
+        return compiled.subject.render(values), compiled.text.render(values), html
+
+    def render_auto_reply(
+        self,
+        compiled: CompiledEmails,
+        submitted: Optional[datetime] = None,
+        submission_id: str = '',
+        timestamp: str = '',
+        form_data: Optional[Dict] = None
+    ) -> Tuple[str, str]:
+        """Returns: (subject, HTML body)"""
+        rows_text = rows_html = ''
+        # Auto-replies rarely list the form data, so the rows are only rendered when asked for
+        if form_data and ('form_data' in compiled.auto_reply_subject.names
+                          or 'form_data' in compiled.auto_reply_html.names):
+            rows_text, rows_html = render_rows(form_data)
+        values, html_values = _values(submission_id, timestamp, rows_text, rows_html, submitted,
+                                      compiled.auto_reply_subject, compiled.auto_reply_html)
+        return compiled.auto_reply_subject.render(values), compiled.auto_reply_html.render(html_values)
+
+    def _compile(self, client: str, form_type: str, client_config: Dict) -> CompiledEmails:
+        base = self.templates.get(form_type)
+        overrides = (client_config.get('email_templates') or {}).get(form_type) or {}
+        template = dict(base if base is not None else self.templates['contacts'])
+        template.update(overrides)
+
+        # Auto-replies only apply to form types that have their own template
+        auto_reply = bool((base is not None or overrides) and template.get('autoReply'))
+        message = template.get('autoReplyMessage', DEFAULT_AUTO_REPLY_MESSAGE)
+
+        client_name = client_config.get('name', client)
+        static_text = {'client_name': client_name, 'form_type': form_type, 'message': message}
+        static_html = {'client_name': escape_html(client_name), 'form_type': escape_html(form_type),
+                       'message': escape_html(message)}
+
+        compiled = CompiledEmails(
+            recipient=client_config.get('notification_email'),
+            # Subjects are plain text, so they take the unescaped values
+            subject=Template(template['subject'].replace(_LEGACY_CLIENT, '{{client_name}}'), static_text),
+            text=Template(template.get('notificationText', NOTIFICATION_TEXT), static_text),
+            html=Template(template.get('notificationHtml', NOTIFICATION_HTML), static_html),
+            auto_reply=auto_reply,
+            auto_reply_subject=Template(template.get('autoReplySubject', DEFAULT_AUTO_REPLY_SUBJECT), static_text),
+            auto_reply_html=Template(template.get('autoReplyHtml', AUTO_REPLY_HTML), static_html)
+        )
+        unknown = sorted({name for part in compiled if isinstance(part, Template) for name in part.unknown})
+        if unknown:
+            log.warning('Unknown email template placeholders', client=client, formType=form_type, placeholders=unknown)
+        return compiled
+
+
+def _values(submission_id: str, timestamp: str, rows_text: str, rows_html: str, submitted: Optional[datetime],
+            *templates: Template) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """The per-send placeholder values for plain-text templates and for HTML templates"""
+    values = {'submission_id': submission_id, 'timestamp': timestamp, 'form_data': rows_text}
+    html_values = {'submission_id': escape_html(submission_id), 'timestamp': escape_html(timestamp),
+                   'form_data': rows_html}
+    # Formatting the send time is the costly part, so it is skipped when no template shows it
+    if any('submitted' in template.names for template in templates):
+        values['submitted'] = html_values['submitted'] = (submitted or datetime.utcnow()).strftime('%Y-%m-%d %H:%M:%S')
+    return values, html_values
@@ -0,0 +1,364 @@
+"""
+Bulk export of submissions
+Streams a client's submissions (a ClientIndex query split into time
+slices) or the whole table (parallel scan segments) as NDJSON or CSV.
+Pages are fetched by a thread pool into a bounded queue and encoded
+row by row, so memory stays flat however large the export is. Client
+exports that need attributes the index does not project read each page
+of keys back from the table with batch_get_item.
+
+Usage: python lambda/export.py --table TABLE [--client CLIENT] [--format ndjson|csv]
+                               [--from TIME] [--to TIME] [--segments N] [--output FILE]
+"""
+import argparse
+import csv
+import io
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from codec import encode_default
+from storage import INDEX_ATTRIBUTES, batch_get, decode_item, project, stored_attributes
+
+DEFAULT_CSV_FIELDS = ('submissionId', 'timestamp', 'timestampIso', 'client', 'formType', 'email', 'status', 'formData')
+
+# Encoded output is yielded in chunks of about this many characters
+CHUNK_SIZE = 64 * 1024
+
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ('error',)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def _pages(fetch: Callable[..., Dict], kwargs: Dict) -> Iterator[List[Dict]]:
+    """Follow LastEvaluatedKey through a Query or Scan"""
+    kwargs = dict(kwargs)
+    while True:
+        result = fetch(**kwargs)
+        yield result.get('Items', [])
+        last_key = result.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def _fetched(pages: Iterator[List[Dict]], fetch: Callable[[List[Dict]], List[Dict]]) -> Iterator[List[Dict]]:
+    """Replace each page of index keys with the table items"""
+    for page in pages:
+        yield fetch([{'submissionId': item['submissionId'], 'timestamp': item['timestamp']} for item in page])
+
+
+def _projection(fields: Optional[Sequence[str]], kwargs: Dict) -> Dict:
+    if fields:
+        names = {f"#f{position}": field for position, field in enumerate(fields)}
+        kwargs['ProjectionExpression'] = ', '.join(names)
+        kwargs.setdefault('ExpressionAttributeNames', {}).update(names)
+    return kwargs
+
+
+def _time_filter(start: Optional[int], end: Optional[int], older_than: Optional[int]) -> Dict:
+    """Scan filter keeping timestamps in [start, end] and before older_than (each bound optional)"""
+    conditions = []
+    values = {}
+    if start is not None:
+        conditions.append('#ts >= :start')
+        values[':start'] = start
+    if end is not None:
+        conditions.append('#ts <= :end')
+        values[':end'] = end
+    if older_than is not None:
+        conditions.append('#ts < :before')
+        values[':before'] = older_than
+    if not conditions:
+        return {}
+    return {
+        'FilterExpression': ' AND '.join(conditions),
+        'ExpressionAttributeNames': {'#ts': 'timestamp'},
+        'ExpressionAttributeValues': values
+    }
+
+
+def scan_sources(table, segments: int, page_size: int = 1000, fields: Optional[Sequence[str]] = None,
+                 older_than: Optional[int] = None, start: Optional[int] = None,
+                 end: Optional[int] = None) -> List[Callable[[], Iterator[List[Dict]]]]:
+    """
+    One page source per parallel scan segment of the whole table
+    Only items with start <= timestamp <= end and timestamp < older_than
+    are returned, for whichever bounds are given.
+    """
+    sources = []
+    for segment in range(segments):
+        kwargs = {'Segment': segment, 'TotalSegments': segments, 'Limit': page_size}
+        kwargs.update(_time_filter(start, end, older_than))
+        kwargs = _projection(fields, kwargs)
+        sources.append(lambda kwargs=kwargs: _pages(table.scan, kwargs))
+    return sources
+
+
+def time_slices(start: int, end: int, slices: int) -> List[tuple]:
+    """Split the inclusive range [start, end] into up to `slices` contiguous ranges"""
+    slices = max(1, min(slices, end - start + 1))
+    width = (end - start + 1) / slices
+    bounds = [start + int(width * index) for index in range(slices)] + [end + 1]
+    return [(bounds[index], bounds[index + 1] - 1) for index in range(slices) if bounds[index] < bounds[index + 1]]
+
+
+def first_timestamp(table, client: str, index_name: str = 'ClientIndex') -> Optional[int]:
+    """Timestamp of a client's oldest submission (one-item query), or None if it has none"""
+    result = table.query(
+        IndexName=index_name,
+        KeyConditionExpression='#client = :client',
+        ExpressionAttributeNames={'#client': 'client', '#ts': 'timestamp'},
+        ExpressionAttributeValues={':client': client},
+        ProjectionExpression='#ts',
+        ScanIndexForward=True,
+        Limit=1
+    )
+    items = result.get('Items', [])
+    return int(items[0]['timestamp']) if items else None
+
+
+def client_sources(table, client: str, start: int, end: int, slices: int, page_size: int = 1000,
+                   fields: Optional[Sequence[str]] = None, index_name: str = 'ClientIndex',
+                   fetch: Optional[Callable[[List[Dict]], List[Dict]]] = None
+                   ) -> List[Callable[[], Iterator[List[Dict]]]]:
+    """
+    One page source per time slice of a client's ClientIndex range
+    With fetch, the index is only read for keys and fetch(keys) returns the items
+    """
+    if fetch is not None:
+        fields = ('submissionId', 'timestamp')
+    sources = []
+    for slice_start, slice_end in time_slices(start, end, slices):
+        kwargs = _projection(fields, {
+            'IndexName': index_name,
+            'KeyConditionExpression': '#client = :client AND #ts BETWEEN :start AND :end',
+            'ExpressionAttributeNames': {'#client': 'client', '#ts': 'timestamp'},
+            'ExpressionAttributeValues': {':client': client, ':start': slice_start, ':end': slice_end},
+            'Limit': page_size
+        })
+        if fetch is None:
+            sources.append(lambda kwargs=kwargs: _pages(table.query, kwargs))
+        else:
+            sources.append(lambda kwargs=kwargs: _fetched(_pages(table.query, kwargs), fetch))
+    return sources
+
+
+def iter_parallel(sources: List[Callable[[], Iterator[List[Dict]]]], max_workers: int = 8,
+                  max_pending_pages: int = 16) -> Iterator[Dict]:
+    """
+    Run page sources on a thread pool and yield their items as pages arrive
+    At most max_pending_pages pages are buffered; workers block when the
+    consumer falls behind. Items are not ordered across sources. Closing the
+    generator early stops the workers after their current page.
+    """
+    pages: queue.Queue = queue.Queue(maxsize=max_pending_pages)
+    stop = threading.Event()
+
+    def put(value) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(source):
+        try:
+            for page in source():
+                if not put(page):
+                    return
+        except Exception as e:
+            put(_Failure(e))
+        finally:
+            put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources))), thread_name_prefix='export')
+    try:
+        for source in sources:
+            executor.submit(run, source)
+        remaining = len(sources)
+        while remaining:
+            page = pages.get()
+            if page is _DONE:
+                remaining -= 1
+            elif isinstance(page, _Failure):
+                raise page.error
+            else:
+                yield from page
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def to_ndjson(items: Iterable[Dict]) -> Iterator[str]:
+    """Encode items as newline-delimited JSON, in chunks"""
+    dumps = json.JSONEncoder(default=encode_default, separators=(',', ':'), ensure_ascii=False).encode
+    lines = []
+    size = 0
+    for item in items:
+        line = dumps(item)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            lines.append('')
+            yield '\n'.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines)
+
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Decimal):
+        return encode_default(value)
+    return json.dumps(value, default=encode_default, separators=(',', ':'), ensure_ascii=False)
+
+
+def to_csv(items: Iterable[Dict], fields: Sequence[str] = DEFAULT_CSV_FIELDS) -> Iterator[str]:
+    """Encode items as CSV with a header row; nested values are JSON in their cell"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for item in items:
+        writer.writerow([_cell(item.get(field)) for field in fields])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_submissions(
+    table,
+    client: Optional[str] = None,
+    output_format: str = 'ndjson',
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+    segments: int = 8,
+    page_size: int = 1000,
+    max_pending_pages: int = 16,
+    index_name: str = 'ClientIndex',
+    dynamodb=None
+) -> Iterator[str]:
+    """
+    Stream an export as encoded text chunks
+    With a client, queries its ClientIndex range (from its first submission
+    when start is not given) in `segments` time slices; without one, scans
+    the whole table in `segments` parallel segments, filtered to the time
+    range when start or end is given. Items are decoded
+    (storage.decode_item) before encoding. Client exports read attributes
+    the index does not project from the table through the dynamodb service
+    resource; without one the index is assumed to project everything.
+    """
+    if output_format not in ('ndjson', 'csv'):
+        raise ValueError(f"Unsupported export format: {output_format}")
+
+    attributes = stored_attributes(fields) if fields else None
+    if client:
+        end = int(time.time()) if end is None else end
+        if start is None:
+            start = first_timestamp(table, client, index_name)
+        fetch = None
+        if dynamodb is not None and not (attributes and INDEX_ATTRIBUTES.issuperset(attributes)):
+            def fetch(keys):
+                return batch_get(dynamodb, table.name, keys, attributes)
+        sources = [] if start is None or start > end else client_sources(
+            table, client, start, end, segments, page_size, attributes, index_name, fetch
+        )
+    else:
+        sources = scan_sources(table, segments, page_size, attributes, start=start, end=end)
+
+    items = (
+        project(decode_item(item), fields)
+        for item in iter_parallel(sources, max_workers=segments, max_pending_pages=max_pending_pages)
+    )
+    if output_format == 'csv':
+        return to_csv(items, tuple(fields or DEFAULT_CSV_FIELDS))
+    return to_ndjson(items)
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of text chunks (for streaming uploads)"""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self._offset = 0
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while self._offset >= len(self._buffer):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = chunk.encode('utf-8')
+            self._offset = 0
+        size = min(len(target), len(self._buffer) - self._offset)
+        target[:size] = self._buffer[self._offset:self._offset + size]
+        self._offset += size
+        self.bytes_read += size
+        return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export form submissions as NDJSON or CSV')
+    parser.add_argument('--table', required=True, help='form_submissions table name')
+    parser.add_argument('--client', help='Export one client (ClientIndex); omit to scan the whole table')
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    parser.add_argument('--from', dest='start', help='Epoch seconds or ISO 8601 (UTC)')
+    parser.add_argument('--to', dest='end', help='Epoch seconds or ISO 8601 (UTC)')
+    parser.add_argument('--fields', help='Comma-separated attributes to export')
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    import boto3
+    from read_api import parse_time
+
+    dynamodb = boto3.resource('dynamodb')
+    table = dynamodb.Table(args.table)
+    chunks = export_submissions(
+        table,
+        client=args.client,
+        output_format=args.format,
+        start=parse_time(args.start, None),
+        end=parse_time(args.end, None),
+        fields=[field.strip() for field in args.fields.split(',')] if args.fields else None,
+        segments=args.segments,
+        page_size=args.page_size,
+        dynamodb=dynamodb
+    )
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Parallel fan-out for independent side effects
+Runs tasks on named thread pools and waits no longer than a hard deadline
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+
+# Pool name -> (executor, max_workers)
+_executors: Dict[str, Tuple[ThreadPoolExecutor, int]] = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """
+    The pool for one purpose (inline side effects, batch key claims, batch
+    writes), created on first use and reused across warm invocations
+    Each purpose is sized from its own config and never shares threads with
+    another, so a task may wait on work it submits to a different pool but
+    never on work submitted to its own.
+    Raises: ValueError if the pool already exists with a different size
+    """
+    entry = _executors.get(name)
+    if entry is None:
+        with _executor_lock:
+            entry = _executors.get(name)
+            if entry is None:
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+                entry = _executors[name] = (executor, max_workers)
+    if entry[1] != max_workers:
+        raise ValueError(f"Thread pool '{name}' already has {entry[1]} workers, not {max_workers}")
+    return entry[0]
+
+
+def _timed(task: Callable[[], None]) -> Tuple[float, Optional[Exception]]:
+    started = time.perf_counter()
+    try:
+        task()
+        error = None
+    except Exception as e:
+        error = e
+    return (time.perf_counter() - started) * 1000, error
+
+
+def run_parallel(tasks: Dict[str, Callable[[], None]], timeout: float, max_workers: int = 4,
+                 pool: str = 'side_effects') -> Dict[str, Dict]:
+    """
+    Run tasks concurrently on the named pool and wait at most timeout seconds
+    Tasks still running at the deadline are reported as 'timeout' and left to finish
+    in the background; they are never awaited past the deadline.
+    Returns: {name: {'outcome': 'ok' | 'error' | 'timeout', 'durationMs': float, 'error'?: str}}
+    """
+    if not tasks:
+        return {}
+
+    started = time.perf_counter()
+    executor = get_executor(pool, max_workers)
+    # Each task runs in a copy of the caller's context, so its log lines keep the requestId
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, _timed, task)
+        for name, task in tasks.items()
+    }
+    wait(futures.values(), timeout=max(timeout, 0))
+
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            results[name] = {
+                'outcome': 'timeout',
+                'durationMs': round((time.perf_counter() - started) * 1000, 1)
+            }
+            continue
+
+        duration, error = future.result()
+        if error is not None:
+            results[name] = {'outcome': 'error', 'durationMs': round(duration, 1), 'error': str(error)}
+        else:
+            results[name] = {'outcome': 'ok', 'durationMs': round(duration, 1)}
+    return results
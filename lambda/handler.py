@@ -3,51 +3,319 @@ Forms Lambda Function
 Handles form submissions with configuration-driven validation,
 rate limiting, client management, and email notifications
 """
+import base64
 import json
 import os
-import boto3
+import re
+import time
 from datetime import datetime
 from decimal import Decimal
 import uuid
 from validators import (
-    validate_client, validate_form_type, validate_form_data,
-    check_honeypot, validate_payload_size, sanitize_input
+    validate_client, validate_form_type, compile_validation_plans,
+    run_validation_plan, check_honeypot, validate_payload_size, compile_sanitize_limits, sanitize_form_data
+)
+from rate_limiter import build_rate_limiter
+from outbox import OutboxWorker, outbox_attributes, items_from_stream
+from fanout import get_executor, run_parallel
+from client_registry import build_client_registry
+from email_templates import EmailRenderer
+from digest import DigestStore, digest_entry, digest_settings, render_digest
+from logger import log
+from metrics import metrics, profiler
+from read_api import ReadApiError, authorize, parse_query, parse_time, list_submissions
+from batch import BatchWriter
+from export import ChunkReader, export_submissions
+from archive import Archiver, S3Sink, archive_submissions
+from idempotency import IdempotencyConflict, IdempotencyStore
+from storage import StorageEncoder
+from stats import StatsStore, parse_stats_query
+from reputation import build_ip_reputation
+from duplicates import NOTIFY_EFFECTS, Duplicate, DuplicateDetector, duplicate_policy, duplicate_tags
+from codec import Envelope, dumps, loads
+from attachments import (
+    AttachmentError, AttachmentStore, LocalObjects, S3Objects, attachment_limits, check_link, link_path
 )
-
-# Optional: requests library for webhooks (not available by default in Lambda)
-try:
-    import requests
-    REQUESTS_AVAILABLE = True
-except ImportError:
-    REQUESTS_AVAILABLE = False
-    print("Warning: requests library not available. Webhook functionality disabled.")
-
-# AWS clients
-dynamodb = boto3.resource('dynamodb')
-ses_client = boto3.client('ses')
-ssm_client = boto3.client('ssm')
 
 # Environment variables
 FORM_SUBMISSIONS_TABLE = os.environ.get('FORM_SUBMISSIONS_TABLE')
 NOTIFICATION_EMAIL = os.environ.get('NOTIFICATION_EMAIL')
 CLIENTS_PARAM_NAME = os.environ.get('CLIENTS_PARAM_NAME', '/gadgetcloud/clients')
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE')
+DIGEST_TABLE = os.environ.get('DIGEST_TABLE')
+EXPORT_BUCKET = os.environ.get('EXPORT_BUCKET')
+IDEMPOTENCY_TABLE = os.environ.get('IDEMPOTENCY_TABLE')
+CLIENTS_TABLE = os.environ.get('CLIENTS_TABLE')
+STATS_TABLE = os.environ.get('STATS_TABLE')
+BLOCKLIST_TABLE = os.environ.get('BLOCKLIST_TABLE')
+ATTACHMENTS_TABLE = os.environ.get('ATTACHMENTS_TABLE')
+FINGERPRINTS_TABLE = os.environ.get('FINGERPRINTS_TABLE')
+ATTACHMENTS_BUCKET = os.environ.get('ATTACHMENTS_BUCKET')
+ATTACHMENT_LINK_SECRET = os.environ.get('ATTACHMENT_LINK_SECRET', '')
+API_BASE_URL = os.environ.get('API_BASE_URL', '').rstrip('/')
+
+# /forms/attachments[/{id}[/parts/{n} | /complete]]
+ATTACHMENT_PATH = re.compile(r'/forms/attachments(?:/([0-9a-f-]{36})(?:/parts/(\d+)|/(complete))?)?/?$')
+
+# AWS clients and container-lifetime helpers, created on first use so that
+# cold starts (and GET /forms/health, /forms/info) don't pay for boto3
+dynamodb = None
+ses_client = None
+ssm_client = None
+s3_client = None
+submissions_table = None
+clients_table = None
+webhook_client = None
+rate_limiter = None
+outbox_worker = None
+batch_writer = None
+storage_encoder = None
+email_renderer = None
+digest_store = None
+idempotency_store = None
+stats_store = None
+ip_reputation = None
+attachment_store = None
+duplicate_detector = None
+_rate_limiter_built = False
+_ip_reputation_built = False
+
+
+def aws_config():
+    """
+    botocore config shared by every AWS client
+    Connection pools sized for the threads that use one client at once
+    (fan-out and batch workers in Lambda, request workers under asgi.py)
+    """
+    from botocore.config import Config
+    return Config(max_pool_connections=CONFIG['runtime']['max_pool_connections'])
+
+
+def warm_up():
+    """
+    Create the container-lifetime clients up front
+    Long-lived servers (asgi.py) call this once at startup so concurrent
+    requests share one set of clients and pools instead of racing to create
+    them; Lambda keeps creating them lazily. Clients already set (e.g. by
+    local stand-ins) are kept.
+    """
+    get_submissions_table()
+    get_ses_client()
+    get_rate_limiter()
+    get_ip_reputation()
+    get_idempotency_store()
+    get_digest_store()
+    get_stats_store()
+    get_attachment_store()
+    get_duplicate_detector()
+    get_batch_writer()
+    get_storage_encoder()
+    get_email_renderer()
+    get_webhook_client()
+
+
+def get_dynamodb():
+    """DynamoDB service resource"""
+    global dynamodb
+    if dynamodb is None:
+        import boto3
+        dynamodb = boto3.resource('dynamodb', config=aws_config())
+    return dynamodb
+
+
+def get_ses_client():
+    """SES client"""
+    global ses_client
+    if ses_client is None:
+        import boto3
+        ses_client = boto3.client('ses', config=aws_config())
+    return ses_client
+
+
+def get_ssm_client():
+    """SSM client"""
+    global ssm_client
+    if ssm_client is None:
+        import boto3
+        ssm_client = boto3.client('ssm', config=aws_config())
+    return ssm_client
+
+
+def get_s3_client():
+    """S3 client"""
+    global s3_client
+    if s3_client is None:
+        import boto3
+        s3_client = boto3.client('s3', config=aws_config())
+    return s3_client
+
+
+def get_submissions_table():
+    """Form submissions table"""
+    global submissions_table
+    if submissions_table is None:
+        submissions_table = get_dynamodb().Table(FORM_SUBMISSIONS_TABLE)
+    return submissions_table
+
+
+def get_webhook_client():
+    """Webhook client (pooled connections and per-client circuit breakers live for the container)"""
+    global webhook_client
+    if webhook_client is None:
+        from webhooks import WebhookClient
+        webhook_client = WebhookClient.from_config(CONFIG['webhooks'])
+    return webhook_client
+
+
+def get_rate_limiter():
+    """Rate limiter (local token buckets; shared DynamoDB window counters when a table is configured)"""
+    global rate_limiter, _rate_limiter_built
+    if not _rate_limiter_built:
+        rate_limiter = build_rate_limiter(
+            CONFIG['rate_limiting'],
+            get_dynamodb().Table(RATE_LIMIT_TABLE) if RATE_LIMIT_TABLE else None
+        )
+        _rate_limiter_built = True
+    return rate_limiter
+
+
+def get_ip_reputation():
+    """IP reputation tracker (when security.block_suspicious_ips is on; blocks shared through BLOCKLIST_TABLE)"""
+    global ip_reputation, _ip_reputation_built
+    if not _ip_reputation_built:
+        ip_reputation = build_ip_reputation(
+            CONFIG['security'],
+            get_dynamodb().Table(BLOCKLIST_TABLE) if BLOCKLIST_TABLE else None
+        )
+        _ip_reputation_built = True
+    return ip_reputation
+
+
+def get_outbox_worker():
+    """Outbox worker bound to the submissions table"""
+    global outbox_worker
+    if outbox_worker is None:
+        outbox_worker = OutboxWorker.from_config(CONFIG['outbox'], get_submissions_table(), SIDE_EFFECTS)
+    return outbox_worker
+
+
+def get_batch_writer():
+    """Parallel batch_write_item writer for the submissions table"""
+    global batch_writer
+    if batch_writer is None:
+        batch_writer = BatchWriter.from_config(CONFIG['batch'], get_dynamodb(), FORM_SUBMISSIONS_TABLE)
+    return batch_writer
+
+
+def get_storage_encoder():
+    """Encoder applied to submission items before they are written"""
+    global storage_encoder
+    if storage_encoder is None:
+        storage_encoder = StorageEncoder.from_config(CONFIG['storage'])
+    return storage_encoder
+
+
+def get_idempotency_store():
+    """Idempotency key store (None when disabled or IDEMPOTENCY_TABLE is not configured)"""
+    global idempotency_store
+    if idempotency_store is None and IDEMPOTENCY_TABLE and CONFIG['idempotency']['enabled']:
+        idempotency_store = IdempotencyStore.from_config(
+            CONFIG['idempotency'],
+            get_dynamodb().Table(IDEMPOTENCY_TABLE)
+        )
+    return idempotency_store
+
+
+def get_digest_store():
+    """Digest buffer table (None when DIGEST_TABLE is not configured)"""
+    global digest_store
+    if digest_store is None and DIGEST_TABLE:
+        digest_store = DigestStore(
+            get_dynamodb().Table(DIGEST_TABLE),
+            index_name=CONFIG['digest']['index_name'],
+            retention_seconds=CONFIG['digest']['retention_days'] * 86400
+        )
+    return digest_store
+
+
+def get_stats_store():
+    """Stats rollup table (None when disabled or STATS_TABLE is not configured)"""
+    global stats_store
+    if stats_store is None and STATS_TABLE and CONFIG['stats']['enabled']:
+        stats_store = StatsStore.from_config(CONFIG['stats'], get_dynamodb().Table(STATS_TABLE))
+    return stats_store
 
-# Get DynamoDB table
-submissions_table = dynamodb.Table(FORM_SUBMISSIONS_TABLE)
+
+def get_attachment_store():
+    """
+    Attachment sessions and records (None when disabled or ATTACHMENTS_TABLE is not configured)
+    Files go to ATTACHMENTS_BUCKET, or under attachments.local_directory when no bucket is set
+    """
+    global attachment_store
+    settings = CONFIG['attachments']
+    if attachment_store is None and ATTACHMENTS_TABLE and settings['enabled']:
+        if ATTACHMENTS_BUCKET:
+            objects = S3Objects(get_s3_client(), ATTACHMENTS_BUCKET, settings['part_bytes'])
+        else:
+            objects = LocalObjects(settings['local_directory'], settings['local_part_bytes'])
+        attachment_store = AttachmentStore.from_config(settings, get_dynamodb().Table(ATTACHMENTS_TABLE), objects)
+    return attachment_store
+
+
+def get_duplicate_detector():
+    """Duplicate detector (for clients with detection on); fingerprints are shared through FINGERPRINTS_TABLE when set"""
+    global duplicate_detector
+    if duplicate_detector is None:
+        duplicate_detector = DuplicateDetector.from_config(
+            CONFIG['duplicates'],
+            get_dynamodb() if FINGERPRINTS_TABLE else None,
+            FINGERPRINTS_TABLE
+        )
+    return duplicate_detector
+
+
+def get_clients_table():
+    """Clients table (client_registry.backend 'dynamodb')"""
+    global clients_table
+    if clients_table is None:
+        clients_table = get_dynamodb().Table(CLIENTS_TABLE)
+    return clients_table
 
 
-def load_clients():
-    """Load clients configuration from SSM Parameter Store"""
+def fetch_clients_parameter():
+    """Fetch the clients parameter from SSM Parameter Store; returns (version, raw JSON)"""
+    response = get_ssm_client().get_parameter(Name=CLIENTS_PARAM_NAME)
+    parameter = response['Parameter']
+    return parameter['Version'], parameter['Value']
+
+
+def fetch_client_parameter(client: str):
+    """Fetch one client's parameter, CLIENTS_PARAM_NAME/<client>; returns (version, raw JSON) or None"""
     try:
-        response = ssm_client.get_parameter(Name=CLIENTS_PARAM_NAME)
-        return json.loads(response['Parameter']['Value'])
+        response = get_ssm_client().get_parameter(Name=f"{CLIENTS_PARAM_NAME}/{client}")
     except Exception as e:
-        print(f"Error loading clients from Parameter Store: {e}")
-        return {}
+        # botocore ClientError, matched by code so this module doesn't import botocore
+        if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ParameterNotFound':
+            return None
+        raise
+    parameter = response['Parameter']
+    return parameter['Version'], parameter['Value']
+
+
+def fetch_client_item(client: str):
+    """Fetch one client's item from the clients table; returns (version, raw JSON) or None"""
+    item = get_clients_table().get_item(Key={'client': client}).get('Item')
+    if item is None:
+        return None
+    return int(item.get('version', 0)), item['config']
 
 
 def load_config():
-    """Load base config and merge with environment-specific overrides"""
+    """
+    Load base config and merge with environment-specific overrides
+    This is the cheap, local part of the config (files only, no AWS calls);
+    clients are loaded on demand by load_remote_config()
+    """
     base_dir = os.path.dirname(__file__)
 
     # Load base config
@@ -64,11 +332,12 @@ def load_config():
             env_config = json.load(f)
         config = deep_merge(config, env_config)
 
-    # Load clients from Parameter Store
-    clients = load_clients()
-    if clients:
-        config['clients'] = clients
-        config['allowed_clients'] = list(clients.keys())
+    # Compile validation plans once per container
+    config['validation_plans'] = compile_validation_plans(
+        config['validation_rules'],
+        config['field_constraints']
+    )
+    config['sanitize_limits'] = compile_sanitize_limits(config['field_constraints'], config['security'])
 
     return config
 
@@ -85,12 +354,53 @@ def deep_merge(base: dict, override: dict) -> dict:
 
 
 CONFIG = load_config()
+log.configure(CONFIG['monitoring'], os.environ.get('LOG_LEVEL'))
+metrics.configure(CONFIG['monitoring'])
+profiler.configure(CONFIG['monitoring'])
+
+# Response headers and fixed bodies, serialized once per container (shared: never mutate them)
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'X-API-Version': CONFIG['api_version']
+}
+NOT_FOUND = Envelope(404, {'error': 'Endpoint not found'}, JSON_HEADERS)
+INVALID_JSON = Envelope(400, {'error': 'Invalid JSON in request body'}, JSON_HEADERS)
+FORBIDDEN = Envelope(403, {'error': 'Forbidden'}, JSON_HEADERS)
+# '{"status":"healthy","version":"..","timestamp":' - health_check appends the timestamp
+HEALTH_BODY_PREFIX = dumps({'status': 'healthy', 'version': CONFIG['version'], 'timestamp': None})[:-len('null}')]
+# (client_names, Envelope) for GET /forms/info
+info_response = None
+
+
+def create_client_registry():
+    """
+    Client registry for client_registry.backend
+    One SSM parameter refreshed in the background, or per-client records loaded on demand
+    """
+    return build_client_registry(CONFIG['client_registry'], fetch_clients_parameter, {
+        'ssm_sharded': fetch_client_parameter,
+        'dynamodb': fetch_client_item
+    })
+
+
+client_registry = create_client_registry()
+
+
+def load_remote_config():
+    """Deferred, remote part of the config: the client registry (clients load on first lookup)"""
+    return client_registry
+
+
+def get_client_record(client: str):
+    """Client record from the client registry, falling back to the 'noclient' record"""
+    return client_registry.client(client) or client_registry.client('noclient')
 
 
 def get_client_config(client: str) -> dict:
-    """Get client configuration from centralized clients store"""
-    clients = CONFIG.get('clients', {})
-    return clients.get(client, clients.get('noclient', {}))
+    """Get client configuration from the client registry"""
+    record = get_client_record(client)
+    return record.config if record is not None else {}
 
 
 def get_allowed_form_types(client: str) -> list:
@@ -99,54 +409,270 @@ def get_allowed_form_types(client: str) -> list:
     return client_config.get('form_types', [])
 
 
+def get_validation_plan(form_type: str):
+    """Get the compiled validation plan for a form type"""
+    plans = CONFIG['validation_plans']
+    return plans.get(form_type, plans[None])
+
+
 def lambda_handler(event, context):
     """
     Main Lambda handler for forms endpoint
+    Logs one summary line per request (with its stage timings when metrics are on);
+    the raw event only when sampled (or at DEBUG)
     """
-    print(f"Event: {json.dumps(event)}")
+    started = time.perf_counter()
+    log.log_event(event)
 
     # Parse request
     http_method = event['requestContext']['http']['method']
     path = event['requestContext']['http']['path']
+    token = log.begin_request(getattr(context, 'aws_request_id', None), method=http_method, path=path)
+    stages_token = metrics.begin_request()
+    profile = profiler.start(event.get('headers'))
+    route = 'not_found'
+    result = None
 
     try:
         # Handle different endpoints
         if http_method == 'GET' and '/health' in path:
-            return health_check()
+            route = 'health'
+            result = health_check()
         elif http_method == 'GET' and '/info' in path:
-            return get_info()
+            route = 'info'
+            result = get_info()
+        elif http_method == 'GET' and '/submissions' in path:
+            route = 'submissions'
+            result = get_submissions(event)
+        elif http_method == 'GET' and '/stats' in path:
+            route = 'stats'
+            result = get_stats(event)
+        elif '/forms/attachments' in path:
+            route = 'attachments'
+            result = handle_attachment(event, http_method, path)
+        elif http_method == 'POST' and '/forms/batch' in path:
+            route = 'batch'
+            result = submit_batch(event, context)
         elif http_method == 'POST' and '/forms' in path:
-            return submit_form(event)
+            route = 'submit'
+            result = submit_form(event, context)
         else:
-            return response(404, {'error': 'Endpoint not found'})
+            result = NOT_FOUND.respond()
+        return result
 
     except Exception as e:
-        print(f"Error: {str(e)}")
-        return response(500, {'error': 'Internal server error', 'message': str(e)})
+        log.error('Unhandled error', error=str(e))
+        result = response(500, {'error': 'Internal server error', 'message': str(e)})
+        return result
+
+    finally:
+        status = result['statusCode'] if result else 500
+        if profile is not None:
+            log.info('Profile', route=route, **profiler.finish(profile, route))
+        metrics.observe(f"route.{route}", started)
+        stages = metrics.request_stages()
+        if stages:
+            log.bind(stagesMs=stages)
+        metrics.end_request(stages_token, error=status >= 500)
+        log.end_request(token, status=status)
 
 
 def health_check():
     """Health check endpoint"""
-    return response(200, {
-        'status': 'healthy',
-        'version': CONFIG['version'],
-        'timestamp': datetime.utcnow().isoformat()
-    })
+    # Only the timestamp changes; the rest of the body is serialized once
+    return {
+        'statusCode': 200,
+        'headers': JSON_HEADERS,
+        'body': f'{HEALTH_BODY_PREFIX}"{datetime.utcnow().isoformat()}"}}'
+    }
 
 
 def get_info():
     """Get API information"""
-    return response(200, {
+    global info_response
+    # Per-client backends are not enumerated
+    client_names = load_remote_config().client_names()
+    # Serialized once per registry snapshot (client_names is the snapshot's own tuple)
+    cached = info_response
+    if cached is not None and cached[0] is client_names:
+        return cached[1].respond()
+
+    info = {
         'name': CONFIG['name'],
         'version': CONFIG['version'],
         'api_version': CONFIG['api_version'],
         'supported_versions': CONFIG['supported_versions'],
-        'allowed_clients': CONFIG['allowed_clients'],
         'buildTime': CONFIG['buildTime']
-    })
+    }
+    if client_names is not None:
+        info['allowed_clients'] = list(client_names)
+    envelope = Envelope(200, info, JSON_HEADERS)
+    info_response = (client_names, envelope)
+    return envelope.respond()
+
+
+def get_submissions(event):
+    """
+    List a client's submissions (GET /forms/submissions)
+    Authenticated with the client's read API key as a bearer token
+    """
+    settings = CONFIG['read_api']
+    if not settings['enabled']:
+        return NOT_FOUND.respond()
+
+    params = event.get('queryStringParameters') or {}
+    client = params.get('client', '')
+    log.bind(client=client)
+    try:
+        authorize(event.get('headers', {}), load_remote_config().get(client))
+        query = parse_query(params, settings)
+    except ReadApiError as e:
+        log.bind(reason='read_rejected')
+        return response(e.status, {'error': e.message})
 
+    page = list_submissions(get_submissions_table(), query, get_dynamodb())
+    log.bind(index=query.index_name, count=page['count'])
+    return response(200, page)
 
-def submit_form(event):
+
+def get_stats(event):
+    """
+    Submission counts per hour or day (GET /forms/stats)
+    Authenticated with the client's read API key, like GET /forms/submissions
+    """
+    store = get_stats_store()
+    if store is None:
+        return NOT_FOUND.respond()
+
+    params = event.get('queryStringParameters') or {}
+    client = params.get('client', '')
+    log.bind(client=client)
+    try:
+        authorize(event.get('headers', {}), load_remote_config().get(client))
+        query = parse_stats_query(params, CONFIG['stats'], int(datetime.utcnow().timestamp()))
+    except ReadApiError as e:
+        log.bind(reason='read_rejected')
+        return response(e.status, {'error': e.message})
+
+    stats = store.read(query)
+    log.bind(granularity=query.granularity, buckets=len(stats['buckets']))
+    return response(200, stats)
+
+
+def handle_attachment(event, http_method: str, path: str):
+    """
+    Attachment uploads (POST /forms/attachments, PUT .../{id}/parts/{n}, POST .../{id}/complete)
+    and signed download links (GET /forms/attachments/{id}?expires=...&signature=...)
+    """
+    store = get_attachment_store()
+    match = ATTACHMENT_PATH.search(path)
+    if store is None or match is None:
+        return NOT_FOUND.respond()
+    attachment_id, part_number, complete = match.groups()
+    if attachment_id is not None:
+        log.bind(attachmentId=attachment_id)
+
+    try:
+        if http_method == 'POST' and attachment_id is None:
+            return create_attachment(event, store)
+        if http_method == 'PUT' and part_number is not None:
+            store.write_part(attachment_id, upload_token(event), int(part_number), request_body_bytes(event))
+            return response(200, {'attachmentId': attachment_id, 'partNumber': int(part_number)})
+        if http_method == 'POST' and complete:
+            started = time.perf_counter()
+            result = store.complete(attachment_id, upload_token(event), client_attachment_limits)
+            metrics.observe('attachment.complete', started)
+            return response(200, dict(result, status='ready'))
+        if http_method == 'GET' and attachment_id is not None and part_number is None and not complete:
+            check_link(attachment_id, event.get('queryStringParameters') or {}, ATTACHMENT_LINK_SECRET,
+                       time.time())
+            url = store.download(attachment_id, CONFIG['attachments']['download_url_expiry_seconds'])
+            return redirect(url)
+    except AttachmentError as e:
+        log.bind(reason='attachment_rejected', error=e.message)
+        return response(e.status, {'error': e.message})
+    return NOT_FOUND.respond()
+
+
+def create_attachment(event, store):
+    """Open an upload session: {client, filename, contentType, size, sha256?}"""
+    source_ip = event['requestContext']['http']['sourceIp']
+    blocked = check_ip_reputation(source_ip)
+    if blocked:
+        log.bind(reason='ip_blocked', blockKey=blocked)
+        return FORBIDDEN.respond()
+
+    body_str = event.get('body', '{}')
+    is_valid, error = validate_payload_size(body_str, CONFIG['security']['max_payload_size'])
+    if not is_valid:
+        log.bind(reason='payload_too_large')
+        return response(413, {'error': error})
+    try:
+        body = loads(body_str)
+    except json.JSONDecodeError:
+        log.bind(reason='invalid_json')
+        return INVALID_JSON.respond()
+    if not isinstance(body, dict):
+        return response(400, {'error': 'Request body must be an object'})
+
+    client = body.get('client', 'noclient')
+    log.bind(client=client)
+    is_valid, error = validate_client(client, load_remote_config())
+    if not is_valid:
+        log.bind(reason='invalid_client')
+        return response(400, {'error': error})
+    limits = client_attachment_limits(client)
+    if limits is None:
+        raise AttachmentError(400, 'Attachments are not enabled for this client')
+
+    if CONFIG['rate_limiting']['enabled']:
+        is_allowed, error = check_rate_limit(source_ip, client)
+        if not is_allowed:
+            log.bind(reason='rate_limited')
+            record_ip_signal(source_ip, 'rate_limited')
+            return response(429, {'error': error})
+
+    session = store.create(client, body, limits)
+    log.bind(attachmentId=session['attachmentId'], parts=len(session['parts']))
+    return response(201, session)
+
+
+def client_attachment_limits(client: str):
+    """A client's attachment limits, or None when attachments are off for it"""
+    return attachment_limits(get_client_config(client), CONFIG['attachments'])
+
+
+def resolve_attachments(client: str, attachment_ids) -> list:
+    """Summaries of the ready attachments a submission references; raises AttachmentError"""
+    store = get_attachment_store()
+    if store is None:
+        raise AttachmentError(400, 'Attachments are not enabled')
+    return store.resolve(client, attachment_ids, client_attachment_limits(client))
+
+
+def attachment_links(attachments: list) -> list:
+    """(filename, size, signed download URL) per attachment, for notification emails"""
+    expires = int(time.time()) + CONFIG['attachments']['link_expiry_days'] * 86400
+    return [
+        (attachment['filename'], int(attachment['size']),
+         f"{API_BASE_URL}{link_path(attachment['attachmentId'], expires, ATTACHMENT_LINK_SECRET)}")
+        for attachment in attachments
+    ]
+
+
+def upload_token(event) -> str:
+    """The upload token sent as a bearer token ('' when missing)"""
+    scheme, _, token = (event.get('headers') or {}).get('authorization', '').partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else ''
+
+
+def request_body_bytes(event) -> bytes:
+    """Raw request body (API Gateway base64-encodes binary bodies)"""
+    body = event.get('body') or ''
+    return base64.b64decode(body) if event.get('isBase64Encoded') else body.encode('utf-8')
+
+
+def submit_form(event, context=None):
     """Handle form submission with comprehensive validation"""
     try:
         # Get source information
@@ -154,29 +680,44 @@ def submit_form(event):
         user_agent = event['requestContext']['http'].get('userAgent', 'Unknown')
         headers = event.get('headers', {})
 
+        # Sources blocked for bot behaviour are refused before the body is touched
+        started = time.perf_counter()
+        blocked = check_ip_reputation(source_ip)
+        metrics.observe('submit.reputation', started)
+        if blocked:
+            log.bind(reason='ip_blocked', blockKey=blocked)
+            return FORBIDDEN.respond()
+
         # Validate payload size
+        started = time.perf_counter()
         body_str = event.get('body', '{}')
         max_size = CONFIG['security']['max_payload_size']
         is_valid, error = validate_payload_size(body_str, max_size)
         if not is_valid:
+            log.bind(reason='payload_too_large')
             return response(413, {'error': error})
 
         # Parse request body
         try:
-            body = json.loads(body_str)
+            body = loads(body_str)
         except json.JSONDecodeError:
-            return response(400, {'error': 'Invalid JSON in request body'})
+            log.bind(reason='invalid_json')
+            return INVALID_JSON.respond()
 
         # Extract parameters
         client = body.get('client', 'noclient')
         form_type = body.get('type', body.get('formType'))
         form_data = body.get('data', body.get('formData', {}))
         tags = body.get('tags', '')
+        log.bind(client=client, formType=form_type)
+        metrics.observe('submit.parse', started)
 
         # Security check: Honeypot
         honeypot_field = CONFIG['security']['honeypot_field']
         if check_honeypot(form_data, honeypot_field):
-            print(f"Bot detected from IP: {source_ip}")
+            log.warning('Bot detected', sourceIp=source_ip)
+            log.bind(reason='honeypot')
+            record_ip_signal(source_ip, 'honeypot')
             # Return success to bot but don't process
             return response(201, {
                 'submissionId': str(uuid.uuid4()),
@@ -184,202 +725,645 @@ def submit_form(event):
                 'message': 'Form submitted successfully'
             })
 
-        # Validate client
-        is_valid, error = validate_client(client, CONFIG['allowed_clients'])
+        # Validate client and form type for client
+        started = time.perf_counter()
+        is_valid, error, reason = validate_target(client, form_type)
+        metrics.observe('submit.target', started)
         if not is_valid:
+            log.bind(reason=reason)
             return response(400, {'error': error})
 
-        # Validate form type for client
-        allowed_form_types = get_allowed_form_types(client)
-        if form_type not in allowed_form_types:
-            return response(400, {'error': f"Form type '{form_type}' not allowed for client '{client}'"})
+        # Retries of an earlier request replay its response (warm repeats without any I/O)
+        started = time.perf_counter()
+        idempotency = get_idempotency_store()
+        idempotency_key = None
+        if idempotency is not None:
+            try:
+                idempotency_key = idempotency.key_for(headers, client, form_type, form_data, source_ip)
+                replay = idempotency.lookup(idempotency_key) if idempotency_key else None
+            except IdempotencyConflict as e:
+                return response(e.status, {'error': e.message})
+            metrics.observe('submit.idempotency', started)
+            if replay is not None:
+                log.bind(reason='idempotent_replay', submissionId=replay.body.get('submissionId'))
+                return response(replay.status_code, replay.body)
 
         # Check rate limiting
         if CONFIG['rate_limiting']['enabled']:
+            started = time.perf_counter()
             is_allowed, error = check_rate_limit(source_ip, client)
+            metrics.observe('submit.rate_limit', started)
             if not is_allowed:
+                log.bind(reason='rate_limited')
+                record_ip_signal(source_ip, 'rate_limited')
                 return response(429, {'error': error})
 
-        # Get validation rules for this form type
-        required_fields = CONFIG['validation_rules'].get(form_type, [])
-        field_constraints = CONFIG['field_constraints']
-
-        # Validate form data
-        is_valid, errors = validate_form_data(
-            form_data,
-            required_fields,
-            field_constraints
-        )
+        # Validate form data against the compiled plan for this form type
+        started = time.perf_counter()
+        is_valid, errors = run_validation_plan(get_validation_plan(form_type), form_data)
+        metrics.observe('submit.validate', started)
         if not is_valid:
+            log.bind(reason='validation_failed', errors=errors)
+            record_ip_signal(source_ip, 'validation_failed')
             return response(400, {'error': 'Validation failed', 'details': errors})
 
-        # Sanitize form data
-        sanitized_data = {
-            key: sanitize_input(str(value)) if isinstance(value, str) else value
-            for key, value in form_data.items()
-        }
-
-        # Generate submission details
-        submission_id = str(uuid.uuid4())
-        timestamp = int(datetime.utcnow().timestamp())
-        timestamp_iso = datetime.utcnow().isoformat()
-
-        # Store in DynamoDB
-        # Flatten email to top-level for GSI querying
-        email = sanitized_data.get('email', '')
-
-        item = {
-            'submissionId': submission_id,
-            'timestamp': timestamp,
-            'timestampIso': timestamp_iso,
-            'client': client,
-            'formType': form_type,
-            'email': email,
-            'formData': sanitized_data,
-            'sourceIp': source_ip,
-            'userAgent': user_agent,
-            'status': 'received',
-            'tags': tags
-        }
+        # Escape every string, nested values included, within the structural limits
+        started = time.perf_counter()
+        form_data, error = sanitize_form_data(form_data, CONFIG['sanitize_limits'])
+        metrics.observe('submit.sanitize', started)
+        if form_data is None:
+            log.bind(reason='payload_too_complex')
+            return response(400, {'error': error})
 
-        submissions_table.put_item(Item=item)
-        print(f"Stored form submission: {submission_id}")
+        # Repeats of earlier content, from any source, are tagged, kept quiet or dropped per client
+        started = time.perf_counter()
+        duplicate, fingerprints = find_duplicate(client, form_type, form_data)
+        metrics.observe('submit.duplicates', started)
+        if duplicate is not None and duplicate.policy == 'drop':
+            log.bind(reason='duplicate')
+            return response(201, {
+                'submissionId': duplicate.submission_id,
+                'status': 'received',
+                'message': 'Form submitted successfully'
+            })
 
-        # Send email notification
-        try:
-            send_notification_email(
-                submission_id,
-                client,
-                form_type,
-                sanitized_data,
-                timestamp_iso
-            )
-            print(f"Notification email sent for submission: {submission_id}")
-        except Exception as email_error:
-            print(f"Failed to send notification email: {str(email_error)}")
-
-        # Send auto-reply if configured
-        try:
-            send_auto_reply(client, form_type, sanitized_data)
-        except Exception as reply_error:
-            print(f"Failed to send auto-reply: {str(reply_error)}")
+        # Attachments are uploaded beforehand and referenced by ID
+        attachments = None
+        if body.get('attachments'):
+            started = time.perf_counter()
+            try:
+                attachments = resolve_attachments(client, body['attachments'])
+            except AttachmentError as e:
+                log.bind(reason='invalid_attachments')
+                return response(e.status, {'error': e.message})
+            metrics.observe('submit.attachments', started)
+
+        # Claim the idempotency key; a repeat that missed the warm cache is replayed here
+        if idempotency_key is not None:
+            started = time.perf_counter()
+            try:
+                replay = idempotency.begin(idempotency_key)
+            except IdempotencyConflict as e:
+                log.bind(reason='idempotency_conflict')
+                return response(e.status, {'error': e.message})
+            metrics.observe('submit.idempotency', started)
+            if replay is not None:
+                log.bind(reason='idempotent_replay', submissionId=replay.body.get('submissionId'))
+                return response(replay.status_code, replay.body)
 
-        # Call webhook if configured
         try:
-            call_webhook(client, submission_id, form_type, sanitized_data)
-        except Exception as webhook_error:
-            print(f"Failed to call webhook: {str(webhook_error)}")
-
-        # Return success response
-        result = {
-            'submissionId': submission_id,
-            'timestamp': timestamp_iso,
-            'client': client,
-            'type': form_type,
-            'status': 'received',
-            'message': 'Form submitted successfully'
-        }
-
-        print(f"Form submitted successfully: {submission_id}")
+            result = store_submission(client, form_type, form_data, tags, source_ip, user_agent, context,
+                                      attachments, duplicate)
+        except Exception:
+            if idempotency_key is not None:
+                idempotency.release(idempotency_key)
+            raise
+
+        if fingerprints is not None:
+            started = time.perf_counter()
+            record_fingerprints(client, fingerprints, result['submissionId'])
+            metrics.observe('submit.duplicates', started)
+
+        if idempotency_key is not None:
+            started = time.perf_counter()
+            try:
+                idempotency.complete(idempotency_key, 201, result)
+            except Exception as e:
+                log.warning('Idempotency record not completed', submissionId=result['submissionId'], error=str(e))
+            metrics.observe('submit.idempotency', started)
         return response(201, result)
 
     except Exception as e:
-        print(f"Form submission error: {str(e)}")
+        log.error('Form submission error', error=str(e))
         return response(500, {'error': 'Failed to submit form', 'message': str(e)})
 
 
-def check_rate_limit(ip_address: str, client: str) -> tuple:
+def find_duplicate(client: str, form_type: str, form_data: dict) -> tuple:
+    """
+    Look for an earlier submission with the same or similar content
+    Returns: (Duplicate when the client's policy applies one, else None;
+              fingerprints to record once stored when the content is new, else None)
+    Detection errors fail open
+    """
+    settings = duplicate_policy(get_client_config(client), CONFIG['duplicates'])
+    if settings is None:
+        return None, None
+    detector = get_duplicate_detector()
+    try:
+        fingerprints = detector.fingerprint(client, form_type, form_data)
+        match = detector.find(fingerprints)
+    except Exception as e:
+        log.error('Duplicate check failed', error=str(e))
+        return None, None
+    if match is None:
+        return None, fingerprints
+
+    policy = settings['policy'] if match.kind == 'exact' else settings['near_policy']
+    log.bind(duplicateOf=match.submission_id, duplicateKind=match.kind, duplicatePolicy=policy)
+    if policy == 'allow':
+        return None, None
+    return Duplicate(match.kind, match.submission_id, policy), None
+
+
+def record_fingerprints(client: str, fingerprints, submission_id: str):
+    """Remember a stored submission's fingerprints for the client's window (errors are logged, not raised)"""
+    settings = duplicate_policy(get_client_config(client), CONFIG['duplicates'])
+    try:
+        unwritten = get_duplicate_detector().record(
+            fingerprints, submission_id, settings['window_seconds'] if settings else None
+        )
+        if unwritten:
+            log.warning('Fingerprints not recorded', submissionId=submission_id, keys=unwritten)
+    except Exception as e:
+        log.error('Fingerprint record failed', submissionId=submission_id, error=str(e))
+
+
+def validate_target(client: str, form_type: str) -> tuple:
+    """
+    Check that the client exists and accepts the form type
+    Returns: (is_valid, error_message, reason)
+    """
+    registry = load_remote_config()
+    is_valid, error = validate_client(client, registry)
+    if not is_valid:
+        return False, error, 'invalid_client'
+    record = registry.client(client)
+    if record is None or form_type not in record.form_types:
+        return False, f"Form type '{form_type}' not allowed for client '{client}'", 'invalid_form_type'
+    return True, "", ""
+
+
+def build_submission_item(client: str, form_type: str, form_data: dict, tags, source_ip: str,
+                          user_agent: str, attachments=None, duplicate=None) -> tuple:
+    """
+    Build the DynamoDB item for a validated, sanitized submission
+    Returns: (item, side effect names); with the outbox enabled the effects are already queued on the item
+    """
+    # Generate submission details
+    submission_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    timestamp = int(now.timestamp())
+    timestamp_iso = now.isoformat()
+
+    # Flatten email to top-level for GSI querying
+    email = form_data.get('email', '')
+
+    item = {
+        'submissionId': submission_id,
+        'timestamp': timestamp,
+        'timestampIso': timestamp_iso,
+        'client': client,
+        'formType': form_type,
+        'email': email,
+        'formData': form_data,
+        'sourceIp': source_ip,
+        'userAgent': user_agent,
+        'status': 'received',
+        'tags': tags
+    }
+    if attachments:
+        item['attachments'] = attachments
+    # status stays the delivery lifecycle (the outbox rewrites it); duplicates are marked in tags
+    if duplicate is not None:
+        item['tags'] = duplicate_tags(tags)
+        item['duplicateOf'] = duplicate.submission_id
+        item['duplicateKind'] = duplicate.kind
+
+    # Per-client retention: DynamoDB TTL deletes the item after retentionDays
+    retention_days = get_client_config(client).get('retentionDays')
+    if retention_days:
+        item['expiresAt'] = timestamp + int(retention_days) * 86400
+
+    # Side effects are either written with the item (outbox) or run inline
+    effects = get_side_effects(client, form_type, form_data)
+    if duplicate is not None and duplicate.policy == 'suppress':
+        effects = [name for name in effects if name not in NOTIFY_EFFECTS]
+    if CONFIG['outbox']['enabled'] and effects:
+        item.update(outbox_attributes(effects, timestamp))
+    return item, effects
+
+
+def submission_result(item: dict) -> dict:
+    """Success response body for a stored submission"""
+    return {
+        'submissionId': item['submissionId'],
+        'timestamp': item['timestampIso'],
+        'client': item['client'],
+        'type': item['formType'],
+        'status': 'received',
+        'message': 'Form submitted successfully'
+    }
+
+
+def store_submission(client: str, form_type: str, form_data: dict, tags, source_ip: str, user_agent: str,
+                     context=None, attachments=None, duplicate=None) -> dict:
+    """
+    Store a validated, sanitized submission and notify (inline or via the outbox)
+    Returns: the success response body
+    """
+    started = time.perf_counter()
+    item, effects = build_submission_item(client, form_type, form_data, tags, source_ip, user_agent, attachments,
+                                          duplicate)
+    get_submissions_table().put_item(Item=get_storage_encoder().encode(item))
+    metrics.observe('submit.store', started)
+    log.bind(submissionId=item['submissionId'])
+
+    if not CONFIG['outbox']['enabled']:
+        started = time.perf_counter()
+        effect_results = run_side_effects(effects, item, context)
+        metrics.observe('submit.side_effects', started)
+        if effect_results:
+            log.bind(effects=effect_results)
+    return submission_result(item)
+
+
+def submit_batch(event, context=None):
+    """
+    Handle a batch of submissions for one client (POST /forms/batch)
+    Authenticated with the client's batch API key. Each entry is validated
+    like POST /forms and gets its own result; accepted entries are written
+    with batch_write_item and their side effects queued in bulk.
+    """
+    settings = CONFIG['batch']
+    if not settings['enabled']:
+        return NOT_FOUND.respond()
+
+    source_ip = event['requestContext']['http']['sourceIp']
+    user_agent = event['requestContext']['http'].get('userAgent', 'Unknown')
+
+    body_str = event.get('body', '{}')
+    is_valid, error = validate_payload_size(body_str, settings['max_payload_size'])
+    if not is_valid:
+        log.bind(reason='payload_too_large')
+        return response(413, {'error': error})
+    try:
+        body = loads(body_str)
+    except json.JSONDecodeError:
+        log.bind(reason='invalid_json')
+        return INVALID_JSON.respond()
+    if not isinstance(body, dict):
+        return response(400, {'error': 'Request body must be an object'})
+
+    client = body.get('client', 'noclient')
+    entries = body.get('submissions')
+    log.bind(client=client)
+    try:
+        authorize(event.get('headers', {}), load_remote_config().get(client), 'batchApiKeySha256')
+    except ReadApiError as e:
+        log.bind(reason='batch_unauthorized')
+        return response(e.status, {'error': e.message})
+    if not isinstance(entries, list) or not entries:
+        return response(400, {'error': 'submissions must be a non-empty array'})
+    if len(entries) > settings['max_items']:
+        return response(413, {'error': f"A batch may contain at most {settings['max_items']} submissions"})
+
+    # Every entry counts as one request against the rate limits
+    if CONFIG['rate_limiting']['enabled']:
+        is_allowed, error = check_rate_limit(source_ip, client, len(entries))
+        if not is_allowed:
+            log.bind(reason='rate_limited')
+            return response(429, {'error': error})
+
+    results = [None] * len(entries)
+    pending = []
+    honeypot_field = CONFIG['security']['honeypot_field']
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            results[index] = {'index': index, 'status': 400, 'error': 'Submission must be an object'}
+            continue
+        form_type = entry.get('type', entry.get('formType'))
+        form_data = entry.get('data', entry.get('formData', {}))
+        if not isinstance(form_data, dict):
+            results[index] = {'index': index, 'status': 400, 'error': 'data must be an object'}
+            continue
+
+        if check_honeypot(form_data, honeypot_field):
+            results[index] = {'index': index, 'status': 201, 'submissionId': str(uuid.uuid4())}
+            continue
+        is_valid, error, _ = validate_target(client, form_type)
+        if not is_valid:
+            results[index] = {'index': index, 'status': 400, 'error': error}
+            continue
+        is_valid, errors = run_validation_plan(get_validation_plan(form_type), form_data)
+        if not is_valid:
+            results[index] = {'index': index, 'status': 400, 'error': 'Validation failed', 'details': errors}
+            continue
+        form_data, error = sanitize_form_data(form_data, CONFIG['sanitize_limits'])
+        if form_data is None:
+            results[index] = {'index': index, 'status': 400, 'error': error}
+            continue
+        pending.append((index, entry, form_type, form_data))
+
+    accepted = claim_batch_keys(pending, results, client, source_ip)
+
+    items = []
+    for index, entry, form_type, form_data, key in accepted:
+        item, effects = build_submission_item(client, form_type, form_data, entry.get('tags', ''), source_ip,
+                                              user_agent)
+        items.append((index, item, effects, key))
+
+    encode = get_storage_encoder().encode
+    unwritten = {item['submissionId'] for item in get_batch_writer().write([encode(item) for _, item, _, _ in items])}
+    idempotency = get_idempotency_store()
+    stored = []
+    for index, item, effects, key in items:
+        if item['submissionId'] in unwritten:
+            results[index] = {'index': index, 'status': 503, 'error': 'Submission could not be stored, retry later'}
+            if key is not None:
+                idempotency.release(key)
+            continue
+        result = submission_result(item)
+        results[index] = {'index': index, 'status': 201, 'submissionId': item['submissionId']}
+        if key is not None:
+            try:
+                idempotency.complete(key, 201, result)
+            except Exception as e:
+                log.warning('Idempotency record not completed', submissionId=item['submissionId'], error=str(e))
+        stored.append((item, effects))
+
+    if stored and not CONFIG['outbox']['enabled']:
+        run_batch_side_effects(stored, context)
+
+    accepted_count = sum(1 for result in results if result['status'] == 201)
+    log.bind(items=len(entries), accepted=accepted_count)
+    return response(201 if accepted_count == len(entries) else 207, {
+        'accepted': accepted_count,
+        'rejected': len(entries) - accepted_count,
+        'results': results
+    })
+
+
+def claim_batch_keys(pending: list, results: list, client: str, source_ip: str) -> list:
+    """
+    Claim the idempotencyKey of each batch entry that has one (in parallel)
+    Repeats get their original result, conflicts their error status
+    Returns: the entries still to be stored, each with its claimed key (or None)
+    """
+    idempotency = get_idempotency_store()
+    keyed = []
+    accepted = []
+    for index, entry, form_type, form_data in pending:
+        if idempotency is None or not entry.get('idempotencyKey'):
+            accepted.append((index, entry, form_type, form_data, None))
+            continue
+        try:
+            key = idempotency.key_for({idempotency.header: str(entry['idempotencyKey'])}, client, form_type,
+                                      form_data, source_ip)
+        except IdempotencyConflict as e:
+            results[index] = {'index': index, 'status': e.status, 'error': e.message}
+            continue
+        keyed.append((index, entry, form_type, form_data, key))
+
+    def claim(pending_entry):
+        try:
+            return idempotency.begin(pending_entry[4]), None
+        except IdempotencyConflict as e:
+            return None, e
+
+    claims = get_executor('batch_claims', CONFIG['batch']['max_workers']).map(claim, keyed) if keyed else []
+    for pending_entry, (replay, conflict) in zip(keyed, claims):
+        index = pending_entry[0]
+        if conflict is not None:
+            results[index] = {'index': index, 'status': conflict.status, 'error': conflict.message}
+        elif replay is not None:
+            results[index] = {'index': index, 'status': replay.status_code,
+                              'submissionId': replay.body.get('submissionId'), 'replayed': True}
+        else:
+            accepted.append(pending_entry)
+    return accepted
+
+
+def run_batch_side_effects(stored: list, context=None) -> dict:
+    """Run the side effects of a stored batch inline, as one deadline-bounded fan-out"""
+    tasks = {}
+    for item, effects in stored:
+        for name in effects:
+            tasks[f"{item['submissionId']}:{name}"] = (lambda name=name, item=item: SIDE_EFFECTS[name](item))
+    results = run_parallel(
+        tasks,
+        timeout=get_side_effect_budget(context),
+        max_workers=CONFIG['side_effects']['max_workers']
+    )
+    failed = {task: result for task, result in results.items() if result['outcome'] != 'ok'}
+    if failed:
+        log.warning('Batch side effects failed', failed=len(failed), total=len(results))
+    return results
+
+
+def get_side_effects(client: str, form_type: str, form_data: dict) -> list:
+    """Side effects a submission needs: notification, plus auto-reply, webhook and stats when configured"""
+    effects = ['notification']
+    if form_data.get('email') and get_compiled_emails(client, form_type).auto_reply:
+        effects.append('autoReply')
+    if get_client_config(client).get('webhookUrl'):
+        effects.append('webhook')
+    if STATS_TABLE and CONFIG['stats']['enabled']:
+        effects.append('stats')
+    return effects
+
+
+def get_side_effect_budget(context) -> float:
+    """Seconds side effects may take: the invocation's remaining time minus a safety margin"""
+    settings = CONFIG['side_effects']
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return settings['default_timeout_ms'] / 1000.0
+    remaining_ms = context.get_remaining_time_in_millis() - settings['deadline_margin_ms']
+    return max(remaining_ms, 0) / 1000.0
+
+
+def run_side_effects(effects: list, item: dict, context=None) -> dict:
+    """
+    Run side effects inline, in parallel, bounded by the Lambda deadline
+    Failures and timeouts are logged and do not fail the submission
+    Returns: per-effect outcome and duration
+    """
+    tasks = {name: (lambda name=name: SIDE_EFFECTS[name](item)) for name in effects}
+    results = run_parallel(
+        tasks,
+        timeout=get_side_effect_budget(context),
+        max_workers=CONFIG['side_effects']['max_workers']
+    )
+    for name, result in results.items():
+        if result['outcome'] != 'ok':
+            log.warning('Side effect failed', effect=name, outcome=result['outcome'],
+                        submissionId=item['submissionId'], error=result.get('error', ''))
+    return results
+
+
+def process_outbox(event, context):
+    """
+    Outbox worker entry point
+    Drains submissions from DynamoDB stream batches (event['Records']),
+    or sweeps OutboxIndex for due retries when invoked on a schedule
     """
-    Check rate limiting using DynamoDB
+    records = event.get('Records') if isinstance(event, dict) else None
+    worker = get_outbox_worker()
+    items = items_from_stream(records) if records else worker.pending()
+    summary = worker.drain(items)
+    log.info('Outbox drained', **summary)
+    metrics.flush()
+    return summary
+
+
+def run_export(event, context):
+    """
+    Bulk export entry point (invoked directly, not through API Gateway)
+    event: {"client"?, "format"?: "ndjson" | "csv", "from"?, "to"?, "fields"?: [...]}
+    Streams the export into EXPORT_BUCKET without holding it in memory and
+    returns the object key and a presigned download URL
+    """
+    settings = CONFIG['export']
+    client = event.get('client')
+    output_format = event.get('format', 'ndjson')
+    chunks = export_submissions(
+        get_submissions_table(),
+        client=client,
+        output_format=output_format,
+        start=parse_time(str(event['from']), None) if event.get('from') else None,
+        end=parse_time(str(event['to']), None) if event.get('to') else None,
+        fields=event.get('fields'),
+        segments=settings['segments'],
+        page_size=settings['page_size'],
+        max_pending_pages=settings['max_pending_pages'],
+        dynamodb=get_dynamodb()
+    )
+
+    key = f"exports/{client or 'all'}/{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.{output_format}"
+    reader = ChunkReader(chunks)
+    started = datetime.utcnow()
+    get_s3_client().upload_fileobj(
+        reader, EXPORT_BUCKET, key,
+        ExtraArgs={'ContentType': 'text/csv' if output_format == 'csv' else 'application/x-ndjson'}
+    )
+    url = get_s3_client().generate_presigned_url(
+        'get_object',
+        Params={'Bucket': EXPORT_BUCKET, 'Key': key},
+        ExpiresIn=settings['url_expiry_seconds']
+    )
+    log.info('Export written', client=client, key=key, bytes=reader.bytes_read,
+             seconds=round((datetime.utcnow() - started).total_seconds(), 1))
+    return {'bucket': EXPORT_BUCKET, 'key': key, 'bytes': reader.bytes_read, 'url': url}
+
+
+def run_archive(event, context):
+    """
+    Scheduled archival entry point
+    Moves submissions older than archive.after_days (or event["before"]) to
+    compressed NDJSON parts under archive/ in EXPORT_BUCKET and deletes them
+    from the table. Stops stop_margin_seconds before the Lambda timeout; the
+    next run carries on.
+    """
+    settings = CONFIG['archive']
+    event = event if isinstance(event, dict) else {}
+    if not settings['enabled']:
+        log.info('Archive skipped: archive.enabled is false')
+        return {'archived': 0, 'parts': 0, 'bytes': 0, 'notDeleted': 0, 'complete': True}
+
+    if event.get('before'):
+        before = parse_time(str(event['before']), None)
+    else:
+        before = int(datetime.utcnow().timestamp()) - settings['after_days'] * 86400
+
+    should_stop = None
+    if context is not None:
+        margin_ms = settings['stop_margin_seconds'] * 1000
+
+        def should_stop():
+            return context.get_remaining_time_in_millis() < margin_ms
+
+    archiver = Archiver(
+        S3Sink(get_s3_client(), EXPORT_BUCKET),
+        get_batch_writer().delete,
+        prefix=settings['prefix'],
+        max_buffer_bytes=settings['max_buffer_bytes'],
+        compression_level=settings['compression_level']
+    )
+    summary = archive_submissions(
+        get_submissions_table(),
+        archiver,
+        before,
+        segments=settings['segments'],
+        page_size=settings['page_size'],
+        should_stop=should_stop
+    )
+    log.info('Archive written', before=before, **summary)
+    return summary
+
+
+def check_rate_limit(ip_address: str, client: str, cost: int = 1) -> tuple:
+    """
+    Check rate limiting (in-container token bucket, then DynamoDB sliding window)
+    cost is the number of requests to record (a batch's entry count)
     Returns: (is_allowed, error_message)
     """
     try:
-        # For now, implement simple in-memory rate limiting
-        # In production, use DynamoDB with TTL
-        max_requests = CONFIG['rate_limiting']['max_requests_per_ip']
-        # TODO: Implement proper rate limiting with DynamoDB
-        return True, ""
+        limiter = get_rate_limiter()
+        if limiter is None:
+            return True, ""
+        return limiter.check(ip_address, client, cost)
     except Exception as e:
-        print(f"Rate limit check error: {str(e)}")
+        log.error('Rate limit check error', error=str(e))
         return True, ""  # Allow on error
 
 
-def send_notification_email(submission_id: str, client: str, form_type: str, form_data: dict, timestamp: str):
-    """Send email notification to admin"""
-    template = CONFIG['email_templates'].get(form_type, CONFIG['email_templates']['contacts'])
-    client_config = get_client_config(client)
+def check_ip_reputation(ip_address: str):
+    """
+    Check the IP reputation blocklist
+    Returns: the blockKey covering ip_address, or None (also when the check fails)
+    """
+    try:
+        reputation = get_ip_reputation()
+        if reputation is None:
+            return None
+        return reputation.blocked(ip_address)
+    except Exception as e:
+        log.error('IP reputation check error', error=str(e))
+        return None  # Allow on error
+
+
+def record_ip_signal(ip_address: str, signal: str):
+    """Count a bot signal (honeypot, rate_limited, validation_failed) against the source IP"""
+    try:
+        reputation = get_ip_reputation()
+        if reputation is None:
+            return
+        blocked = reputation.record(ip_address, signal)
+        if blocked:
+            log.warning('Source blocked', blockKey=blocked, signal=signal)
+    except Exception as e:
+        log.error('IP reputation update error', error=str(e))
+
+
+def get_email_renderer():
+    """Email renderer with compiled templates cached per (client, form type)"""
+    global email_renderer
+    if email_renderer is None:
+        email_renderer = EmailRenderer(CONFIG['email_templates'])
+    return email_renderer
+
+
+def get_compiled_emails(client: str, form_type: str):
+    """Compiled email templates for a client and form type (recompiled when the registry changes)"""
+    record = get_client_record(client)
+    if record is None:
+        return get_email_renderer().compiled(client, form_type, {})
+    return get_email_renderer().compiled(client, form_type, record.config, (record.name, record.version))
+
+
+def send_notification_email(submission_id: str, client: str, form_type: str, form_data: dict, timestamp: str,
+                            attachments=None):
+    """Send email notification to admin; attachments are linked, never inlined"""
+    compiled = get_compiled_emails(client, form_type)
 
     # Determine recipients
-    recipients = [client_config.get('notification_email', NOTIFICATION_EMAIL)]
-
-    # Build subject
-    subject = template['subject'].replace('{client}', client_config.get('name', client))
-
-    # Format form data
-    form_data_text = "\n".join([f"{key}: {value}" for key, value in form_data.items()])
-    form_data_rows = "".join([
-        f"<tr><td style='padding:8px;border:1px solid #ddd;'>{key}</td>"
-        f"<td style='padding:8px;border:1px solid #ddd;'>{value}</td></tr>"
-        for key, value in form_data.items()
-    ])
-
-    # Email body
-    client_name = client_config.get('name', client)
-    body_text = f"""
-New form submission received!
-
-Client: {client_name}
-Submission ID: {submission_id}
-Form Type: {form_type}
-Timestamp: {timestamp}
-
-Form Data:
-{form_data_text}
-
----
-This is an automated notification from GadgetCloud Forms.
-"""
+    recipients = [compiled.recipient or NOTIFICATION_EMAIL]
 
-    body_html = f"""
-<html>
-<head></head>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-  <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-    <h2 style="color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px;">
-      New Form Submission Received
-    </h2>
-
-    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
-      <p><strong>Client:</strong> {client_name}</p>
-      <p><strong>Submission ID:</strong> {submission_id}</p>
-      <p><strong>Form Type:</strong> {form_type}</p>
-      <p><strong>Timestamp:</strong> {timestamp}</p>
-    </div>
-
-    <h3 style="color: #2c3e50;">Form Data:</h3>
-    <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
-      <thead>
-        <tr style="background-color: #3498db; color: white;">
-          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Field</th>
-          <th style="padding: 10px; text-align: left; border: 1px solid #ddd;">Value</th>
-        </tr>
-      </thead>
-      <tbody>
-        {form_data_rows}
-      </tbody>
-    </table>
-
-    <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
-    <p style="color: #7f8c8d; font-size: 12px;">
-      This is an automated notification from GadgetCloud Forms.
-    </p>
-  </div>
-</body>
-</html>
-"""
+    subject, body_text, body_html = get_email_renderer().render_notification(
+        compiled, submission_id, timestamp, form_data, attachment_links(attachments) if attachments else None
+    )
 
     # Send email
-    ses_client.send_email(
+    get_ses_client().send_email(
         Source=NOTIFICATION_EMAIL,
         Destination={'ToAddresses': recipients},
         Message={
@@ -392,10 +1376,59 @@ This is an automated notification from GadgetCloud Forms.
     )
 
 
-def send_auto_reply(client: str, form_type: str, form_data: dict):
+def deliver_notification(item: dict):
+    """Notification side effect: buffer for digest-mode clients, otherwise email immediately"""
+    client = item['client']
+    settings = digest_settings(get_client_config(client), CONFIG['digest'])
+    store = get_digest_store()
+    if settings and store is not None:
+        if store.add(client, digest_entry(item), settings['window_seconds'], settings['max_items']):
+            return
+        log.info('Digest window already sent; notifying immediately', client=client)
+
+    send_notification_email(
+        item['submissionId'], client, item['formType'], item['formData'], item['timestampIso'],
+        item.get('attachments')
+    )
+
+
+def send_digest_email(window: dict):
+    """Send one digest window to the client's notification address"""
+    client = window['client']
+    client_config = get_client_config(client)
+    digest = render_digest(client_config.get('name', client), window)
+
+    get_ses_client().send_email(
+        Source=NOTIFICATION_EMAIL,
+        Destination={'ToAddresses': [client_config.get('notification_email', NOTIFICATION_EMAIL)]},
+        Message={
+            'Subject': {'Data': digest['subject'], 'Charset': 'UTF-8'},
+            'Body': {
+                'Text': {'Data': digest['text'], 'Charset': 'UTF-8'},
+                'Html': {'Data': digest['html'], 'Charset': 'UTF-8'}
+            }
+        }
+    )
+
+
+def send_digests(event, context):
+    """
+    Scheduled entry point for digest mode
+    Sends one summary email per closed (client, window) and marks it sent
+    """
+    store = get_digest_store()
+    if store is None:
+        log.warning('Digests not sent: DIGEST_TABLE is not configured')
+        return {'sent': 0, 'failed': 0, 'skipped': 0}
+    summary = store.send_due(send_digest_email, limit=CONFIG['digest']['batch_size'])
+    log.info('Digests processed', **summary)
+    return summary
+
+
+def send_auto_reply(client: str, form_type: str, form_data: dict, submission_id: str = '', timestamp: str = ''):
     """Send auto-reply to user if configured"""
-    template = CONFIG['email_templates'].get(form_type)
-    if not template or not template.get('autoReply'):
+    compiled = get_compiled_emails(client, form_type)
+    if not compiled.auto_reply:
         return
 
     # Get user email
@@ -403,36 +1436,11 @@ def send_auto_reply(client: str, form_type: str, form_data: dict):
     if not user_email:
         return
 
-    client_config = get_client_config(client)
-    client_name = client_config.get('name', client)
-
-    subject = template.get('autoReplySubject', 'Thank you for your submission')
-    message = template.get('autoReplyMessage', 'We have received your submission and will get back to you soon.')
-
-    body_html = f"""
-<html>
-<head></head>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-  <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-    <h2 style="color: #2c3e50;">{client_name}</h2>
-    <p>{message}</p>
-
-    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
-      <p><strong>Your submission details:</strong></p>
-      <p>Form Type: {form_type}</p>
-      <p>Submitted: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC</p>
-    </div>
-
-    <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
-    <p style="color: #7f8c8d; font-size: 12px;">
-      This is an automated message. Please do not reply to this email.
-    </p>
-  </div>
-</body>
-</html>
-"""
+    subject, body_html = get_email_renderer().render_auto_reply(
+        compiled, submission_id=submission_id, timestamp=timestamp, form_data=form_data
+    )
 
-    ses_client.send_email(
+    get_ses_client().send_email(
         Source=NOTIFICATION_EMAIL,
         Destination={'ToAddresses': [user_email]},
         Message={
@@ -443,11 +1451,7 @@ def send_auto_reply(client: str, form_type: str, form_data: dict):
 
 
 def call_webhook(client: str, submission_id: str, form_type: str, form_data: dict):
-    """Call webhook if configured for client"""
-    if not REQUESTS_AVAILABLE:
-        print("Webhook not called: requests library not available")
-        return
-
+    """Call webhook if configured for client (signed when the client has a webhookSecret)"""
     client_config = get_client_config(client)
     webhook_url = client_config.get('webhookUrl')
     if not webhook_url:
@@ -460,24 +1464,48 @@ def call_webhook(client: str, submission_id: str, form_type: str, form_data: dic
         'timestamp': datetime.utcnow().isoformat()
     }
 
-    response = requests.post(
-        webhook_url,
-        json=payload,
-        headers={'Content-Type': 'application/json'},
-        timeout=10
-    )
+    status = get_webhook_client().deliver(client, webhook_url, payload, secret=client_config.get('webhookSecret'))
+    log.info('Webhook called', client=client, submissionId=submission_id, status=status)
 
-    print(f"Webhook called: {webhook_url}, Status: {response.status_code}")
 
+def record_stats(item: dict):
+    """Count a submission in the stats rollups (skipped if stats were disabled since it was queued)"""
+    store = get_stats_store()
+    if store is not None:
+        store.record(item)
 
-def response(status_code: int, body: dict):
-    """Helper function to create API Gateway response"""
+
+# Side effect name -> callable taking the stored submission item (timed as effect.<name>,
+# inline or in the outbox worker)
+SIDE_EFFECTS = {
+    name: metrics.timed(f"effect.{name}", effect)
+    for name, effect in {
+        'notification': deliver_notification,
+        'autoReply': lambda item: send_auto_reply(item['client'], item['formType'], item['formData'],
+                                                  item['submissionId'], item['timestampIso']),
+        'webhook': lambda item: call_webhook(item['client'], item['submissionId'], item['formType'], item['formData']),
+        'stats': record_stats
+    }.items()
+}
+
+
+def redirect(location: str):
+    """302 to a short-lived URL (attachment downloads)"""
     return {
-        'statusCode': status_code,
+        'statusCode': 302,
         'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
+            'Location': location,
+            'Cache-Control': 'no-store',
             'X-API-Version': CONFIG['api_version']
         },
-        'body': json.dumps(body)
+        'body': ''
+    }
+
+
+def response(status_code: int, body: dict):
+    """Helper function to create API Gateway response"""
+    return {
+        'statusCode': status_code,
+        'headers': JSON_HEADERS,
+        'body': dumps(body)
     }
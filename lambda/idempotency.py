@@ -0,0 +1,221 @@
+"""
+Idempotency for form submissions
+A retried POST (same Idempotency-Key header, or the same content from the
+same source within a short window) returns the original response instead
+of creating a second submission. Keys are claimed with a conditional
+put_item on a TTL'd table; completed responses are also kept in a
+warm-container LRU so hot repeats skip the round trip.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from codec import dumps, loads
+
+STATUS_IN_PROGRESS = 'in_progress'
+STATUS_COMPLETED = 'completed'
+
+
+class IdempotencyKey(NamedTuple):
+    """A claimable key and the fingerprint of the request that carries it"""
+    key: str
+    fingerprint: str
+    ttl_seconds: int
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: Dict
+
+
+class IdempotencyConflict(Exception):
+    """The key is in use by a request still in progress, or by a different payload"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _conditional_check_failed(error: Exception) -> bool:
+    # botocore ClientError, matched by code so this module doesn't import botocore
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+
+def request_fingerprint(client: str, form_type: str, form_data: Dict) -> str:
+    """Stable hash of a submission's content (key order does not matter)"""
+    raw = json.dumps([client, form_type, form_data], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Claims keys, records completed responses and replays them
+
+    begin() returns a stored response for repeats (from the LRU or the
+    table), or None once this request owns the key. The claim is a
+    conditional put that succeeds when the key is new, expired (TTL
+    deletion is lazy) or held by an in-progress request whose lock ran out,
+    so a crashed invocation does not block its retries for the key's
+    lifetime. complete() stores the response; release() frees the key when
+    the request fails so a retry can run.
+    """
+
+    def __init__(
+        self,
+        table,
+        header: str = 'idempotency-key',
+        content_hash: bool = True,
+        key_ttl_seconds: int = 86400,
+        content_hash_ttl_seconds: int = 600,
+        in_progress_seconds: int = 30,
+        max_key_length: int = 128,
+        cache_entries: int = 1024,
+        clock=time.time
+    ):
+        self.table = table
+        self.header = header.lower()
+        self.content_hash = content_hash
+        self.key_ttl_seconds = key_ttl_seconds
+        self.content_hash_ttl_seconds = content_hash_ttl_seconds
+        self.in_progress_seconds = in_progress_seconds
+        self.max_key_length = max_key_length
+        self.cache_entries = cache_entries
+        self.clock = clock
+
+        self._cache: 'OrderedDict[str, Tuple[float, str, StoredResponse]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, table) -> 'IdempotencyStore':
+        """Build a store from the idempotency config block"""
+        return cls(
+            table,
+            header=config.get('header', 'idempotency-key'),
+            content_hash=config.get('content_hash', True),
+            key_ttl_seconds=config.get('key_ttl_seconds', 86400),
+            content_hash_ttl_seconds=config.get('content_hash_ttl_seconds', 600),
+            in_progress_seconds=config.get('in_progress_seconds', 30),
+            max_key_length=config.get('max_key_length', 128),
+            cache_entries=config.get('cache_entries', 1024)
+        )
+
+    def key_for(self, headers: Dict, client: str, form_type: str, form_data: Dict,
+                source_ip: str) -> Optional[IdempotencyKey]:
+        """
+        The request's key: its Idempotency-Key header (scoped to the client), or
+        a hash of its content and source IP when content hashing is enabled
+        Raises IdempotencyConflict (400) for an oversized header value
+        """
+        fingerprint = request_fingerprint(client, form_type, form_data)
+        header_value = (headers or {}).get(self.header)
+        if header_value:
+            if len(header_value) > self.max_key_length:
+                raise IdempotencyConflict(400, f"Idempotency-Key must not exceed {self.max_key_length} characters")
+            return IdempotencyKey(f"key#{client}#{header_value}", fingerprint, self.key_ttl_seconds)
+        if self.content_hash:
+            source = hashlib.sha256(f"{fingerprint}#{source_ip}".encode('utf-8')).hexdigest()
+            return IdempotencyKey(f"hash#{source}", fingerprint, self.content_hash_ttl_seconds)
+        return None
+
+    def lookup(self, key: IdempotencyKey) -> Optional[StoredResponse]:
+        """Completed response from the warm-container cache only (no I/O)"""
+        cached = self._cached(key.key, self.clock())
+        return self._replay(key, cached[0], cached[1]) if cached is not None else None
+
+    def begin(self, key: IdempotencyKey) -> Optional[StoredResponse]:
+        """
+        Replay a completed response for a repeat, or claim the key (returns None)
+        Raises IdempotencyConflict while another request holds the key, or when
+        the key was used with a different payload
+        """
+        now = self.clock()
+        cached = self._cached(key.key, now)
+        if cached is not None:
+            return self._replay(key, cached[0], cached[1])
+
+        try:
+            self.table.put_item(
+                Item={
+                    'idempotencyKey': key.key,
+                    'status': STATUS_IN_PROGRESS,
+                    'fingerprint': key.fingerprint,
+                    'lockedUntil': int(now) + self.in_progress_seconds,
+                    'expiresAt': int(now) + key.ttl_seconds
+                },
+                ConditionExpression=(
+                    'attribute_not_exists(idempotencyKey) OR expiresAt < :now '
+                    'OR (#status = :in_progress AND lockedUntil < :now)'
+                ),
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':now': int(now), ':in_progress': STATUS_IN_PROGRESS}
+            )
+            return None
+        except Exception as e:
+            if not _conditional_check_failed(e):
+                raise
+
+        record = self.table.get_item(Key={'idempotencyKey': key.key}, ConsistentRead=True).get('Item')
+        # A missing record expired between the put and the read; the caller retries either way
+        if record is None or record.get('status') != STATUS_COMPLETED:
+            raise IdempotencyConflict(409, 'Request with this Idempotency-Key is being processed, retry shortly')
+
+        stored = StoredResponse(int(record['statusCode']), loads(record['response']))
+        self._remember(key.key, int(record['expiresAt']), record.get('fingerprint', ''), stored)
+        return self._replay(key, record.get('fingerprint', ''), stored)
+
+    def complete(self, key: IdempotencyKey, status_code: int, body: Dict):
+        """Record the response for the claimed key"""
+        expires_at = int(self.clock()) + key.ttl_seconds
+        self.table.update_item(
+            Key={'idempotencyKey': key.key},
+            UpdateExpression='SET #status = :completed, statusCode = :code, #response = :response, '
+                             'expiresAt = :ttl REMOVE lockedUntil',
+            ExpressionAttributeNames={'#status': 'status', '#response': 'response'},
+            ExpressionAttributeValues={
+                ':completed': STATUS_COMPLETED,
+                ':code': status_code,
+                ':response': dumps(body),
+                ':ttl': expires_at
+            }
+        )
+        self._remember(key.key, expires_at, key.fingerprint, StoredResponse(status_code, body))
+
+    def release(self, key: IdempotencyKey):
+        """Free a claimed key after a failure so a retry can run"""
+        try:
+            self.table.delete_item(
+                Key={'idempotencyKey': key.key},
+                ConditionExpression='#status = :in_progress',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':in_progress': STATUS_IN_PROGRESS}
+            )
+        except Exception as e:
+            if not _conditional_check_failed(e):
+                raise
+
+    def _replay(self, key: IdempotencyKey, fingerprint: str, stored: StoredResponse) -> StoredResponse:
+        if fingerprint and fingerprint != key.fingerprint:
+            raise IdempotencyConflict(422, 'Idempotency-Key was already used with a different payload')
+        return stored
+
+    def _cached(self, key: str, now: float) -> Optional[Tuple[str, StoredResponse]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1], entry[2]
+
+    def _remember(self, key: str, expires_at: float, fingerprint: str, stored: StoredResponse):
+        with self._lock:
+            self._cache[key] = (expires_at, fingerprint, stored)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
@@ -0,0 +1,157 @@
+"""
+Structured logging for forms lambda
+One compact JSON object per line, gated by level before anything is
+formatted. Sensitive keys are redacted and long values truncated, raw
+events are only dumped for a sampled fraction of requests (or always at
+DEBUG), and each request ends with a single summary line.
+"""
+import contextvars
+import random
+import sys
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from codec import dumps
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+REDACTED = '[REDACTED]'
+
+DEFAULT_REDACT_FIELDS = ('authorization', 'cookie', 'set-cookie', 'x-api-key')
+
+_request = contextvars.ContextVar('request_log', default=None)
+
+
+class RequestContext:
+    """Fields collected over one request for its summary line"""
+    __slots__ = ('request_id', 'started', 'fields')
+
+    def __init__(self, request_id: Optional[str], fields: Dict):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.fields = fields
+
+
+def _write_stdout(line: str):
+    sys.stdout.write(line + '\n')
+
+
+class Logger:
+    """
+    JSON line logger
+
+    Messages below the configured level return before building a record.
+    Field values are scrubbed: keys in redact_fields (case-insensitive) are
+    replaced, strings longer than max_field_length are cut, and nesting
+    deeper than max_depth is elided. Lines logged inside a request carry its
+    requestId.
+    """
+
+    def __init__(
+        self,
+        level: str = 'INFO',
+        event_sample_rate: float = 0.0,
+        max_field_length: int = 256,
+        max_depth: int = 4,
+        redact_fields: Iterable[str] = DEFAULT_REDACT_FIELDS,
+        write=_write_stdout,
+        sample=random.random
+    ):
+        self.write = write
+        self.sample = sample
+        self.set_level(level)
+        self.event_sample_rate = event_sample_rate
+        self.max_field_length = max_field_length
+        self.max_depth = max_depth
+        self.redact_fields = frozenset(field.lower() for field in redact_fields)
+
+    def configure(self, config: Dict, level: Optional[str] = None):
+        """
+        Apply the monitoring config block in place (modules share one logger)
+        level (the LOG_LEVEL environment variable) overrides monitoring.log_level
+        """
+        self.set_level(level or config.get('log_level', 'INFO'))
+        self.event_sample_rate = config.get('event_sample_rate', 0.0)
+        self.max_field_length = config.get('max_field_length', 256)
+        self.redact_fields = frozenset(field.lower() for field in config.get('redact_fields', DEFAULT_REDACT_FIELDS))
+
+    def set_level(self, level: str):
+        self.threshold = LEVELS.get(str(level).upper(), LEVELS['INFO'])
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS[level] >= self.threshold
+
+    def debug(self, message: str, **fields):
+        if self.threshold <= 10:
+            self._emit('DEBUG', message, fields)
+
+    def info(self, message: str, **fields):
+        if self.threshold <= 20:
+            self._emit('INFO', message, fields)
+
+    def warning(self, message: str, **fields):
+        if self.threshold <= 30:
+            self._emit('WARNING', message, fields)
+
+    def error(self, message: str, **fields):
+        self._emit('ERROR', message, fields)
+
+    def log_event(self, event: Dict):
+        """Dump a scrubbed copy of the raw event at DEBUG, or for a sampled fraction of requests"""
+        if self.threshold > 10 and (self.event_sample_rate <= 0 or self.sample() >= self.event_sample_rate):
+            return
+        self._emit('DEBUG', 'Event', {'event': event})
+
+    def begin_request(self, request_id: Optional[str] = None, **fields) -> contextvars.Token:
+        """Start collecting summary fields; returns a token for end_request()"""
+        return _request.set(RequestContext(request_id, fields))
+
+    def bind(self, **fields):
+        """Add fields to the current request's summary line"""
+        request = _request.get()
+        if request is not None:
+            request.fields.update(fields)
+
+    def end_request(self, token: contextvars.Token, **fields):
+        """Emit the request's summary line and leave its context"""
+        request = _request.get()
+        if request is not None and self.threshold <= 20:
+            request.fields.update(fields)
+            request.fields['durationMs'] = round((time.perf_counter() - request.started) * 1000, 1)
+            self._emit('INFO', 'Request', request.fields)
+        _request.reset(token)
+
+    def scrub(self, value: Any, key: str = '', depth: int = 0) -> Any:
+        """Redact, truncate and depth-limit a value for logging"""
+        if key and key.lower() in self.redact_fields:
+            return REDACTED
+        if isinstance(value, str):
+            if len(value) > self.max_field_length:
+                return f"{value[:self.max_field_length]}...({len(value) - self.max_field_length} more chars)"
+            return value
+        if isinstance(value, dict):
+            if depth >= self.max_depth:
+                return '{...}'
+            return {k: self.scrub(v, str(k), depth + 1) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            if depth >= self.max_depth:
+                return '[...]'
+            return [self.scrub(v, '', depth + 1) for v in value]
+        return value
+
+    def _emit(self, level: str, message: str, fields: Dict):
+        record = {'level': level, 'message': message}
+        request = _request.get()
+        if request is not None and request.request_id:
+            record['requestId'] = request.request_id
+        for key, value in fields.items():
+            record[key] = self.scrub(value, key)
+        try:
+            self.write(dumps(record, default=str))
+        except Exception:
+            # Logging must never fail a request
+            pass
+
+
+# Shared by every module; handler.py applies the monitoring config on import
+log = Logger()
@@ -0,0 +1,317 @@
+"""
+Latency metrics and on-demand profiling for forms lambda
+Stages of a request are timed into in-container histograms and published
+as CloudWatch Embedded Metric Format (EMF) log lines, which CloudWatch
+turns into metrics without any API calls. Recording a stage is one
+perf_counter() call and a few list updates; with monitoring.track_metrics
+off it returns immediately. A request can also be run under cProfile, for
+a sampled fraction of requests or when it carries the admin profile header.
+"""
+import bisect
+import contextvars
+import cProfile
+import hashlib
+import hmac
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from codec import dumps
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended)
+DEFAULT_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# EMF accepts at most 100 values per metric in one line
+MAX_EMF_VALUES = 100
+
+_stages = contextvars.ContextVar('request_stages', default=None)
+
+
+def _write_stdout(line: str):
+    sys.stdout.write(line + '\n')
+
+
+class FileSink:
+    """Appends metric lines to a file (tests and local runs)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, line: str):
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+class Histogram:
+    """Bucketed latency counts, plus count, sum and max"""
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds=DEFAULT_BOUNDS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given rank (max for the open-ended bucket)"""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return 0.0
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 3)
+        }
+
+
+class Metrics:
+    """
+    Stage timings for the life of the container
+
+    observe(stage, started) records perf_counter() - started, in milliseconds,
+    into the stage's histogram, into the current request's stage map (for its
+    log summary line) and into the values of the next EMF line. A line is
+    written once flush_interval_seconds have passed or a stage has
+    MAX_EMF_VALUES values, and carries the request and error counts of the
+    window; when the error rate reaches alert_on_error_rate a warning is
+    logged as well. Histograms are cumulative and ride along in each line.
+    A stage that fills up between windows is written on its own, without the
+    counts and histograms, so busy containers don't pay for a full line every
+    MAX_EMF_VALUES requests.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        namespace: str = 'GadgetCloud/Forms',
+        service: str = 'forms',
+        flush_interval_seconds: float = 60,
+        alert_on_error_rate: Optional[float] = None,
+        write: Callable[[str], None] = _write_stdout,
+        clock=time.time
+    ):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.service = service
+        self.flush_interval_seconds = flush_interval_seconds
+        self.alert_on_error_rate = alert_on_error_rate
+        self.write = write
+        self.clock = clock
+
+        self.histograms: Dict[str, Histogram] = {}
+        self._values: Dict[str, List[float]] = {}
+        self._series: Dict[str, Tuple[Histogram, List[float]]] = {}
+        self._requests = 0
+        self._errors = 0
+        self._window_started = clock()
+        self._lock = threading.Lock()
+
+    def configure(self, config: Dict):
+        """Apply the monitoring config block in place (modules share one instance)"""
+        self.enabled = bool(config.get('track_metrics', False))
+        self.namespace = config.get('metrics_namespace', self.namespace)
+        self.flush_interval_seconds = config.get('metrics_flush_seconds', 60)
+        self.alert_on_error_rate = config.get('alert_on_error_rate')
+        if config.get('metrics_file'):
+            self.write = FileSink(config['metrics_file'])
+
+    def begin_request(self) -> Optional[contextvars.Token]:
+        """Start collecting the current request's stage timings"""
+        if not self.enabled:
+            return None
+        return _stages.set({})
+
+    def observe(self, stage: str, started: float):
+        """Record the time since started (a perf_counter() value) for stage"""
+        if not self.enabled:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        stages = _stages.get()
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + elapsed
+        with self._lock:
+            series = self._series.get(stage)
+            if series is None:
+                series = self._series[stage] = (Histogram(), [])
+                self.histograms[stage] = series[0]
+                self._values[stage] = series[1]
+            series[0].record(elapsed)
+            values = series[1]
+            values.append(elapsed)
+            if len(values) < MAX_EMF_VALUES:
+                return
+            full = values[:]
+            values.clear()
+        self._write_values({stage: full})
+
+    def timed(self, stage: str, function: Callable) -> Callable:
+        """function wrapped so that each call is observed as stage"""
+        def timed_call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(stage, started)
+        return timed_call
+
+    def request_stages(self) -> Dict[str, float]:
+        """The current request's stage timings in milliseconds (empty when metrics are off)"""
+        stages = _stages.get()
+        return {stage: round(elapsed, 2) for stage, elapsed in stages.items()} if stages else {}
+
+    def end_request(self, token: Optional[contextvars.Token], error: bool):
+        """Count the request and flush if the window is over"""
+        if token is None:
+            return
+        _stages.reset(token)
+        with self._lock:
+            self._requests += 1
+            self._errors += error
+            due = self.clock() - self._window_started >= self.flush_interval_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write one EMF line with the values collected since the last one"""
+        with self._lock:
+            values = {stage: stage_values[:] for stage, stage_values in self._values.items() if stage_values}
+            for stage_values in self._values.values():
+                stage_values.clear()
+            requests, errors = self._requests, self._errors
+            self._requests = self._errors = 0
+            self._window_started = self.clock()
+            histograms = {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+        if not values and not requests:
+            return
+
+        self._write_values(values, {'Requests': requests, 'Errors': errors}, histograms=histograms)
+        if self.alert_on_error_rate is not None and requests and errors / requests >= self.alert_on_error_rate:
+            from logger import log
+            log.warning('Error rate above threshold', errors=errors, requests=requests,
+                        threshold=self.alert_on_error_rate)
+
+    def _write_values(self, values: Dict[str, List[float]], counts: Optional[Dict[str, int]] = None, **extra):
+        """Write one EMF line: values per stage (as whole microseconds, cheaper to encode), plus optional counts"""
+        counts = counts or {}
+        metrics = [{'Name': stage, 'Unit': 'Microseconds'} for stage in values]
+        metrics += [{'Name': name, 'Unit': 'Count'} for name in counts]
+        record = {
+            '_aws': {
+                'Timestamp': int(self.clock() * 1000),
+                'CloudWatchMetrics': [{'Namespace': self.namespace, 'Dimensions': [['Service']], 'Metrics': metrics}]
+            },
+            'Service': self.service,
+            **counts,
+            **extra
+        }
+        for stage, stage_values in values.items():
+            record[stage] = [int(value * 1000) for value in stage_values]
+        try:
+            self.write(dumps(record))
+        except Exception:
+            # Metrics must never fail a request
+            pass
+
+
+class ProfileGate:
+    """
+    Decides which requests run under cProfile
+
+    A request is profiled when it is sampled (sample_rate) or when it sends
+    the profile header with the token whose SHA-256 is token_sha256. One
+    request is profiled at a time per process; others run normally.
+    finish() returns the top functions by cumulative time and, when
+    directory is set, also dumps the full stats there.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, header: str = 'x-profile', token_sha256: str = '',
+                 top: int = 25, directory: Optional[str] = None, sample=random.random):
+        self.sample_rate = sample_rate
+        self.header = header.lower()
+        self.token_sha256 = token_sha256.lower()
+        self.top = top
+        self.directory = directory
+        self.sample = sample
+        self._lock = threading.Lock()
+
+    def configure(self, config: Dict):
+        """Apply the monitoring config block in place"""
+        self.sample_rate = config.get('profile_sample_rate', 0.0)
+        self.header = config.get('profile_header', 'x-profile').lower()
+        self.token_sha256 = (config.get('profile_token_sha256') or '').lower()
+        self.top = config.get('profile_top', 25)
+        self.directory = config.get('profile_dir')
+
+    def trigger(self, headers: Dict) -> Optional[str]:
+        """'header' or 'sampled' when this request should be profiled, else None"""
+        if self.token_sha256:
+            token = (headers or {}).get(self.header)
+            if token and hmac.compare_digest(hashlib.sha256(token.encode('utf-8')).hexdigest(), self.token_sha256):
+                return 'header'
+        if self.sample_rate > 0 and self.sample() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def start(self, headers: Dict) -> Optional[cProfile.Profile]:
+        """A running profiler for this request, or None"""
+        if not self.trigger(headers) or not self._lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (or tool) is already active in this interpreter
+            self._lock.release()
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, label: str) -> Dict:
+        """Stop the profiler; returns the top entries (and the dump path when directory is set)"""
+        try:
+            profile.disable()
+        finally:
+            self._lock.release()
+
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        stats.sort_stats('cumulative')
+        top = []
+        for function in stats.fcn_list[:self.top]:
+            calls, primitive, own, cumulative, _ = stats.stats[function]
+            filename, line, name = function
+            top.append(f"{cumulative * 1000:.3f}ms {own * 1000:.3f}ms {calls} "
+                       f"{os.path.basename(filename)}:{line}({name})")
+        result = {'top': top}
+        if self.directory:
+            path = os.path.join(self.directory, f"{label}-{int(time.time() * 1000)}.prof")
+            stats.dump_stats(path)
+            result['path'] = path
+        return result
+
+
+# Shared by every module; handler.py applies the monitoring config on import
+metrics = Metrics()
+profiler = ProfileGate()
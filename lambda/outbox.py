@@ -0,0 +1,227 @@
+"""
+Transactional outbox for submission side effects
+A submission is written together with the side effects it still needs
+(notification, auto-reply, webhook). OutboxWorker drains them outside the
+request path, with retries and per-item status updates.
+"""
+import base64
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from logger import log
+from storage import decode_item
+
+OUTBOX_PENDING = 'pending'
+
+STATUS_PROCESSED = 'processed'
+STATUS_RETRYING = 'retrying'
+STATUS_FAILED = 'failed'
+
+
+def outbox_attributes(effects: List[str], now: int) -> Dict:
+    """
+    Attributes that enqueue a submission for the outbox worker
+    outboxState/nextAttemptAt key the sparse OutboxIndex and are removed once drained
+    """
+    return {
+        'pendingEffects': list(effects),
+        'effectAttempts': {},
+        'outboxState': OUTBOX_PENDING,
+        'nextAttemptAt': now
+    }
+
+
+def from_dynamodb(value: Any) -> Any:
+    """Convert DynamoDB Decimals back to int/float so items can be JSON encoded"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {key: from_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_dynamodb(item) for item in value]
+    return value
+
+
+def items_from_stream(records: Iterable[Dict]) -> List[Dict]:
+    """Extract pending submissions from DynamoDB stream records (NEW_IMAGE)"""
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+    items = []
+    for record in records:
+        image = record.get('dynamodb', {}).get('NewImage')
+        if not image:
+            continue
+        # Stream records carry binary attributes (formDataZ) base64-encoded
+        item = {
+            key: deserializer.deserialize({'B': base64.b64decode(value['B'])} if 'B' in value else value)
+            for key, value in image.items()
+        }
+        if item.get('outboxState') == OUTBOX_PENDING:
+            items.append(item)
+    return items
+
+
+class OutboxWorker:
+    """
+    Drains pending side effects from submission items
+
+    Each item is claimed with a conditional update that pushes nextAttemptAt
+    out by lease_seconds, so concurrent workers (stream batch and scheduled
+    sweep) never deliver the same effect twice. Failed effects are retried
+    with exponential backoff until max_attempts, after which the submission
+    status becomes 'failed' and the effect is recorded in failedEffects.
+    """
+
+    def __init__(
+        self,
+        table,
+        effects: Dict[str, Callable[[Dict], None]],
+        index_name: str = 'OutboxIndex',
+        batch_size: int = 25,
+        max_attempts: int = 5,
+        retry_base_seconds: int = 30,
+        lease_seconds: int = 120,
+        clock=time.time
+    ):
+        self.table = table
+        self.effects = effects
+        self.index_name = index_name
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+
+    @classmethod
+    def from_config(cls, config: Dict, table, effects: Dict[str, Callable[[Dict], None]]) -> 'OutboxWorker':
+        """Build a worker from the outbox config block"""
+        return cls(
+            table,
+            effects,
+            index_name=config.get('index_name', 'OutboxIndex'),
+            batch_size=config.get('batch_size', 25),
+            max_attempts=config.get('max_attempts', 5),
+            retry_base_seconds=config.get('retry_base_seconds', 30),
+            lease_seconds=config.get('lease_seconds', 120)
+        )
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict]:
+        """Query the sparse OutboxIndex for submissions that are due"""
+        result = self.table.query(
+            IndexName=self.index_name,
+            KeyConditionExpression='outboxState = :pending AND nextAttemptAt <= :now',
+            ExpressionAttributeValues={':pending': OUTBOX_PENDING, ':now': int(self.clock())},
+            Limit=limit or self.batch_size
+        )
+        return result.get('Items', [])
+
+    def drain(self, items: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Process a batch of pending submissions
+        Returns: counts per resulting status (plus 'skipped' for items claimed elsewhere)
+        """
+        summary = {STATUS_PROCESSED: 0, STATUS_RETRYING: 0, STATUS_FAILED: 0, 'skipped': 0}
+        for item in items:
+            if not self.claim(item):
+                summary['skipped'] += 1
+                continue
+            summary[self.process_item(item)] += 1
+        return summary
+
+    def claim(self, item: Dict) -> bool:
+        """Lease an item for this worker; False if it is not due or another worker holds it"""
+        now = int(self.clock())
+        try:
+            self.table.update_item(
+                Key=self._key(item),
+                UpdateExpression='SET nextAttemptAt = :lease',
+                ConditionExpression='outboxState = :pending AND nextAttemptAt <= :now',
+                ExpressionAttributeValues={
+                    ':pending': OUTBOX_PENDING,
+                    ':now': now,
+                    ':lease': now + self.lease_seconds
+                }
+            )
+            return True
+        except Exception as e:
+            # botocore ClientError, matched by code so this module doesn't import botocore
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def process_item(self, item: Dict) -> str:
+        """Run an item's pending effects and record the outcome; returns the new status"""
+        submission = decode_item(from_dynamodb(item))
+        attempts = dict(submission.get('effectAttempts') or {})
+        errors = {}
+        remaining = []
+        failed = list(submission.get('failedEffects') or [])
+
+        for name in submission.get('pendingEffects') or []:
+            attempts[name] = attempts.get(name, 0) + 1
+            error = self.run_effect(name, submission)
+            if not error:
+                continue
+            errors[name] = error[:500]
+            if attempts[name] >= self.max_attempts:
+                failed.append(name)
+            else:
+                remaining.append(name)
+
+        if remaining:
+            status = STATUS_RETRYING
+        elif failed:
+            status = STATUS_FAILED
+        else:
+            status = STATUS_PROCESSED
+
+        self._record(item, status, remaining, attempts, failed, errors)
+        return status
+
+    def run_effect(self, name: str, submission: Dict) -> str:
+        """Run one effect; returns an error message or an empty string on success"""
+        effect = self.effects.get(name)
+        if effect is None:
+            return f"Unknown side effect: {name}"
+        try:
+            effect(submission)
+            return ""
+        except Exception as e:
+            log.warning('Outbox effect failed', effect=name, submissionId=submission.get('submissionId'), error=str(e))
+            return str(e) or e.__class__.__name__
+
+    def _record(self, item: Dict, status: str, remaining: List[str], attempts: Dict,
+                failed: List[str], errors: Dict):
+        values = {
+            ':status': status,
+            ':attempts': attempts
+        }
+        updates = ['#status = :status', 'effectAttempts = :attempts']
+        if failed:
+            updates.append('failedEffects = :failed')
+            values[':failed'] = failed
+        if errors:
+            updates.append('effectErrors = :errors')
+            values[':errors'] = errors
+
+        if remaining:
+            attempt = max(attempts[name] for name in remaining)
+            updates += ['pendingEffects = :remaining', 'nextAttemptAt = :next']
+            values[':remaining'] = remaining
+            values[':next'] = int(self.clock()) + self.retry_base_seconds * 2 ** (attempt - 1)
+            expression = 'SET ' + ', '.join(updates)
+        else:
+            expression = 'SET ' + ', '.join(updates) + ' REMOVE outboxState, nextAttemptAt, pendingEffects'
+
+        self.table.update_item(
+            Key=self._key(item),
+            UpdateExpression=expression,
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues=values
+        )
+
+    @staticmethod
+    def _key(item: Dict) -> Dict:
+        return {'submissionId': item['submissionId'], 'timestamp': item['timestamp']}
@@ -0,0 +1,226 @@
+"""
+Rate limiting for forms lambda
+Two tiers: a per-container token bucket that rejects floods without any I/O,
+backed by a DynamoDB sliding-window counter shared by all warm containers
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Classic token bucket; refills continuously up to capacity"""
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, capacity: float, refill_rate: float, now: float, cost: int = 1) -> bool:
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * refill_rate)
+        self.updated = now
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+
+class _SharedState:
+    """Last known shared-window count and the share of it this container has reserved but not used"""
+    __slots__ = ('window', 'estimate', 'granted', 'synced_at')
+
+    def __init__(self):
+        self.window = -1
+        self.estimate = 0.0
+        self.granted = 0
+        self.synced_at = 0.0
+
+
+class WindowCounter:
+    """
+    Sliding-window counter stored in DynamoDB
+    One item per key holds a counter attribute per fixed window (w<index>);
+    the sliding count is the current window plus the overlapping share of
+    the previous one. A single UpdateItem increments, expires and reads it.
+    """
+
+    def __init__(self, table, window_seconds: int):
+        self.table = table
+        self.window_seconds = window_seconds
+
+    def add(self, key: str, amount: int, now: float) -> float:
+        """Atomically add amount to the current window; returns the sliding estimate"""
+        window = int(now // self.window_seconds)
+        result = self.table.update_item(
+            Key={'limitKey': key},
+            UpdateExpression='ADD #cur :amount SET expiresAt = :ttl REMOVE #stale',
+            ExpressionAttributeNames={
+                '#cur': f'w{window}',
+                '#stale': f'w{window - 2}'
+            },
+            ExpressionAttributeValues={
+                ':amount': amount,
+                ':ttl': (window + 2) * self.window_seconds
+            },
+            ReturnValues='ALL_NEW'
+        )
+        attributes = result.get('Attributes', {})
+        current = int(attributes.get(f'w{window}', amount))
+        previous = int(attributes.get(f'w{window - 1}', 0))
+        elapsed = (now % self.window_seconds) / self.window_seconds
+        return current + previous * (1 - elapsed)
+
+
+class RateLimiter:
+    """
+    Per-IP and per-client limits over a time window
+
+    The local tier keeps a token bucket per (source IP, client) and rejects
+    bursts above max_requests_per_ip without touching DynamoDB. The shared
+    tier counts per IP and per client across containers. Each write through
+    to DynamoDB also reserves sync_headroom of the budget that remained at
+    the last sync; later requests are admitted locally from that reservation
+    until it runs out (or the window rolls over / sync_interval_seconds
+    passes, when the unused part is handed back). Because every admitted
+    request is counted in DynamoDB before it is admitted, containers between
+    them never admit more than the limit. A request one shared window
+    rejects goes back to the reservation of the windows that had already
+    counted it, so a client-limit rejection does not use up the IP's quota.
+    """
+
+    def __init__(
+        self,
+        max_requests_per_ip: int,
+        max_requests_per_client: int,
+        window_seconds: int,
+        table=None,
+        sync_headroom: float = 0.5,
+        sync_interval_seconds: float = 60,
+        max_tracked_keys: int = 10000,
+        clock=time.time
+    ):
+        self.max_requests_per_ip = max_requests_per_ip
+        self.max_requests_per_client = max_requests_per_client
+        self.window_seconds = window_seconds
+        self.counter = WindowCounter(table, window_seconds) if table is not None else None
+        self.sync_headroom = sync_headroom
+        self.sync_interval_seconds = sync_interval_seconds
+        self.max_tracked_keys = max_tracked_keys
+        self.clock = clock
+
+        self._refill_rate = max_requests_per_ip / float(window_seconds)
+        self._buckets: 'OrderedDict[Tuple[str, str], TokenBucket]' = OrderedDict()
+        self._shared: 'OrderedDict[str, _SharedState]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, table=None) -> 'RateLimiter':
+        """Build a limiter from the rate_limiting config block"""
+        return cls(
+            max_requests_per_ip=config['max_requests_per_ip'],
+            max_requests_per_client=config['max_requests_per_client'],
+            window_seconds=config['time_window_minutes'] * 60,
+            table=table,
+            sync_headroom=config.get('sync_headroom', 0.5),
+            sync_interval_seconds=config.get('sync_interval_seconds', 60),
+            max_tracked_keys=config.get('max_tracked_keys', 10000)
+        )
+
+    def check(self, ip_address: str, client: str, cost: int = 1) -> Tuple[bool, str]:
+        """
+        Check and record a request
+        Returns: (is_allowed, error_message)
+        """
+        now = self.clock()
+
+        with self._lock:
+            if not self._take_local(ip_address, client, now, cost):
+                return False, "Rate limit exceeded. Please try again later."
+
+        if self.counter is None:
+            return True, ""
+
+        checks = (
+            (f"ip#{ip_address}", self.max_requests_per_ip),
+            (f"client#{client}", self.max_requests_per_client)
+        )
+        counted = []
+        for key, limit in checks:
+            if self._shared_count(key, limit, now, cost) > limit:
+                for admitted in counted:
+                    self._refund(admitted, cost)
+                return False, "Rate limit exceeded. Please try again later."
+            counted.append(key)
+
+        return True, ""
+
+    def _take_local(self, ip_address: str, client: str, now: float, cost: int) -> bool:
+        key = (ip_address, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.max_requests_per_ip, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_tracked_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(self.max_requests_per_ip, self._refill_rate, now, cost)
+
+    def _shared_count(self, key: str, limit: int, now: float, cost: int) -> float:
+        """Return the best known shared count including this request, syncing only when needed"""
+        window = int(now // self.window_seconds)
+
+        with self._lock:
+            state = self._shared.get(key)
+            if state is None:
+                state = _SharedState()
+                self._shared[key] = state
+                if len(self._shared) > self.max_tracked_keys:
+                    self._shared.popitem(last=False)
+            else:
+                self._shared.move_to_end(key)
+
+            used = state.estimate - state.granted
+            if (state.window == window
+                    and now - state.synced_at < self.sync_interval_seconds
+                    and state.granted >= cost
+                    and used + cost <= limit):
+                state.granted -= cost
+                return used + cost
+
+            # Reserve a share of the budget left at the last sync and hand back the unused reservation;
+            # a reservation from an earlier window stays counted there
+            if state.window == window:
+                grant = int(max(limit - used - cost, 0) * self.sync_headroom)
+                unused, state.granted = state.granted, 0
+            else:
+                grant = unused = 0
+
+        try:
+            estimate = self.counter.add(key, cost + grant - unused, now)
+        except Exception:
+            with self._lock:
+                state.granted += unused
+            raise
+
+        with self._lock:
+            state.window = window
+            state.estimate = estimate
+            state.granted = grant
+            state.synced_at = now
+        return estimate - grant
+
+    def _refund(self, key: str, cost: int):
+        """Return a request this key's window admitted but another rejected to the key's reservation"""
+        with self._lock:
+            state = self._shared.get(key)
+            if state is not None:
+                state.granted += cost
+
+
+def build_rate_limiter(config: Dict, table=None) -> Optional[RateLimiter]:
+    """Build a RateLimiter when rate limiting is enabled in config"""
+    if not config.get('enabled'):
+        return None
+    return RateLimiter.from_config(config, table)
@@ -0,0 +1,220 @@
+"""
+Submissions read API for forms lambda
+Lists a client's submissions by client, form type or email over a time
+range with a DynamoDB Query on the matching GSI; the form type and email
+indexes are partitioned by client and value together, so a page only
+ever reads the caller's items. Pages are capped
+server-side, only the requested attributes are projected, and the cursor
+is an opaque token bound to the query it came from; its key is checked
+against the query before it is sent to DynamoDB. The indexes only
+project the small attributes; a page that needs anything else (formData,
+tags, ...) is read from the table with one batch_get_item.
+"""
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from outbox import from_dynamodb
+from storage import INDEX_ATTRIBUTES, batch_get, client_key, decode_item, project, stored_attributes
+
+# Query parameter -> (index name, partition key attribute)
+INDEXES = {
+    'client': ('ClientIndex', 'client'),
+    'formType': ('FormTypeIndex', 'clientFormType'),
+    'email': ('EmailIndex', 'clientEmail')
+}
+
+# Upper bound for open-ended ranges; a fixed value keeps cursors valid across pages
+MAX_TIMESTAMP = 9999999999
+
+
+class ReadApiError(Exception):
+    """A rejected read request; status is the HTTP status to return"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SubmissionQuery(NamedTuple):
+    """A validated list request"""
+    client: str
+    index_name: str
+    partition_key: str
+    partition_value: str
+    start: int
+    end: int
+    limit: int
+    fields: Tuple[str, ...]
+    ascending: bool
+    cursor: Optional[Dict]
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hex SHA-256 of an API key, as stored in the client's readApiKeySha256 / batchApiKeySha256"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def authorize(headers: Dict, client_config: Optional[Dict], key_field: str = 'readApiKeySha256'):
+    """Check the bearer key against the client's key hash (readApiKeySha256 by default); raises ReadApiError"""
+    authorization = (headers or {}).get('authorization', '')
+    scheme, _, api_key = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not api_key.strip():
+        raise ReadApiError(401, 'Missing API key')
+    expected = (client_config or {}).get(key_field)
+    if not expected or not hmac.compare_digest(hash_api_key(api_key.strip()), expected.lower()):
+        raise ReadApiError(403, 'Invalid API key for client')
+
+
+def parse_time(value: Optional[str], default: int) -> int:
+    """Epoch seconds or an ISO 8601 timestamp (UTC when no offset is given)"""
+    if value is None or value == '':
+        return default
+    if value.isdigit():
+        return int(value)
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ReadApiError(400, f"Invalid time: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _fingerprint(index_name: str, partition_value: str, client: str, start: int, end: int, ascending: bool) -> str:
+    raw = json.dumps([index_name, partition_value, client, start, end, ascending], separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_cursor(last_key: Dict, fingerprint: str) -> str:
+    raw = json.dumps({'k': from_dynamodb(last_key), 'q': fingerprint}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _is_start_key(key, partition_key: str, partition_value: str, start: int, end: int) -> bool:
+    """Whether key is an index LastEvaluatedKey this query could have returned (table keys plus its partition)"""
+    if not isinstance(key, dict) or set(key) != {'submissionId', 'timestamp', partition_key}:
+        return False
+    submission_id, timestamp = key['submissionId'], key['timestamp']
+    return (isinstance(submission_id, str) and bool(submission_id)
+            and type(timestamp) is int and start <= timestamp <= end
+            and key[partition_key] == partition_value)
+
+
+def decode_cursor(cursor: str, fingerprint: str, partition_key: str, partition_value: str, start: int,
+                  end: int) -> Dict:
+    """
+    ExclusiveStartKey from a cursor
+    Raises: ReadApiError (400) for cursors from a different query and keys
+    DynamoDB would reject (wrong attributes or types, another partition,
+    outside the time range), so a forged or stale cursor never reaches it
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        decoded = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        key = decoded['k']
+        valid = (decoded.get('q') == fingerprint
+                 and _is_start_key(key, partition_key, partition_value, start, end))
+    except (ValueError, KeyError, TypeError, AttributeError):
+        valid = False
+    if not valid:
+        raise ReadApiError(400, 'Invalid cursor')
+    return key
+
+
+def parse_query(params: Dict, settings: Dict) -> SubmissionQuery:
+    """Validate query string parameters against the read_api config block"""
+    params = params or {}
+    client = params.get('client')
+    if not client:
+        raise ReadApiError(400, 'client is required')
+
+    selectors = [name for name in ('email', 'formType') if params.get(name)]
+    if len(selectors) > 1:
+        raise ReadApiError(400, 'Use at most one of email, formType')
+    by = selectors[0] if selectors else 'client'
+    index_name, partition_key = INDEXES[by]
+
+    start = parse_time(params.get('from'), 0)
+    end = parse_time(params.get('to'), MAX_TIMESTAMP)
+    if start > end:
+        raise ReadApiError(400, 'from must not be after to')
+
+    try:
+        limit = int(params.get('limit', settings['default_page_size']))
+    except ValueError:
+        raise ReadApiError(400, 'limit must be an integer')
+    limit = max(1, min(limit, settings['max_page_size']))
+
+    allowed = settings['allowed_fields']
+    if params.get('fields'):
+        fields = tuple(dict.fromkeys(field.strip() for field in params['fields'].split(',') if field.strip()))
+        unknown = [field for field in fields if field not in allowed]
+        if not fields:
+            raise ReadApiError(400, 'fields must name at least one attribute')
+        if unknown:
+            raise ReadApiError(400, f"Unknown fields: {', '.join(unknown)}")
+    else:
+        fields = tuple(settings['default_fields'])
+
+    order = params.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise ReadApiError(400, 'order must be asc or desc')
+    ascending = order == 'asc'
+
+    partition_value = params[by] if by == 'client' else client_key(client, params[by])
+    cursor = None
+    if params.get('cursor'):
+        fingerprint = _fingerprint(index_name, partition_value, client, start, end, ascending)
+        cursor = decode_cursor(params['cursor'], fingerprint, partition_key, partition_value, start, end)
+
+    return SubmissionQuery(client, index_name, partition_key, partition_value, start, end, limit, fields,
+                           ascending, cursor)
+
+
+def list_submissions(table, query: SubmissionQuery, dynamodb) -> Dict:
+    """
+    Run one page of a list request
+    Fields the index does not project are read from the table through the
+    dynamodb service resource.
+    Returns: {'items': [...], 'count': n, 'cursor': str or None}
+    """
+    attributes = stored_attributes(query.fields)
+    from_index = INDEX_ATTRIBUTES.issuperset(attributes)
+
+    names = {'#pk': query.partition_key, '#ts': 'timestamp'}
+    projection = []
+    for position, field in enumerate(attributes if from_index else ('submissionId', 'timestamp')):
+        names[f"#f{position}"] = field
+        projection.append(f"#f{position}")
+    values = {':pk': query.partition_value, ':start': query.start, ':end': query.end}
+
+    kwargs = {
+        'IndexName': query.index_name,
+        'KeyConditionExpression': '#pk = :pk AND #ts BETWEEN :start AND :end',
+        'ProjectionExpression': ', '.join(projection),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values,
+        'ScanIndexForward': query.ascending,
+        'Limit': query.limit
+    }
+    if query.cursor:
+        kwargs['ExclusiveStartKey'] = query.cursor
+
+    result = table.query(**kwargs)
+    stored = result.get('Items', [])
+    if not from_index and stored:
+        keys = [{'submissionId': item['submissionId'], 'timestamp': item['timestamp']} for item in stored]
+        stored = batch_get(dynamodb, table.name, keys, attributes)
+    items: List[Dict] = [project(decode_item(from_dynamodb(item)), query.fields) for item in stored]
+    last_key = result.get('LastEvaluatedKey')
+    cursor = None
+    if last_key:
+        fingerprint = _fingerprint(query.index_name, query.partition_value, query.client, query.start, query.end,
+                                   query.ascending)
+        cursor = encode_cursor(last_key, fingerprint)
+    return {'items': items, 'count': len(items), 'cursor': cursor}
@@ -0,0 +1,258 @@
+"""
+IP reputation for forms lambda
+Scores source IPs, and the networks they sit in, from the signals bots leave
+behind: honeypot hits, bursts of validation failures and rate limit
+rejections. Scores decay exponentially and live in a bounded in-container
+LRU. Once a score crosses its threshold the IP (or network) is blocked, at
+once in this container and, through a shared DynamoDB blocklist with a TTL,
+in every container on its next sync. Blocked sources are refused before
+their request body is even parsed.
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from logger import log
+
+# Score added per signal unless security.ip_reputation.weights overrides it
+DEFAULT_WEIGHTS = {'honeypot': 10.0, 'rate_limited': 4.0, 'validation_failed': 1.0}
+
+_IPV4_MAPPED = b'\x00' * 10 + b'\xff\xff'
+
+
+def network_of(ip_address: str, ipv4_prefix: int, ipv6_prefix: int) -> Optional[str]:
+    """
+    The CIDR an address is grouped into ('203.0.113.0/24'), or None when it isn't an IP
+    Masks the packed address directly; ipaddress is ~10x slower and this runs per request
+    """
+    family = socket.AF_INET6 if ':' in ip_address else socket.AF_INET
+    try:
+        packed = socket.inet_pton(family, ip_address)
+    except (OSError, ValueError):
+        return None
+    if packed[:12] == _IPV4_MAPPED:
+        # ::ffff:a.b.c.d is grouped like a.b.c.d, not into one /64 shared by every mapped address
+        family, packed = socket.AF_INET, packed[12:]
+    prefix = ipv4_prefix if family == socket.AF_INET else ipv6_prefix
+    host_bits = len(packed) * 8 - prefix
+    network = int.from_bytes(packed, 'big') >> host_bits << host_bits
+    return f"{socket.inet_ntop(family, network.to_bytes(len(packed), 'big'))}/{prefix}"
+
+
+class _Score:
+    """Exponentially decaying score"""
+    __slots__ = ('value', 'updated')
+
+    def __init__(self, now: float):
+        self.value = 0.0
+        self.updated = now
+
+    def add(self, amount: float, now: float, half_life: float) -> float:
+        self.value = self.value * 0.5 ** ((now - self.updated) / half_life) + amount
+        self.updated = now
+        return self.value
+
+
+class IpReputation:
+    """
+    Decaying per-IP and per-network scores, and the blocks they lead to
+
+    record(ip, signal) adds the signal's weight to the score of the IP
+    ('ip#<address>') and of its network ('net#<cidr>', /24 or /64 by
+    default). A key whose score reaches its threshold is blocked for
+    block_seconds and written to the blocklist table (blockKey, reason,
+    score, blockedAt, expiresAt). blocked(ip) answers from memory. The first
+    call loads the table's live blocks (a Scan, which the TTL keeps small);
+    after that a background thread re-reads it every sync_interval_seconds
+    while requests carry on with the current map. Scanned blocks are merged
+    in, keeping the later expiry, and blocks made here stay until a scan has
+    seen them, so a failed or not yet visible write never unblocks a source.
+    Deleting a block's item lifts it everywhere within one sync interval.
+    """
+
+    def __init__(
+        self,
+        table=None,
+        weights: Optional[Dict[str, float]] = None,
+        half_life_seconds: float = 900,
+        ip_threshold: float = 20,
+        network_threshold: float = 60,
+        block_seconds: int = 3600,
+        ipv4_prefix: int = 24,
+        ipv6_prefix: int = 64,
+        sync_interval_seconds: float = 60,
+        max_tracked_keys: int = 10000,
+        clock=time.time
+    ):
+        self.table = table
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.half_life_seconds = half_life_seconds
+        self.ip_threshold = ip_threshold
+        self.network_threshold = network_threshold
+        self.block_seconds = block_seconds
+        self.ipv4_prefix = ipv4_prefix
+        self.ipv6_prefix = ipv6_prefix
+        self.sync_interval_seconds = sync_interval_seconds
+        self.max_tracked_keys = max_tracked_keys
+        self.clock = clock
+
+        self._scores: 'OrderedDict[str, _Score]' = OrderedDict()
+        # blockKey -> expiry (epoch seconds)
+        self._blocked: Dict[str, float] = {}
+        # Blocks made in this container that no scan has returned yet
+        self._unconfirmed: Set[str] = set()
+        self._networks_blocked = False
+        self._loaded = False
+        self._synced_at = float('-inf')
+        self._syncing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, table=None) -> 'IpReputation':
+        """Build a tracker from the security.ip_reputation config block"""
+        return cls(
+            table,
+            weights=config.get('weights'),
+            half_life_seconds=config.get('half_life_seconds', 900),
+            ip_threshold=config.get('ip_threshold', 20),
+            network_threshold=config.get('network_threshold', 60),
+            block_seconds=config.get('block_seconds', 3600),
+            ipv4_prefix=config.get('ipv4_prefix', 24),
+            ipv6_prefix=config.get('ipv6_prefix', 64),
+            sync_interval_seconds=config.get('sync_interval_seconds', 60),
+            max_tracked_keys=config.get('max_tracked_keys', 10000)
+        )
+
+    def blocked(self, ip_address: str) -> Optional[str]:
+        """The blockKey that covers ip_address, or None"""
+        now = self.clock()
+        if self.table is not None and now - self._synced_at >= self.sync_interval_seconds:
+            self._start_sync(background=self._loaded)
+
+        if not self._blocked:
+            return None
+        keys = [f"ip#{ip_address}"]
+        if self._networks_blocked:
+            network = network_of(ip_address, self.ipv4_prefix, self.ipv6_prefix)
+            if network is not None:
+                keys.append(f"net#{network}")
+        with self._lock:
+            for key in keys:
+                expires = self._blocked.get(key)
+                if expires is None:
+                    continue
+                if expires > now:
+                    return key
+                del self._blocked[key]
+        return None
+
+    def record(self, ip_address: str, signal: str) -> Optional[str]:
+        """
+        Count a signal against ip_address and its network
+        Returns: the blockKey this pushed over its threshold (None when nothing new is blocked)
+        """
+        weight = self.weights.get(signal)
+        if not weight:
+            return None
+        now = self.clock()
+        network = network_of(ip_address, self.ipv4_prefix, self.ipv6_prefix)
+        checks = [(f"ip#{ip_address}", self.ip_threshold)]
+        if network is not None:
+            checks.append((f"net#{network}", self.network_threshold))
+
+        newly_blocked = []
+        with self._lock:
+            for key, threshold in checks:
+                score = self._scores.get(key)
+                if score is None:
+                    score = self._scores[key] = _Score(now)
+                    if len(self._scores) > self.max_tracked_keys:
+                        self._scores.popitem(last=False)
+                else:
+                    self._scores.move_to_end(key)
+                value = score.add(weight, now, self.half_life_seconds)
+                if value >= threshold and self._blocked.get(key, 0) <= now:
+                    self._blocked[key] = now + self.block_seconds
+                    self._unconfirmed.add(key)
+                    self._networks_blocked = self._networks_blocked or key.startswith('net#')
+                    newly_blocked.append((key, value))
+
+        for key, value in newly_blocked:
+            self._share(key, signal, value, now)
+        return newly_blocked[0][0] if newly_blocked else None
+
+    def _share(self, key: str, signal: str, score: float, now: float):
+        """Write a new block to the blocklist table"""
+        if self.table is None:
+            return
+        self.table.put_item(Item={
+            'blockKey': key,
+            'reason': signal,
+            'score': int(score),
+            'blockedAt': int(now),
+            'expiresAt': int(now + self.block_seconds)
+        })
+
+    def sync(self) -> bool:
+        """Merge the table's live blocks into the block map; returns False on error (retried next interval)"""
+        now = self.clock()
+        with self._lock:
+            # A failing table is retried next interval, not on every request
+            self._synced_at = now
+            self._syncing = True
+
+        try:
+            kwargs = {
+                'ProjectionExpression': '#key, #expires',
+                'FilterExpression': '#expires > :now',
+                'ExpressionAttributeNames': {'#key': 'blockKey', '#expires': 'expiresAt'},
+                'ExpressionAttributeValues': {':now': int(now)}
+            }
+            scanned = {}
+            while True:
+                result = self.table.scan(**kwargs)
+                for item in result.get('Items', []):
+                    scanned[item['blockKey']] = float(item['expiresAt'])
+                if not result.get('LastEvaluatedKey'):
+                    break
+                kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+        except Exception as e:
+            log.error('Error syncing IP blocklist', error=str(e))
+            return False
+        finally:
+            with self._lock:
+                self._syncing = False
+
+        with self._lock:
+            # Blocks the table no longer has were lifted (or expired) unless no scan has seen them yet
+            blocked = {key: expires for key, expires in self._blocked.items()
+                       if key in self._unconfirmed and expires > now}
+            for key, expires in scanned.items():
+                blocked[key] = max(expires, blocked.get(key, expires))
+            self._unconfirmed -= scanned.keys()
+            self._unconfirmed &= blocked.keys()
+            self._blocked = blocked
+            self._networks_blocked = any(key.startswith('net#') for key in blocked)
+            self._loaded = True
+        return True
+
+    def _start_sync(self, background: bool):
+        """Sync unless another caller already is (in a background thread once something has loaded)"""
+        with self._lock:
+            if self._syncing:
+                return
+            self._syncing = True
+            self._synced_at = self.clock()
+        if background:
+            threading.Thread(target=self.sync, name='ip-blocklist-sync', daemon=True).start()
+        else:
+            self.sync()
+
+
+def build_ip_reputation(config: Dict, table=None) -> Optional[IpReputation]:
+    """Build an IpReputation when security.block_suspicious_ips is on"""
+    if not config.get('block_suspicious_ips'):
+        return None
+    return IpReputation.from_config(config.get('ip_reputation', {}), table)
@@ -0,0 +1,184 @@
+"""
+Submission statistics for forms lambda
+Hourly and daily counters per client, kept up to date with one atomic ADD
+per granularity as each submission is processed (the 'stats' side effect).
+One item per (client, granularity, bucket) holds the bucket total and a
+counter per form type, so GET /forms/stats reads a time range with a single
+Query: O(buckets), however many submissions they count.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from read_api import ReadApiError, parse_time
+
+# Granularity -> bucket length in seconds
+GRANULARITIES = {'hour': 3600, 'day': 86400}
+
+# Default range when `from` is omitted
+DEFAULT_BUCKETS = {'hour': 24, 'day': 30}
+
+# Per-form-type counters are top-level attributes named with this prefix
+TYPE_PREFIX = 'type:'
+
+
+class StatsQuery(NamedTuple):
+    """A validated stats request; start and end are aligned to bucket boundaries"""
+    client: str
+    granularity: str
+    start: int
+    end: int
+    form_type: Optional[str]
+
+
+def bucket_start(timestamp: int, granularity: str) -> int:
+    size = GRANULARITIES[granularity]
+    return int(timestamp) - int(timestamp) % size
+
+
+def parse_stats_query(params: Dict, settings: Dict, now: int) -> StatsQuery:
+    """Validate query string parameters against the stats config block"""
+    params = params or {}
+    client = params.get('client')
+    if not client:
+        raise ReadApiError(400, 'client is required')
+
+    granularity = params.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ReadApiError(400, f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    size = GRANULARITIES[granularity]
+
+    end = bucket_start(parse_time(params.get('to'), now), granularity)
+    start = bucket_start(parse_time(params.get('from'), end - (DEFAULT_BUCKETS[granularity] - 1) * size), granularity)
+    if start > end:
+        raise ReadApiError(400, 'from must not be after to')
+    max_buckets = settings['max_buckets']
+    if (end - start) // size + 1 > max_buckets:
+        raise ReadApiError(400, f"Range spans more than {max_buckets} {granularity} buckets")
+
+    return StatsQuery(client, granularity, start, end, params.get('formType') or None)
+
+
+class StatsStore:
+    """
+    Rollup counters in the stats table
+
+    Items are keyed by statsKey '<client>#<granularity>' and bucket (the
+    bucket's start, epoch seconds); each carries total, one 'type:<formType>'
+    counter per form type and an expiresAt TTL from the granularity's
+    retention. A counter whose ADD is retried after an ambiguous failure can
+    count a submission twice; the figures are for reporting, not billing.
+    Query results are cached in the container for cache_ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        table,
+        retention_days: Optional[Dict[str, int]] = None,
+        cache_ttl_seconds: float = 30,
+        cache_entries: int = 256,
+        clock=time.time
+    ):
+        self.table = table
+        self.retention_seconds = {
+            granularity: int(days) * 86400
+            for granularity, days in (retention_days or {'hour': 35, 'day': 400}).items()
+        }
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_entries = cache_entries
+        self.clock = clock
+
+        self._cache: 'OrderedDict[StatsQuery, Tuple[float, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, table) -> 'StatsStore':
+        """Build a store from the stats config block"""
+        return cls(
+            table,
+            retention_days=config.get('retention_days'),
+            cache_ttl_seconds=config.get('cache_ttl_seconds', 30),
+            cache_entries=config.get('cache_entries', 256)
+        )
+
+    def record(self, item: Dict):
+        """Count a stored submission in its hour and day buckets"""
+        timestamp = int(item['timestamp'])
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(timestamp, granularity)
+            self.table.update_item(
+                Key={'statsKey': f"{item['client']}#{granularity}", 'bucket': bucket},
+                UpdateExpression='ADD #total :one, #type :one SET expiresAt = if_not_exists(expiresAt, :ttl)',
+                ExpressionAttributeNames={'#total': 'total', '#type': f"{TYPE_PREFIX}{item['formType']}"},
+                ExpressionAttributeValues={
+                    ':one': 1,
+                    ':ttl': bucket + GRANULARITIES[granularity] + self.retention_seconds[granularity]
+                }
+            )
+
+    def read(self, query: StatsQuery) -> Dict:
+        """
+        Counters for the query's range, one entry per non-empty bucket
+        Returns: {'client', 'granularity', 'from', 'to', 'total', 'buckets': [...]}
+        """
+        now = self.clock()
+        with self._lock:
+            cached = self._cache.get(query)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(query)
+                return cached[1]
+
+        kwargs = {
+            'KeyConditionExpression': 'statsKey = :key AND #bucket BETWEEN :start AND :end',
+            'ExpressionAttributeNames': {'#bucket': 'bucket'},
+            'ExpressionAttributeValues': {
+                ':key': f"{query.client}#{query.granularity}",
+                ':start': query.start,
+                ':end': query.end
+            }
+        }
+        if query.form_type:
+            kwargs['ProjectionExpression'] = '#bucket, #type'
+            kwargs['ExpressionAttributeNames']['#type'] = f"{TYPE_PREFIX}{query.form_type}"
+
+        items: List[Dict] = []
+        while True:
+            result = self.table.query(**kwargs)
+            items.extend(result.get('Items', []))
+            if not result.get('LastEvaluatedKey'):
+                break
+            kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+        buckets = []
+        for item in items:
+            form_types = {
+                name[len(TYPE_PREFIX):]: int(value) for name, value in item.items() if name.startswith(TYPE_PREFIX)
+            }
+            total = sum(form_types.values()) if query.form_type else int(item.get('total', 0))
+            if not total:
+                continue
+            start = int(item['bucket'])
+            buckets.append({
+                'start': start,
+                'startIso': datetime.utcfromtimestamp(start).isoformat(),
+                'total': total,
+                'formTypes': form_types
+            })
+
+        stats = {
+            'client': query.client,
+            'granularity': query.granularity,
+            'from': query.start,
+            'to': query.end + GRANULARITIES[query.granularity],
+            'formType': query.form_type,
+            'total': sum(bucket['total'] for bucket in buckets),
+            'buckets': buckets
+        }
+        with self._lock:
+            self._cache[query] = (now + self.cache_ttl_seconds, stats)
+            self._cache.move_to_end(query)
+            if len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return stats
@@ -0,0 +1,175 @@
+"""
+Storage encoding for submission items
+formData maps above a size threshold are written as one zlib-compressed
+JSON binary attribute (formDataZ), and values that can be derived on read
+are not stored: timestampIso is rebuilt from timestamp plus its microseconds
+(timestampUs), and only kept when it cannot be rebuilt exactly.
+Items also carry the client-scoped partition keys of FormTypeIndex and
+EmailIndex (clientFormType, clientEmail), which decode_item() drops again.
+decode_item() restores the item callers have always seen, for items
+written with or without the encoding.
+"""
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from codec import dumps_bytes, loads
+
+# Stored in `enc` on every encoded item; bump when the layout changes
+ENCODING_VERSION = 2
+COMPRESSED_FIELD = 'formDataZ'
+MICROSECONDS_FIELD = 'timestampUs'
+
+# Index partition keys that scope an attribute to its client ("<client>#<value>") -> that attribute
+CLIENT_KEYS = {
+    'clientFormType': 'formType',
+    'clientEmail': 'email'
+}
+
+# Attributes available from ClientIndex, FormTypeIndex and EmailIndex (keys plus INCLUDE projections);
+# anything else has to be read from the table
+INDEX_ATTRIBUTES = frozenset((
+    'submissionId', 'timestamp', MICROSECONDS_FIELD, 'timestampIso', 'client', 'formType', 'email', 'status'
+))
+
+# Fields decode_item() derives -> the stored attributes they are derived from
+DERIVED_FIELDS = {
+    'formData': ('formData', COMPRESSED_FIELD),
+    'timestampIso': ('timestamp', MICROSECONDS_FIELD, 'timestampIso')
+}
+
+# batch_get_item accepts at most 100 keys per call
+MAX_BATCH_GET = 100
+
+
+class StorageEncoder:
+    """Encodes submission items for put_item / batch_write_item"""
+
+    def __init__(self, compress_threshold_bytes: int = 1024, compression_level: int = 6):
+        self.compress_threshold_bytes = compress_threshold_bytes
+        self.compression_level = compression_level
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'StorageEncoder':
+        """Build an encoder from the storage config block"""
+        return cls(
+            compress_threshold_bytes=config.get('compress_threshold_bytes', 1024),
+            compression_level=config.get('compression_level', 6)
+        )
+
+    def encode(self, item: Dict) -> Dict:
+        """The item as stored: derived values dropped, large formData compressed"""
+        stored = dict(item)
+        stored['enc'] = ENCODING_VERSION
+        for key, attribute in CLIENT_KEYS.items():
+            # Index keys cannot be empty, so items without the attribute stay out of the index
+            if stored.get('client') and stored.get(attribute):
+                stored[key] = client_key(stored['client'], stored[attribute])
+        if 'timestampIso' in stored and 'timestamp' in stored:
+            microseconds = _microseconds(stored['timestamp'], stored['timestampIso'])
+            if microseconds is not None:
+                del stored['timestampIso']
+                if microseconds:
+                    stored[MICROSECONDS_FIELD] = microseconds
+
+        form_data = stored.get('formData')
+        if form_data:
+            raw = dumps_bytes(form_data)
+            if len(raw) >= self.compress_threshold_bytes:
+                compressed = zlib.compress(raw, self.compression_level)
+                if len(compressed) < len(raw):
+                    del stored['formData']
+                    stored[COMPRESSED_FIELD] = compressed
+        return stored
+
+
+def decode_item(item: Dict) -> Dict:
+    """The item as written by the handler (formData and timestampIso restored, `enc` dropped)"""
+    if COMPRESSED_FIELD not in item and 'enc' not in item and ('timestampIso' in item or 'timestamp' not in item):
+        return item
+
+    item = dict(item)
+    item.pop('enc', None)
+    for key in CLIENT_KEYS:
+        item.pop(key, None)
+    compressed = item.pop(COMPRESSED_FIELD, None)
+    if compressed is not None:
+        # boto3 returns binary attributes wrapped in boto3.dynamodb.types.Binary
+        item['formData'] = loads(zlib.decompress(bytes(getattr(compressed, 'value', compressed))))
+    microseconds = int(item.pop(MICROSECONDS_FIELD, 0))
+    if 'timestampIso' not in item and 'timestamp' in item:
+        item['timestampIso'] = _iso(item['timestamp'], microseconds)
+    return item
+
+
+def client_key(client: str, value: str) -> str:
+    """Partition key of a client's items in FormTypeIndex / EmailIndex"""
+    return f"{client}#{value}"
+
+
+def _iso(timestamp, microseconds: int) -> str:
+    return datetime.utcfromtimestamp(int(timestamp)).replace(microsecond=microseconds).isoformat()
+
+
+def _microseconds(timestamp, timestamp_iso) -> Optional[int]:
+    """The microseconds that rebuild timestamp_iso from timestamp, or None if it cannot be rebuilt exactly"""
+    try:
+        microseconds = datetime.fromisoformat(timestamp_iso).microsecond
+        return microseconds if _iso(timestamp, microseconds) == timestamp_iso else None
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def stored_attributes(fields: Iterable[str]) -> List[str]:
+    """Attributes to project so that decode_item() can produce `fields`"""
+    attributes = []
+    for field in fields:
+        for attribute in DERIVED_FIELDS.get(field, (field,)):
+            if attribute not in attributes:
+                attributes.append(attribute)
+    return attributes
+
+
+def project(item: Dict, fields: Optional[Sequence[str]]) -> Dict:
+    """Only the requested fields of a decoded item (all of it when fields is empty)"""
+    if not fields:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def batch_get(dynamodb, table_name: str, keys: List[Dict], attributes: Optional[Sequence[str]] = None,
+              max_attempts: int = 5, sleep=time.sleep) -> List[Dict]:
+    """
+    Fetch submissions by key with batch_get_item, in the order of keys
+    Missing items are skipped; keys still unprocessed after max_attempts raise
+    """
+    found = {}
+    for start in range(0, len(keys), MAX_BATCH_GET):
+        request: Dict[str, Any] = {'Keys': keys[start:start + MAX_BATCH_GET]}
+        if attributes:
+            names = {
+                f"#a{position}": attribute
+                for position, attribute in enumerate(dict.fromkeys(['submissionId', 'timestamp', *attributes]))
+            }
+            request['ProjectionExpression'] = ', '.join(names)
+            request['ExpressionAttributeNames'] = names
+
+        for attempt in range(max_attempts):
+            result = dynamodb.batch_get_item(RequestItems={table_name: request})
+            for item in result.get('Responses', {}).get(table_name, []):
+                found[(item['submissionId'], int(item['timestamp']))] = item
+            unprocessed = result.get('UnprocessedKeys', {}).get(table_name)
+            if not unprocessed:
+                break
+            request = unprocessed
+            if attempt + 1 == max_attempts:
+                raise RuntimeError(f"{len(unprocessed['Keys'])} keys still unprocessed by batch_get_item")
+            sleep(min(0.05 * 2 ** attempt, 1.0))
+
+    items = []
+    for key in keys:
+        item = found.get((key['submissionId'], int(key['timestamp'])))
+        if item is not None:
+            items.append(item)
+    return items
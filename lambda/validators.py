@@ -2,19 +2,24 @@
 Validation utilities for forms lambda
 """
 import re
-from typing import Dict, List, Any, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Any, Tuple, NamedTuple, Optional, Pattern, FrozenSet, Mapping, Container
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PHONE_PATTERN = r'^[+]?[0-9]{10,15}$'
+
+_EMAIL_RE = re.compile(EMAIL_PATTERN)
+_PHONE_RE = re.compile(PHONE_PATTERN)
 
 
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
 
 
 def validate_phone(phone: str) -> bool:
     """Validate phone number format"""
-    pattern = r'^[+]?[0-9]{10,15}$'
-    return bool(re.match(pattern, phone))
+    return bool(_PHONE_RE.match(phone))
 
 
 def validate_field(field_name: str, value: Any, constraints: Dict) -> Tuple[bool, str]:
@@ -96,7 +101,148 @@ def validate_form_data(
     return len(errors) == 0, errors
 
 
-def validate_client(client: str, allowed_clients: List[str]) -> Tuple[bool, str]:
+class FieldRule(NamedTuple):
+    """Pre-resolved constraints for a single field"""
+    name: str
+    field_type: str
+    required: bool
+    pattern: Optional[Pattern]
+    min_length: Optional[int]
+    max_length: Optional[int]
+
+
+class ValidationPlan(NamedTuple):
+    """Immutable validation plan for one form type"""
+    form_type: str
+    required: Tuple[Tuple[str, Optional[FieldRule]], ...]
+    required_fields: FrozenSet[str]
+    optional_fields: FrozenSet[str]
+    optional: Mapping[str, FieldRule]
+
+
+def compile_field_rule(field_name: str, constraints: Dict) -> FieldRule:
+    """Resolve a field_constraints entry into a FieldRule with compiled regexes"""
+    field_type = constraints.get('type', 'text')
+
+    pattern = None
+    if field_type == 'email':
+        pattern = _EMAIL_RE
+    elif field_type == 'phone':
+        pattern = _PHONE_RE
+    elif field_type == 'text' and 'pattern' in constraints:
+        pattern = re.compile(constraints['pattern'])
+
+    # Length bounds are only enforced for text fields (matches validate_field)
+    is_text = field_type == 'text'
+    return FieldRule(
+        name=field_name,
+        field_type=field_type,
+        required=bool(constraints.get('required')),
+        pattern=pattern,
+        min_length=constraints.get('minLength') if is_text else None,
+        max_length=constraints.get('maxLength') if is_text else None
+    )
+
+
+def compile_validation_plan(
+    form_type: str,
+    required_fields: List[str],
+    field_constraints: Dict
+) -> ValidationPlan:
+    """Build the validation plan for a single form type"""
+    rules = {
+        field: compile_field_rule(field, constraints)
+        for field, constraints in field_constraints.items()
+    }
+    required = tuple((field, rules.get(field)) for field in required_fields)
+    required_set = frozenset(required_fields)
+    optional = {field: rule for field, rule in rules.items() if field not in required_set}
+
+    return ValidationPlan(
+        form_type=form_type,
+        required=required,
+        required_fields=required_set,
+        optional_fields=frozenset(optional),
+        optional=MappingProxyType(optional)
+    )
+
+
+def compile_validation_plans(validation_rules: Dict, field_constraints: Dict) -> Dict[str, ValidationPlan]:
+    """
+    Compile a validation plan for every configured form type
+    The plan stored under None covers form types without validation_rules
+    """
+    plans = {
+        form_type: compile_validation_plan(form_type, required_fields, field_constraints)
+        for form_type, required_fields in validation_rules.items()
+    }
+    plans[None] = compile_validation_plan(None, [], field_constraints)
+    return MappingProxyType(plans)
+
+
+def check_field_rule(rule: FieldRule, value: Any) -> str:
+    """
+    Check a value against a compiled FieldRule
+    Returns: error message, or an empty string if the value is valid
+    """
+    if not value:
+        return f"{rule.name} is required" if rule.required else ""
+
+    field_type = rule.field_type
+    if field_type == 'email':
+        if not rule.pattern.match(str(value)):
+            return f"{rule.name} must be a valid email address"
+
+    elif field_type == 'phone':
+        if not rule.pattern.match(str(value)):
+            return f"{rule.name} must be a valid phone number"
+
+    elif field_type == 'text':
+        value_str = str(value)
+        if rule.pattern is not None and not rule.pattern.match(value_str):
+            return f"{rule.name} format is invalid"
+        if rule.min_length is not None and len(value_str) < rule.min_length:
+            return f"{rule.name} must be at least {rule.min_length} characters"
+        if rule.max_length is not None and len(value_str) > rule.max_length:
+            return f"{rule.name} must not exceed {rule.max_length} characters"
+
+    elif field_type == 'object':
+        if not isinstance(value, dict):
+            return f"{rule.name} must be an object"
+
+    return ""
+
+
+def run_validation_plan(plan: ValidationPlan, form_data: Dict) -> Tuple[bool, List[str]]:
+    """
+    Validate form data against a compiled plan
+    Produces the same errors, in the same order, as validate_form_data
+    Returns: (is_valid, list_of_errors)
+    """
+    errors = []
+
+    for field, rule in plan.required:
+        if field not in form_data:
+            errors.append(f"Missing required field: {field}")
+        elif rule is not None:
+            error = check_field_rule(rule, form_data[field])
+            if error:
+                errors.append(error)
+
+    # Skip the per-key walk entirely when no constrained optional field is present
+    optional_fields = plan.optional_fields
+    if not optional_fields.isdisjoint(form_data):
+        optional = plan.optional
+        for field, value in form_data.items():
+            if field in optional_fields:
+                error = check_field_rule(optional[field], value)
+                if error:
+                    errors.append(error)
+
+    return not errors, errors
+
+
+def validate_client(client: str, allowed_clients: Container[str]) -> Tuple[bool, str]:
     """
     Validate client parameter
     Returns: (is_valid, error_message)
@@ -131,16 +277,120 @@ def validate_form_type(
     return True, ""
 
 
-def sanitize_input(value: str, max_length: int = 1000) -> str:
-    """Sanitize user input to prevent XSS and injection attacks"""
-    if not isinstance(value, str):
-        return str(value)[:max_length]
+# Characters escaped in stored values and in email HTML
+_HTML_SPECIAL = frozenset('<>"\'')
 
-    # Remove potentially dangerous characters
-    sanitized = value.replace('<', '&lt;').replace('>', '&gt;')
-    sanitized = sanitized.replace('"', '&quot;').replace("'", '&#x27;')
 
-    return sanitized[:max_length]
+def escape_html(value: str) -> str:
+    """
+    HTML-escape a string (stored form values, email and digest HTML)
+    Chained str.replace beats a str.translate table with multi-character
+    replacements by several times in CPython; clean values skip it entirely
+    """
+    if _HTML_SPECIAL.isdisjoint(value):
+        return value
+    return value.replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#x27;')
+
+
+def sanitize_input(value: str, max_length: int = 1000) -> str:
+    """Sanitize user input to prevent XSS and injection attacks"""
+    # Truncate before escaping so an entity is never cut in half
+    return escape_html(str(value)[:max_length])
+
+
+class SanitizeLimits(NamedTuple):
+    """Structural limits and per-field string lengths for sanitize_form_data"""
+    max_depth: int
+    max_keys: int
+    max_size: int
+    default_max_length: int
+    field_max_length: Mapping[str, int]
+
+
+def compile_sanitize_limits(field_constraints: Dict, security: Dict) -> SanitizeLimits:
+    """Resolve the security limits and every field's maxLength once per container"""
+    return SanitizeLimits(
+        max_depth=security.get('max_form_depth', 8),
+        max_keys=security.get('max_form_keys', 500),
+        max_size=security.get('max_form_size', 65536),
+        default_max_length=security.get('default_max_length', 1000),
+        field_max_length=MappingProxyType({
+            field: constraints['maxLength']
+            for field, constraints in field_constraints.items()
+            if 'maxLength' in constraints
+        })
+    )
+
+
+def sanitize_form_data(form_data: Any, limits: SanitizeLimits) -> Tuple[Optional[Dict], str]:
+    """
+    Escape every string in a submission, including nested objects and lists
+    Walks the payload iteratively in one pass. Each string is truncated to its
+    top-level field's maxLength (nested values inherit it), or to
+    default_max_length for fields without one. Rejects payloads nested deeper
+    than max_depth, with more than max_keys keys and list items in total, or
+    whose sanitized strings add up to more than max_size characters.
+    Returns: (sanitized_data, error_message); sanitized_data is None on error
+    """
+    if not isinstance(form_data, dict):
+        return None, "Form data must be an object"
+
+    field_max_length = limits.field_max_length
+    default_max_length = limits.default_max_length
+    max_depth = limits.max_depth
+    max_keys = limits.max_keys
+    max_size = limits.max_size
+    clean = _HTML_SPECIAL.isdisjoint
+
+    sanitized = {}
+    stack = [(form_data, sanitized, 1, default_max_length)]
+    keys = 0
+    size = 0
+    while stack:
+        source, target, depth, max_length = stack.pop()
+        if depth > max_depth:
+            return None, f"Form data must not be nested more than {max_depth} levels deep"
+        keys += len(source)
+        if keys > max_keys:
+            return None, f"Form data must not contain more than {max_keys} fields"
+
+        # Escaping is inlined (clean values are the common case); keys are always strings in JSON
+        is_dict = isinstance(source, dict)
+        for key, value in (source.items() if is_dict else enumerate(source)):
+            if depth == 1:
+                max_length = field_max_length.get(key, default_max_length)
+
+            value_type = type(value)
+            if value_type is str:
+                if len(value) > max_length:
+                    value = value[:max_length]
+                if not clean(value):
+                    value = escape_html(value)
+                size += len(value)
+            elif value_type is dict:
+                child = {}
+                stack.append((value, child, depth + 1, max_length))
+                value = child
+            elif value_type is list:
+                child = []
+                stack.append((value, child, depth + 1, max_length))
+                value = child
+            elif value is not None and value_type not in (bool, int, float):
+                value = escape_html(str(value)[:max_length])
+                size += len(value)
+
+            if is_dict:
+                if not clean(key):
+                    key = escape_html(key)
+                size += len(key)
+                target[key] = value
+            else:
+                target.append(value)
+
+        if size > max_size:
+            return None, f"Form data must not exceed {max_size} characters once sanitized"
+
+    return sanitized, ""
 
 
 def check_honeypot(form_data: Dict, honeypot_field: str) -> bool:
@@ -0,0 +1,286 @@
+"""
+Webhook delivery for forms lambda
+Keep-alive connection pools per webhook host, bounded exponential-backoff
+retries, a per-client circuit breaker and optional HMAC-SHA256 signatures.
+Uses requests when the layer is installed, otherwise stdlib http.client.
+"""
+import hashlib
+import hmac
+import http.client
+import random
+import ssl
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from codec import dumps_bytes
+
+# Optional: requests library (not available by default in Lambda)
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+SIGNATURE_HEADER = 'X-GadgetCloud-Signature'
+TIMESTAMP_HEADER = 'X-GadgetCloud-Timestamp'
+
+# Retry on throttling and server errors; other 4xx responses are final
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class WebhookError(Exception):
+    """Webhook delivery failed after all attempts"""
+
+
+class CircuitOpenError(WebhookError):
+    """Delivery skipped because the client's circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failed deliveries;
+    after reset_timeout one trial delivery is let through (half-open) and
+    its result closes or re-opens the circuit
+    """
+    __slots__ = ('failure_threshold', 'reset_timeout', 'failures', 'opened_at', 'trial_in_flight')
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def allow(self, now: float) -> bool:
+        if self.opened_at is None:
+            return True
+        if now - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = now
+
+
+class _StdlibTransport:
+    """Per-host pools of keep-alive http.client connections"""
+
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self._pools: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def post(self, url: str, body: bytes, headers: Dict, timeout: float) -> int:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        connection, reused = self._acquire(key, timeout)
+        try:
+            try:
+                status, will_close = self._send(connection, path, body, headers, timeout)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                connection.close()
+                connection = self._connect(key, timeout)
+                status, will_close = self._send(connection, path, body, headers, timeout)
+        except Exception:
+            connection.close()
+            raise
+
+        if will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+        return status
+
+    @staticmethod
+    def _send(connection, path: str, body: bytes, headers: Dict, timeout: float) -> Tuple[int, bool]:
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        connection.request('POST', path, body=body, headers=headers)
+        result = connection.getresponse()
+        result.read()
+        return result.status, result.will_close
+
+    def _acquire(self, key: Tuple[str, str, int], timeout: float):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool:
+                return pool.pop(), True
+        return self._connect(key, timeout), False
+
+    def _connect(self, key: Tuple[str, str, int], timeout: float):
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _release(self, key: Tuple[str, str, int], connection):
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.pool_size:
+                pool.append(connection)
+                return
+        connection.close()
+
+
+class _RequestsTransport:
+    """requests.Session; its HTTPAdapter keeps one keep-alive pool per host"""
+
+    def __init__(self, pool_size: int):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url: str, body: bytes, headers: Dict, timeout: float) -> int:
+        return self.session.post(url, data=body, headers=headers, timeout=timeout).status_code
+
+
+class WebhookClient:
+    """
+    Delivers webhook payloads
+    A delivery is up to max_attempts requests with exponential backoff (with
+    jitter, capped at backoff_max_seconds) on connection errors, timeouts,
+    429 and 5xx. A delivery that still fails counts against the client's
+    circuit breaker; while it is open, deliveries fail fast with
+    CircuitOpenError instead of waiting for a dead endpoint.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = 5,
+        max_attempts: int = 3,
+        backoff_base_seconds: float = 0.2,
+        backoff_max_seconds: float = 2,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 60,
+        pool_size: int = 4,
+        use_requests: bool = REQUESTS_AVAILABLE,
+        clock=time.monotonic,
+        sleep=time.sleep
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.transport = _RequestsTransport(pool_size) if use_requests else _StdlibTransport(pool_size)
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'WebhookClient':
+        """Build a client from the webhooks config block"""
+        return cls(
+            timeout_seconds=config.get('timeout_seconds', 5),
+            max_attempts=config.get('max_attempts', 3),
+            backoff_base_seconds=config.get('backoff_base_seconds', 0.2),
+            backoff_max_seconds=config.get('backoff_max_seconds', 2),
+            failure_threshold=config.get('failure_threshold', 5),
+            reset_timeout_seconds=config.get('reset_timeout_seconds', 60),
+            pool_size=config.get('pool_size', 4)
+        )
+
+    def deliver(self, client: str, url: str, payload: Dict, secret: Optional[str] = None) -> int:
+        """
+        POST payload to url on behalf of client
+        Returns: final HTTP status code
+        Raises: CircuitOpenError, WebhookError
+        """
+        breaker = self._breaker(client)
+        with self._lock:
+            allowed = breaker.allow(self.clock())
+        if not allowed:
+            raise CircuitOpenError(f"Webhook circuit open for client '{client}'")
+
+        body = dumps_bytes(payload)
+        headers = {'Content-Type': 'application/json'}
+        if secret:
+            headers.update(sign_payload(body, secret))
+
+        try:
+            status = self._deliver_with_retries(url, body, headers)
+        except Exception:
+            with self._lock:
+                breaker.record_failure(self.clock())
+            raise
+
+        with self._lock:
+            breaker.record_success()
+        return status
+
+    def circuit_state(self, client: str) -> str:
+        """'closed', 'open' or 'half_open' (for logging and diagnostics)"""
+        breaker = self._breakers.get(client)
+        if breaker is None or breaker.opened_at is None:
+            return 'closed'
+        return 'half_open' if breaker.trial_in_flight else 'open'
+
+    def _deliver_with_retries(self, url: str, body: bytes, headers: Dict) -> int:
+        last_error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                status = self.transport.post(url, body, headers, self.timeout_seconds)
+                if status < 400:
+                    return status
+                if status not in RETRYABLE_STATUS:
+                    raise WebhookError(f"Webhook rejected with HTTP {status}")
+                last_error = WebhookError(f"Webhook failed with HTTP {status}")
+            except WebhookError:
+                raise
+            except Exception as e:
+                last_error = e
+
+            if attempt < self.max_attempts:
+                delay = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (attempt - 1))
+                self.sleep(delay * random.uniform(0.5, 1.0))
+
+        raise WebhookError(f"Webhook failed after {self.max_attempts} attempts: {last_error}")
+
+    def _breaker(self, client: str) -> CircuitBreaker:
+        breaker = self._breakers.get(client)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    client, CircuitBreaker(self.failure_threshold, self.reset_timeout_seconds)
+                )
+        return breaker
+
+
+def sign_payload(body: bytes, secret: str, timestamp: Optional[int] = None) -> Dict[str, str]:
+    """
+    HMAC-SHA256 signature headers for a webhook body
+    Receivers recompute hex(HMAC(secret, f"{timestamp}.{body}")) and compare
+    """
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    digest = hmac.new(secret.encode('utf-8'), timestamp.encode('ascii') + b'.' + body, hashlib.sha256)
+    return {
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: f"sha256={digest.hexdigest()}"
+    }
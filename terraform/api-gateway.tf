@@ -90,3 +90,49 @@ resource "aws_apigatewayv2_route" "forms" {
   route_key = "POST /forms"
   target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
 }
+
+# Batch Forms Route (authenticated in the Lambda with the client's batch API key)
+resource "aws_apigatewayv2_route" "forms_batch" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "POST /forms/batch"
+  target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
+}
+
+# Submissions Read Route (authenticated in the Lambda with the client's read API key)
+resource "aws_apigatewayv2_route" "submissions" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "GET /forms/submissions"
+  target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
+}
+
+# Submission Stats Route (authenticated like the read route)
+resource "aws_apigatewayv2_route" "stats" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "GET /forms/stats"
+  target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
+}
+
+# Attachment Routes (upload sessions, parts for the local backend, completion and signed downloads)
+resource "aws_apigatewayv2_route" "attachments_create" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "POST /forms/attachments"
+  target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
+}
+
+resource "aws_apigatewayv2_route" "attachments_part" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "PUT /forms/attachments/{attachmentId}/parts/{partNumber}"
+  target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
+}
+
+resource "aws_apigatewayv2_route" "attachments_complete" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "POST /forms/attachments/{attachmentId}/complete"
+  target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
+}
+
+resource "aws_apigatewayv2_route" "attachments_download" {
+  api_id    = aws_apigatewayv2_api.main.id
+  route_key = "GET /forms/attachments/{attachmentId}"
+  target    = "integrations/${aws_apigatewayv2_integration.lambda.id}"
+}
@@ -5,6 +5,10 @@ resource "aws_dynamodb_table" "form_submissions" {
   hash_key     = "submissionId"
   range_key    = "timestamp"
 
+  # Stream new submissions to the outbox worker
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   attribute {
     name = "submissionId"
     type = "S"
@@ -16,7 +20,7 @@ resource "aws_dynamodb_table" "form_submissions" {
   }
 
   attribute {
-    name = "formType"
+    name = "clientFormType"
     type = "S"
   }
 
@@ -26,34 +30,65 @@ resource "aws_dynamodb_table" "form_submissions" {
   }
 
   attribute {
-    name = "email"
+    name = "clientEmail"
+    type = "S"
+  }
+
+  attribute {
+    name = "outboxState"
     type = "S"
   }
 
-  # Global Secondary Index for querying by form type
+  attribute {
+    name = "nextAttemptAt"
+    type = "N"
+  }
+
+  # Query indexes project only the small attributes (storage.INDEX_ATTRIBUTES);
+  # formData and the rest are read from the table with batch_get_item when asked for
+
+  # Global Secondary Index for querying a client's submissions by form type ("<client>#<formType>")
   global_secondary_index {
-    name            = "FormTypeIndex"
-    hash_key        = "formType"
-    range_key       = "timestamp"
-    projection_type = "ALL"
+    name               = "FormTypeIndex"
+    hash_key           = "clientFormType"
+    range_key          = "timestamp"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["client", "formType", "email", "status", "timestampUs", "timestampIso"]
   }
 
   # Global Secondary Index for querying by client
   global_secondary_index {
-    name            = "ClientIndex"
-    hash_key        = "client"
-    range_key       = "timestamp"
-    projection_type = "ALL"
+    name               = "ClientIndex"
+    hash_key           = "client"
+    range_key          = "timestamp"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["formType", "email", "status", "timestampUs", "timestampIso"]
   }
 
-  # Global Secondary Index for querying by email
+  # Global Secondary Index for querying a client's submissions by email ("<client>#<email>")
   global_secondary_index {
-    name            = "EmailIndex"
-    hash_key        = "email"
-    range_key       = "timestamp"
+    name               = "EmailIndex"
+    hash_key           = "clientEmail"
+    range_key          = "timestamp"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["client", "formType", "email", "status", "timestampUs", "timestampIso"]
+  }
+
+  # Sparse index of submissions with undelivered side effects (outbox worker sweeps);
+  # items only stay in it while pending, so projecting everything costs little
+  global_secondary_index {
+    name            = "OutboxIndex"
+    hash_key        = "outboxState"
+    range_key       = "nextAttemptAt"
     projection_type = "ALL"
   }
 
+  # Per-client retention (retentionDays in the client registry)
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
   # Enable point-in-time recovery
   point_in_time_recovery {
     enabled = true
@@ -68,3 +103,227 @@ resource "aws_dynamodb_table" "form_submissions" {
     Name = "${var.project_name}-${var.environment}-form_submissions"
   }
 }
+
+# DynamoDB Table for shared rate-limit window counters
+resource "aws_dynamodb_table" "rate_limits" {
+  name         = "${var.project_name}-${var.environment}-rate_limits"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "limitKey"
+
+  attribute {
+    name = "limitKey"
+    type = "S"
+  }
+
+  # Counters expire two windows after they were last written
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-rate_limits"
+  }
+}
+
+# DynamoDB Table for POST /forms idempotency keys
+resource "aws_dynamodb_table" "idempotency" {
+  name         = "${var.project_name}-${var.environment}-form_idempotency"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "idempotencyKey"
+
+  attribute {
+    name = "idempotencyKey"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form_idempotency"
+  }
+}
+
+# DynamoDB Table for per-client records (client_registry.backend "dynamodb")
+resource "aws_dynamodb_table" "clients" {
+  name         = "${var.project_name}-${var.environment}-form_clients"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "client"
+
+  attribute {
+    name = "client"
+    type = "S"
+  }
+
+  point_in_time_recovery {
+    enabled = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form_clients"
+  }
+}
+
+# DynamoDB Table for hourly/daily submission counters (GET /forms/stats)
+resource "aws_dynamodb_table" "stats" {
+  name         = "${var.project_name}-${var.environment}-form_stats"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "statsKey"
+  range_key    = "bucket"
+
+  attribute {
+    name = "statsKey"
+    type = "S"
+  }
+
+  attribute {
+    name = "bucket"
+    type = "N"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form_stats"
+  }
+}
+
+# DynamoDB Table for submission content fingerprints (duplicate and near-duplicate detection)
+resource "aws_dynamodb_table" "fingerprints" {
+  name         = "${var.project_name}-${var.environment}-form_fingerprints"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "fingerprint"
+
+  attribute {
+    name = "fingerprint"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form_fingerprints"
+  }
+}
+
+# DynamoDB Table for IP/network blocks shared between containers (security.block_suspicious_ips)
+resource "aws_dynamodb_table" "blocklist" {
+  name         = "${var.project_name}-${var.environment}-form_blocklist"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "blockKey"
+
+  attribute {
+    name = "blockKey"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form_blocklist"
+  }
+}
+
+# DynamoDB Table for attachment upload sessions and records
+resource "aws_dynamodb_table" "attachments" {
+  name         = "${var.project_name}-${var.environment}-form_attachments"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "attachmentId"
+
+  attribute {
+    name = "attachmentId"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form_attachments"
+  }
+}
+
+# DynamoDB Table for notification digest windows
+resource "aws_dynamodb_table" "digests" {
+  name         = "${var.project_name}-${var.environment}-form_digests"
+  billing_mode = var.dynamodb_billing_mode
+  hash_key     = "digestKey"
+
+  attribute {
+    name = "digestKey"
+    type = "S"
+  }
+
+  attribute {
+    name = "pending"
+    type = "S"
+  }
+
+  attribute {
+    name = "windowEnd"
+    type = "N"
+  }
+
+  # Sparse index of windows that have not been sent yet
+  global_secondary_index {
+    name            = "PendingIndex"
+    hash_key        = "pending"
+    range_key       = "windowEnd"
+    projection_type = "ALL"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form_digests"
+  }
+}
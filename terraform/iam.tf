@@ -47,7 +47,15 @@ resource "aws_iam_policy" "lambda_dynamodb" {
           "dynamodb:BatchWriteItem"
         ]
         Resource = [
-          aws_dynamodb_table.form_submissions.arn
+          aws_dynamodb_table.form_submissions.arn,
+          aws_dynamodb_table.rate_limits.arn,
+          aws_dynamodb_table.digests.arn,
+          aws_dynamodb_table.idempotency.arn,
+          aws_dynamodb_table.clients.arn,
+          aws_dynamodb_table.stats.arn,
+          aws_dynamodb_table.blocklist.arn,
+          aws_dynamodb_table.attachments.arn,
+          aws_dynamodb_table.fingerprints.arn
         ]
       },
       {
@@ -57,7 +65,20 @@ resource "aws_iam_policy" "lambda_dynamodb" {
           "dynamodb:Scan"
         ]
         Resource = [
-          "${aws_dynamodb_table.form_submissions.arn}/index/*"
+          "${aws_dynamodb_table.form_submissions.arn}/index/*",
+          "${aws_dynamodb_table.digests.arn}/index/*"
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = [
+          "${aws_dynamodb_table.form_submissions.arn}/stream/*"
         ]
       }
     ]
@@ -164,3 +185,72 @@ resource "aws_iam_role_policy_attachment" "lambda_ssm" {
   role       = aws_iam_role.lambda_execution.name
   policy_arn = aws_iam_policy.lambda_ssm.arn
 }
+
+# Exports bucket policy (write exports, presign downloads)
+resource "aws_iam_policy" "lambda_exports" {
+  name        = "${var.project_name}-${var.environment}-lambda-exports"
+  description = "Policy for Lambda to write submission exports and archives to S3"
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:AbortMultipartUpload"
+        ]
+        Resource = [
+          "${aws_s3_bucket.exports.arn}/exports/*",
+          "${aws_s3_bucket.exports.arn}/archive/*"
+        ]
+      }
+    ]
+  })
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-lambda-exports"
+  }
+}
+
+# Attach Exports Policy to Lambda Execution Role
+resource "aws_iam_role_policy_attachment" "lambda_exports" {
+  role       = aws_iam_role.lambda_execution.name
+  policy_arn = aws_iam_policy.lambda_exports.arn
+}
+
+# Attachments bucket policy (multipart uploads, verification reads, presigned downloads)
+resource "aws_iam_policy" "lambda_attachments" {
+  name        = "${var.project_name}-${var.environment}-lambda-attachments"
+  description = "Policy for Lambda to manage form attachments in S3"
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:DeleteObject",
+          "s3:AbortMultipartUpload",
+          "s3:ListMultipartUploadParts"
+        ]
+        Resource = [
+          "${aws_s3_bucket.attachments.arn}/attachments/*"
+        ]
+      }
+    ]
+  })
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-lambda-attachments"
+  }
+}
+
+# Attach Attachments Policy to Lambda Execution Role
+resource "aws_iam_role_policy_attachment" "lambda_attachments" {
+  role       = aws_iam_role.lambda_execution.name
+  policy_arn = aws_iam_policy.lambda_attachments.arn
+}
@@ -15,6 +15,34 @@ resource "aws_cloudwatch_log_group" "lambda_logs" {
   }
 }
 
+# Signs the attachment download links in notification emails
+resource "random_password" "attachment_link_secret" {
+  length  = 48
+  special = false
+}
+
+# Environment shared by the API and outbox worker functions
+# LOG_LEVEL is only set when log_level is given; otherwise monitoring.log_level applies
+locals {
+  lambda_environment = merge({
+    ENVIRONMENT            = var.environment
+    NOTIFICATION_EMAIL     = var.notification_email
+    FORM_SUBMISSIONS_TABLE = aws_dynamodb_table.form_submissions.name
+    RATE_LIMIT_TABLE       = aws_dynamodb_table.rate_limits.name
+    DIGEST_TABLE           = aws_dynamodb_table.digests.name
+    EXPORT_BUCKET          = aws_s3_bucket.exports.bucket
+    IDEMPOTENCY_TABLE      = aws_dynamodb_table.idempotency.name
+    CLIENTS_TABLE          = aws_dynamodb_table.clients.name
+    STATS_TABLE            = aws_dynamodb_table.stats.name
+    BLOCKLIST_TABLE        = aws_dynamodb_table.blocklist.name
+    ATTACHMENTS_TABLE      = aws_dynamodb_table.attachments.name
+    FINGERPRINTS_TABLE     = aws_dynamodb_table.fingerprints.name
+    ATTACHMENTS_BUCKET     = aws_s3_bucket.attachments.bucket
+    ATTACHMENT_LINK_SECRET = random_password.attachment_link_secret.result
+    API_BASE_URL           = var.enable_custom_domain ? "https://${var.custom_domain_name}" : aws_apigatewayv2_stage.main.invoke_url
+  }, var.log_level == "" ? {} : { LOG_LEVEL = var.log_level })
+}
+
 # Lambda Function
 resource "aws_lambda_function" "forms" {
   function_name    = "${var.project_name}-${var.environment}-forms"
@@ -27,12 +55,7 @@ resource "aws_lambda_function" "forms" {
   filename         = data.archive_file.lambda_zip.output_path
 
   environment {
-    variables = {
-      ENVIRONMENT            = var.environment
-      LOG_LEVEL              = "INFO"
-      NOTIFICATION_EMAIL     = var.notification_email
-      FORM_SUBMISSIONS_TABLE = aws_dynamodb_table.form_submissions.name
-    }
+    variables = local.lambda_environment
   }
 
   depends_on = [
@@ -55,3 +78,230 @@ resource "aws_lambda_permission" "api_gateway" {
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_apigatewayv2_api.main.execution_arn}/*/*"
 }
+
+# CloudWatch Log Group for the outbox worker
+resource "aws_cloudwatch_log_group" "outbox_logs" {
+  name              = "/aws/lambda/${var.project_name}-${var.environment}-forms-outbox"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-outbox-logs"
+  }
+}
+
+# Outbox worker: delivers notifications, auto-replies and webhooks off the request path
+resource "aws_lambda_function" "outbox" {
+  function_name    = "${var.project_name}-${var.environment}-forms-outbox"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "handler.process_outbox"
+  runtime          = var.lambda_runtime
+  timeout          = var.outbox_timeout
+  memory_size      = var.lambda_memory_size
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  filename         = data.archive_file.lambda_zip.output_path
+
+  environment {
+    variables = local.lambda_environment
+  }
+
+  depends_on = [
+    aws_cloudwatch_log_group.outbox_logs,
+    aws_iam_role_policy_attachment.lambda_basic_execution,
+    aws_iam_role_policy_attachment.lambda_dynamodb,
+    aws_iam_role_policy_attachment.lambda_ses
+  ]
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-outbox"
+  }
+}
+
+# New submissions reach the worker through the table stream
+resource "aws_lambda_event_source_mapping" "outbox_stream" {
+  event_source_arn  = aws_dynamodb_table.form_submissions.stream_arn
+  function_name     = aws_lambda_function.outbox.arn
+  starting_position = "LATEST"
+  batch_size        = 25
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT"]
+        dynamodb = {
+          NewImage = {
+            outboxState = { S = ["pending"] }
+          }
+        }
+      })
+    }
+  }
+}
+
+# Scheduled sweep picks up retries that are due
+resource "aws_cloudwatch_event_rule" "outbox_sweep" {
+  name                = "${var.project_name}-${var.environment}-forms-outbox-sweep"
+  description         = "Retry pending form submission side effects"
+  schedule_expression = var.outbox_sweep_schedule
+}
+
+resource "aws_cloudwatch_event_target" "outbox_sweep" {
+  rule = aws_cloudwatch_event_rule.outbox_sweep.name
+  arn  = aws_lambda_function.outbox.arn
+}
+
+resource "aws_lambda_permission" "outbox_sweep" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.outbox.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.outbox_sweep.arn
+}
+
+# CloudWatch Log Group for the digest sender
+resource "aws_cloudwatch_log_group" "digest_logs" {
+  name              = "/aws/lambda/${var.project_name}-${var.environment}-forms-digest"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-digest-logs"
+  }
+}
+
+# Digest sender: one summary email per closed window for digest-mode clients
+resource "aws_lambda_function" "digest" {
+  function_name    = "${var.project_name}-${var.environment}-forms-digest"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "handler.send_digests"
+  runtime          = var.lambda_runtime
+  timeout          = var.outbox_timeout
+  memory_size      = var.lambda_memory_size
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  filename         = data.archive_file.lambda_zip.output_path
+
+  environment {
+    variables = local.lambda_environment
+  }
+
+  depends_on = [
+    aws_cloudwatch_log_group.digest_logs,
+    aws_iam_role_policy_attachment.lambda_basic_execution,
+    aws_iam_role_policy_attachment.lambda_dynamodb,
+    aws_iam_role_policy_attachment.lambda_ses
+  ]
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-digest"
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "digest" {
+  name                = "${var.project_name}-${var.environment}-forms-digest"
+  description         = "Send notification digests for closed windows"
+  schedule_expression = var.digest_schedule
+}
+
+resource "aws_cloudwatch_event_target" "digest" {
+  rule = aws_cloudwatch_event_rule.digest.name
+  arn  = aws_lambda_function.digest.arn
+}
+
+resource "aws_lambda_permission" "digest" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.digest.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.digest.arn
+}
+
+# CloudWatch Log Group for bulk exports
+resource "aws_cloudwatch_log_group" "export_logs" {
+  name              = "/aws/lambda/${var.project_name}-${var.environment}-forms-export"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-export-logs"
+  }
+}
+
+# Bulk export: invoked directly (aws lambda invoke), streams to the exports bucket
+resource "aws_lambda_function" "export" {
+  function_name    = "${var.project_name}-${var.environment}-forms-export"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "handler.run_export"
+  runtime          = var.lambda_runtime
+  timeout          = var.export_timeout
+  memory_size      = var.export_memory_size
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  filename         = data.archive_file.lambda_zip.output_path
+
+  environment {
+    variables = local.lambda_environment
+  }
+
+  depends_on = [
+    aws_cloudwatch_log_group.export_logs,
+    aws_iam_role_policy_attachment.lambda_basic_execution,
+    aws_iam_role_policy_attachment.lambda_dynamodb,
+    aws_iam_role_policy_attachment.lambda_exports
+  ]
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-export"
+  }
+}
+
+# CloudWatch Log Group for the archive job
+resource "aws_cloudwatch_log_group" "archive_logs" {
+  name              = "/aws/lambda/${var.project_name}-${var.environment}-forms-archive"
+  retention_in_days = 7
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-archive-logs"
+  }
+}
+
+# Archive job: moves old submissions to compressed NDJSON under archive/ in the exports bucket
+resource "aws_lambda_function" "archive" {
+  function_name    = "${var.project_name}-${var.environment}-forms-archive"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "handler.run_archive"
+  runtime          = var.lambda_runtime
+  timeout          = var.export_timeout
+  memory_size      = var.export_memory_size
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  filename         = data.archive_file.lambda_zip.output_path
+
+  environment {
+    variables = local.lambda_environment
+  }
+
+  depends_on = [
+    aws_cloudwatch_log_group.archive_logs,
+    aws_iam_role_policy_attachment.lambda_basic_execution,
+    aws_iam_role_policy_attachment.lambda_dynamodb,
+    aws_iam_role_policy_attachment.lambda_exports
+  ]
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-forms-archive"
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "archive" {
+  name                = "${var.project_name}-${var.environment}-forms-archive"
+  description         = "Archive submissions older than archive.after_days"
+  schedule_expression = var.archive_schedule
+}
+
+resource "aws_cloudwatch_event_target" "archive" {
+  rule = aws_cloudwatch_event_rule.archive.name
+  arn  = aws_lambda_function.archive.arn
+}
+
+resource "aws_lambda_permission" "archive" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.archive.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.archive.arn
+}
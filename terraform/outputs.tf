@@ -51,6 +51,26 @@ output "lambda_function_invoke_arn" {
   value       = aws_lambda_function.forms.invoke_arn
 }
 
+output "export_function_name" {
+  description = "The name of the bulk export Lambda function"
+  value       = aws_lambda_function.export.function_name
+}
+
+output "export_bucket_name" {
+  description = "The S3 bucket holding submission exports"
+  value       = aws_s3_bucket.exports.bucket
+}
+
+output "archive_function_name" {
+  description = "The name of the archive Lambda function"
+  value       = aws_lambda_function.archive.function_name
+}
+
+output "outbox_function_name" {
+  description = "The name of the outbox worker Lambda function"
+  value       = aws_lambda_function.outbox.function_name
+}
+
 # DynamoDB Outputs
 output "dynamodb_table_name" {
   description = "The name of the DynamoDB table for form submissions"
@@ -0,0 +1,124 @@
+# S3 Bucket for bulk submission exports (exports/) and archived submissions (archive/)
+resource "aws_s3_bucket" "exports" {
+  bucket = "${lower(var.project_name)}-${var.environment}-form-exports"
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form-exports"
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "exports" {
+  bucket                  = aws_s3_bucket.exports.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "exports" {
+  bucket = aws_s3_bucket.exports.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+# Exports are downloaded through presigned URLs; don't keep them around
+resource "aws_s3_bucket_lifecycle_configuration" "exports" {
+  bucket = aws_s3_bucket.exports.id
+
+  rule {
+    id     = "expire-exports"
+    status = "Enabled"
+
+    filter {
+      prefix = "exports/"
+    }
+
+    expiration {
+      days = var.export_retention_days
+    }
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+
+  # Archived submissions (archive job) move to a colder storage class
+  rule {
+    id     = "tier-archive"
+    status = "Enabled"
+
+    filter {
+      prefix = "archive/"
+    }
+
+    transition {
+      days          = var.archive_transition_days
+      storage_class = "GLACIER_IR"
+    }
+  }
+}
+
+# S3 Bucket for form attachments (multipart uploads through presigned part URLs)
+resource "aws_s3_bucket" "attachments" {
+  bucket = "${lower(var.project_name)}-${var.environment}-form-attachments"
+
+  tags = {
+    Name = "${var.project_name}-${var.environment}-form-attachments"
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "attachments" {
+  bucket                  = aws_s3_bucket.attachments.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "attachments" {
+  bucket = aws_s3_bucket.attachments.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+# Browsers PUT parts straight to the bucket
+resource "aws_s3_bucket_cors_configuration" "attachments" {
+  bucket = aws_s3_bucket.attachments.id
+
+  cors_rule {
+    allowed_methods = ["PUT"]
+    allowed_origins = var.cors_allow_origins
+    allowed_headers = ["content-type"]
+    max_age_seconds = 300
+  }
+}
+
+# Abandoned uploads are aborted; files outlive their records (attachments.retention_days) by a little
+resource "aws_s3_bucket_lifecycle_configuration" "attachments" {
+  bucket = aws_s3_bucket.attachments.id
+
+  rule {
+    id     = "expire-attachments"
+    status = "Enabled"
+
+    filter {
+      prefix = "attachments/"
+    }
+
+    expiration {
+      days = var.attachment_retention_days
+    }
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
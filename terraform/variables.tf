@@ -48,13 +48,13 @@ variable "cors_allow_origins" {
 variable "cors_allow_methods" {
   description = "Allowed HTTP methods for CORS"
   type        = list(string)
-  default     = ["GET", "POST", "OPTIONS"]
+  default     = ["GET", "POST", "PUT", "OPTIONS"]
 }
 
 variable "cors_allow_headers" {
   description = "Allowed headers for CORS"
   type        = list(string)
-  default     = ["content-type", "authorization"]
+  default     = ["content-type", "authorization", "idempotency-key"]
 }
 
 # Lambda Configuration
@@ -76,6 +76,66 @@ variable "lambda_memory_size" {
   default     = 256
 }
 
+variable "outbox_timeout" {
+  description = "Outbox worker Lambda timeout in seconds"
+  type        = number
+  default     = 120
+}
+
+variable "outbox_sweep_schedule" {
+  description = "Schedule expression for the outbox retry sweep"
+  type        = string
+  default     = "rate(5 minutes)"
+}
+
+variable "export_timeout" {
+  description = "Bulk export Lambda timeout in seconds"
+  type        = number
+  default     = 900
+}
+
+variable "export_memory_size" {
+  description = "Bulk export Lambda memory in MB (also scales CPU and network)"
+  type        = number
+  default     = 1024
+}
+
+variable "export_retention_days" {
+  description = "Days before export files are deleted from the exports bucket"
+  type        = number
+  default     = 7
+}
+
+variable "attachment_retention_days" {
+  description = "Days before attachment files are deleted (keep in step with attachments.retention_days)"
+  type        = number
+  default     = 91
+}
+
+variable "archive_schedule" {
+  description = "Schedule expression for the archive job (a no-op unless archive.enabled is true)"
+  type        = string
+  default     = "rate(1 day)"
+}
+
+variable "archive_transition_days" {
+  description = "Days before archived submissions move to S3 Glacier Instant Retrieval"
+  type        = number
+  default     = 30
+}
+
+variable "log_level" {
+  description = "Overrides monitoring.log_level (DEBUG, INFO, WARNING, ERROR); empty uses the config file"
+  type        = string
+  default     = ""
+}
+
+variable "digest_schedule" {
+  description = "Schedule expression for sending notification digests"
+  type        = string
+  default     = "rate(5 minutes)"
+}
+
 variable "lambda_source_dir" {
   description = "Path to Lambda function source code"
   type        = string
@@ -0,0 +1,47 @@
+"""
+Shared test setup: lambda/ and benchmarks/ (for the local_aws stand-ins) on sys.path,
+and handler.py pointed at fresh stand-ins per test
+"""
+import json
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(TESTS_DIR, '..', 'lambda'), os.path.join(TESTS_DIR, '..', 'benchmarks')]
+os.environ.setdefault('ENVIRONMENT', 'dev')
+os.environ.setdefault('FORM_SUBMISSIONS_TABLE', 'form_submissions')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+# handler.py globals that hold clients or container-lifetime helpers built on first use
+HANDLER_GLOBALS = (
+    'dynamodb', 'ses_client', 'ssm_client', 's3_client', 'submissions_table', 'clients_table', 'webhook_client',
+    'rate_limiter', 'outbox_worker', 'batch_writer', 'storage_encoder', 'email_renderer', 'digest_store',
+    'idempotency_store', 'stats_store', 'ip_reputation', 'attachment_store', 'duplicate_detector', 'info_response'
+)
+
+
+@pytest.fixture
+def local_handler(monkeypatch):
+    """handler.py pointed at fresh local_aws stand-ins; returns (handler, stand-ins)"""
+    import handler
+    import local_aws
+    from metrics import metrics
+
+    for name in HANDLER_GLOBALS:
+        monkeypatch.setattr(handler, name, None)
+    monkeypatch.setattr(handler, '_rate_limiter_built', False)
+    monkeypatch.setattr(handler, '_ip_reputation_built', False)
+    monkeypatch.setattr(handler, 'client_registry', handler.create_client_registry())
+    monkeypatch.setattr(metrics, 'write', lambda line: None)
+    return handler, local_aws.install(handler)
+
+
+def submit_event(body: dict, source_ip: str = '203.0.113.10', headers: dict = None) -> dict:
+    """API Gateway HTTP API v2 event for POST /forms"""
+    return {
+        'requestContext': {'http': {'method': 'POST', 'path': '/forms', 'sourceIp': source_ip, 'userAgent': 'pytest'}},
+        'headers': {'content-type': 'application/json', 'user-agent': 'pytest', **(headers or {})},
+        'body': json.dumps(body)
+    }
@@ -0,0 +1,108 @@
+"""
+AttachmentStore: upload tokens on the part and complete calls, and completing exactly once
+"""
+import hashlib
+
+import pytest
+
+import local_aws
+from attachments import AttachmentError, AttachmentStore, LocalObjects
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(12))
+LIMITS = {'max_bytes': 1024, 'allowed_types': ('image/png',), 'max_per_submission': 5}
+
+
+@pytest.fixture
+def store(tmp_path):
+    table = local_aws.LocalDynamoDB().Table('form_attachments')
+    return AttachmentStore(table, LocalObjects(str(tmp_path), part_bytes=8))
+
+
+@pytest.fixture
+def session(store):
+    return store.create('acme', {'filename': 'photo.png', 'contentType': 'image/png', 'size': len(PNG)}, LIMITS)
+
+
+def upload(store: AttachmentStore, session: dict, data: bytes = PNG):
+    for part in session['parts']:
+        start = (part['partNumber'] - 1) * session['partBytes']
+        store.write_part(session['attachmentId'], session['uploadToken'], part['partNumber'],
+                         data[start:start + session['partBytes']])
+
+
+def stored(store: AttachmentStore, session: dict) -> dict:
+    return store.table.items[(session['attachmentId'],)]
+
+
+def test_token_is_issued_and_only_its_hash_stored(store, session):
+    item = stored(store, session)
+    assert session['uploadToken'] and session['uploadToken'] not in item.values()
+    assert item['uploadTokenSha256'] == hashlib.sha256(session['uploadToken'].encode('utf-8')).hexdigest()
+
+
+@pytest.mark.parametrize('token, status', [('', 401), ('not-the-token', 403)])
+def test_parts_and_complete_need_the_session_token(store, session, token, status):
+    with pytest.raises(AttachmentError) as raised:
+        store.write_part(session['attachmentId'], token, 1, PNG[:8])
+    assert raised.value.status == status
+    with pytest.raises(AttachmentError) as raised:
+        store.complete(session['attachmentId'], token, lambda client: LIMITS)
+    assert raised.value.status == status
+    assert stored(store, session)['status'] == 'uploading'
+
+
+def test_another_sessions_token_is_rejected(store, session):
+    other = store.create('acme', {'filename': 'b.png', 'contentType': 'image/png', 'size': len(PNG)}, LIMITS)
+
+    with pytest.raises(AttachmentError) as raised:
+        store.write_part(session['attachmentId'], other['uploadToken'], 1, PNG[:8])
+    assert raised.value.status == 403
+
+
+def test_complete_marks_ready_and_repeats_return_it(store, session):
+    upload(store, session)
+
+    summary = store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS)
+    assert summary == {'attachmentId': session['attachmentId'], 'filename': 'photo.png', 'contentType': 'image/png',
+                       'size': len(PNG), 'sha256': hashlib.sha256(PNG).hexdigest()}
+    assert stored(store, session)['status'] == 'ready' and 'lockedUntil' not in stored(store, session)
+    assert store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS) == summary
+
+
+def test_concurrent_complete_waits_for_the_first(store, session):
+    upload(store, session)
+    finish = store.objects.finish
+    concurrent = []
+
+    def finish_with_concurrent_call(*args):
+        # A second complete arrives while the first is assembling the parts
+        try:
+            store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS)
+        except AttachmentError as e:
+            concurrent.append(e.status)
+        return finish(*args)
+    store.objects.finish = finish_with_concurrent_call
+
+    summary = store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS)
+    assert concurrent == [409]
+    store.objects.finish = finish
+    assert store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS) == summary
+
+
+def test_missing_parts_release_the_claim(store, session):
+    store.write_part(session['attachmentId'], session['uploadToken'], 1, PNG[:8])
+
+    with pytest.raises(AttachmentError, match='missing parts'):
+        store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS)
+    assert stored(store, session)['status'] == 'uploading'
+
+    upload(store, session)
+    assert store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS)['size'] == len(PNG)
+
+
+def test_expired_claim_can_be_taken_over(store, session):
+    upload(store, session)
+    item = stored(store, session)
+    item.update(status='completing', lockedUntil=int(store.clock()) - 1)
+
+    assert store.complete(session['attachmentId'], session['uploadToken'], lambda client: LIMITS)['size'] == len(PNG)
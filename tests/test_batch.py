@@ -0,0 +1,82 @@
+"""
+POST /forms/batch: body validation, per-entry results and rate limiting by entry count
+"""
+import json
+
+import pytest
+
+import local_aws
+from read_api import hash_api_key
+
+BATCH_KEY = 'batch-key'
+
+
+@pytest.fixture
+def post_batch(local_handler):
+    """(handler, post(body, source_ip) -> (status, body)) with a batch key for noclient"""
+    handler, _ = local_handler
+    clients = {name: dict(record) for name, record in local_aws.DEFAULT_CLIENTS.items()}
+    clients['noclient']['batchApiKeySha256'] = hash_api_key(BATCH_KEY)
+    stand_ins = local_aws.install(handler, clients)
+
+    def post(body, source_ip: str = '203.0.113.10'):
+        event = {
+            'requestContext': {'http': {'method': 'POST', 'path': '/forms/batch', 'sourceIp': source_ip,
+                                        'userAgent': 'pytest'}},
+            'headers': {'content-type': 'application/json', 'authorization': f"Bearer {BATCH_KEY}"},
+            'body': json.dumps(body)
+        }
+        result = handler.lambda_handler(event, None)
+        return result['statusCode'], json.loads(result['body'])
+    return stand_ins, post
+
+
+def contact(index: int) -> dict:
+    return {'type': 'contacts',
+            'data': {'firstName': 'John', 'lastName': 'Doe', 'email': f"john{index}@example.com",
+                     'message': f"Please call me back about order number {index}, it has not arrived."}}
+
+
+@pytest.mark.parametrize('body', [[contact(0)], 'submissions', 42, None])
+def test_non_object_body_is_rejected(post_batch, body):
+    _, post = post_batch
+
+    assert post(body) == (400, {'error': 'Request body must be an object'})
+
+
+def test_each_entry_gets_its_own_result(post_batch):
+    stand_ins, post = post_batch
+    entries = [contact(0), {'type': 'contacts', 'data': {'firstName': 'John'}}, 'not an entry', contact(1)]
+
+    status, body = post({'client': 'noclient', 'submissions': entries})
+    assert status == 207 and (body['accepted'], body['rejected']) == (2, 2)
+    assert [result['status'] for result in body['results']] == [201, 400, 400, 201]
+    assert len(stand_ins['table'].items) == 2
+
+
+@pytest.fixture
+def rate_limited(local_handler, monkeypatch):
+    """Turn rate limiting on, with the shared tier; returns the per-IP limit"""
+    handler, _ = local_handler
+    monkeypatch.setitem(handler.CONFIG['rate_limiting'], 'enabled', True)
+    monkeypatch.setattr(handler, 'RATE_LIMIT_TABLE', 'rate_limits')
+    return handler.CONFIG['rate_limiting']['max_requests_per_ip']
+
+
+def test_every_entry_counts_against_the_rate_limit(post_batch, rate_limited):
+    _, post = post_batch
+    limit = rate_limited
+
+    status, body = post({'client': 'noclient', 'submissions': [contact(index) for index in range(limit - 2)]})
+    assert status == 201 and body['accepted'] == limit - 2
+    # Two requests are left for this IP; a batch of three is rejected whole
+    assert post({'client': 'noclient', 'submissions': [contact(index) for index in range(3)]})[0] == 429
+    assert post({'client': 'noclient', 'submissions': [contact(index) for index in range(2)]})[0] == 201
+
+
+def test_batch_larger_than_the_limit_is_rejected(post_batch, rate_limited):
+    _, post = post_batch
+
+    status, _ = post({'client': 'noclient', 'submissions': [contact(index) for index in range(rate_limited + 1)]})
+    assert status == 429
+    assert post({'client': 'noclient', 'submissions': [contact(0)]}, source_ip='203.0.113.11')[0] == 201
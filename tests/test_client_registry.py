@@ -0,0 +1,139 @@
+"""
+Per-client registry backends: records loaded on demand into a bounded LRU, with a negative cache for unknown names
+"""
+import json
+
+import pytest
+
+from conftest import submit_event
+
+CONTACT = {
+    'type': 'contacts',
+    'data': {'firstName': 'John', 'lastName': 'Doe', 'email': 'john@example.com',
+             'message': 'Please call me back about my order, it has not arrived yet and I need it soon.'}
+}
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def client_config(name: str, form_types=('contacts',)) -> str:
+    return json.dumps({'name': name, 'notification_email': f"{name}@example.com", 'form_types': list(form_types)})
+
+
+@pytest.fixture
+def dynamodb_registry(local_handler, monkeypatch):
+    """(handler, clients table, clock, submit(client) -> status) with the dynamodb backend and two entries cached"""
+    handler, stand_ins = local_handler
+    settings = {**handler.CONFIG['client_registry'], 'backend': 'dynamodb', 'max_entries': 2,
+                'ttl_seconds': 60, 'negative_ttl_seconds': 30, 'error_retry_seconds': 10}
+    monkeypatch.setitem(handler.CONFIG, 'client_registry', settings)
+    monkeypatch.setattr(handler, 'CLIENTS_TABLE', 'form_clients')
+    table = stand_ins['dynamodb'].Table('form_clients')
+    for name in ('acme', 'globex', 'initech'):
+        table.put_item(Item={'client': name, 'version': 1, 'config': client_config(name)})
+    clock = FakeClock(1000.0)
+    monkeypatch.setattr(handler, 'client_registry', handler.create_client_registry())
+    handler.client_registry.clock = clock
+
+    def submit(client: str) -> int:
+        return handler.lambda_handler(submit_event({**CONTACT, 'client': client}), None)['statusCode']
+    return handler, table, clock, submit
+
+
+def test_records_load_on_first_use_and_stay_cached(dynamodb_registry):
+    _, table, _, submit = dynamodb_registry
+
+    assert submit('acme') == 201
+    fetches = table.calls['get_item']
+    assert fetches >= 1
+    assert submit('acme') == 201
+    assert table.calls['get_item'] == fetches
+
+
+def test_unknown_clients_are_cached_as_missing(dynamodb_registry):
+    handler, table, clock, submit = dynamodb_registry
+
+    assert submit('umbrella') == 400
+    fetches = table.calls['get_item']
+    for _ in range(3):
+        assert submit('umbrella') == 400
+    assert table.calls['get_item'] == fetches
+
+    # Created since: seen once the negative entry expires
+    table.put_item(Item={'client': 'umbrella', 'version': 1, 'config': client_config('umbrella')})
+    assert submit('umbrella') == 400
+    clock.now += 31
+    assert submit('umbrella') == 201
+
+
+@pytest.mark.parametrize('name', ['', 'acme/../globex', 'a' * 65, 'white space'])
+def test_names_no_backend_could_store_are_rejected_without_a_fetch(dynamodb_registry, name):
+    handler, table, _, _ = dynamodb_registry
+
+    assert handler.client_registry.client(name) is None
+    assert table.calls.get('get_item', 0) == 0
+
+
+def test_least_recently_used_record_is_evicted(dynamodb_registry):
+    handler, table, _, _ = dynamodb_registry
+    registry = handler.client_registry
+
+    for name in ('acme', 'globex', 'acme', 'initech'):
+        assert registry.client(name).name == name
+    assert table.calls['get_item'] == 3
+
+    # globex was evicted for initech; acme was used more recently and stayed
+    registry.client('acme')
+    assert table.calls['get_item'] == 3
+    registry.client('globex')
+    assert table.calls['get_item'] == 4
+
+
+def test_expired_records_are_reparsed_only_for_a_new_version(dynamodb_registry):
+    handler, table, clock, submit = dynamodb_registry
+    registry = handler.client_registry
+    first = registry.client('acme')
+
+    clock.now += 61
+    assert registry.client('acme') is first
+
+    table.put_item(Item={'client': 'acme', 'version': 2, 'config': client_config('acme', ('feedback',))})
+    clock.now += 61
+    assert registry.client('acme').form_types == frozenset({'feedback'})
+    assert submit('acme') == 400
+
+
+def test_fetch_errors_serve_the_last_record_and_otherwise_fail_closed(dynamodb_registry):
+    handler, table, clock, submit = dynamodb_registry
+    assert submit('acme') == 201
+
+    def unavailable(**kwargs):
+        raise RuntimeError('DynamoDB unavailable')
+    table.get_item = unavailable
+    clock.now += 61
+    assert submit('acme') == 201
+    assert submit('globex') == 400
+
+    # The failure is not cached as a miss
+    del table.get_item
+    assert submit('globex') == 201
+
+
+def test_sharded_ssm_backend_reads_one_parameter_per_client(local_handler, monkeypatch):
+    handler, stand_ins = local_handler
+    settings = {**handler.CONFIG['client_registry'], 'backend': 'ssm_sharded'}
+    monkeypatch.setitem(handler.CONFIG, 'client_registry', settings)
+    stand_ins['ssm'].parameters[f"{handler.CLIENTS_PARAM_NAME}/acme"] = client_config('acme')
+    monkeypatch.setattr(handler, 'client_registry', handler.create_client_registry())
+
+    assert handler.lambda_handler(submit_event({**CONTACT, 'client': 'acme'}), None)['statusCode'] == 201
+    calls = stand_ins['ssm'].calls
+    assert handler.lambda_handler(submit_event({**CONTACT, 'client': 'umbrella'}), None)['statusCode'] == 400
+    assert handler.lambda_handler(submit_event({**CONTACT, 'client': 'umbrella'}), None)['statusCode'] == 400
+    assert stand_ins['ssm'].calls == calls + 1
@@ -0,0 +1,131 @@
+"""
+Digest mode: buffering into capped windows, sending due windows and rendering them
+"""
+import pytest
+
+import local_aws
+from digest import DIGEST_PENDING, DigestStore, digest_entry, render_digest
+
+WINDOW = 900
+START = 1700000100 - 1700000100 % WINDOW
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store():
+    table = local_aws.LocalDynamoDB().Table('form_digests')
+    return DigestStore(table, retention_seconds=86400, clock=FakeClock(START + 10))
+
+
+def entry(index: int, email: str = None) -> dict:
+    return digest_entry({
+        'submissionId': f"sub-{index}",
+        'formType': 'contacts',
+        'timestampIso': f"2023-11-14T22:{index:02d}:00",
+        'email': email or f"user{index}@example.com"
+    })
+
+
+def window(store: DigestStore, client: str = 'acme') -> dict:
+    return store.table.items[(f"{client}#{START}",)]
+
+
+def test_add_caps_items_and_keeps_counting(store):
+    for index in range(5):
+        assert store.add('acme', entry(index), WINDOW, max_items=3) is True
+
+    item = window(store)
+    assert item['itemCount'] == 5
+    assert [listed['submissionId'] for listed in item['items']] == ['sub-0', 'sub-1', 'sub-2']
+    assert item['pending'] == DIGEST_PENDING
+    assert (item['windowStart'], item['windowEnd']) == (START, START + WINDOW)
+    assert item['expiresAt'] == START + WINDOW + 86400
+
+
+def test_windows_are_per_client_and_period(store):
+    store.add('acme', entry(0), WINDOW, 3)
+    store.add('other', entry(1), WINDOW, 3)
+    store.clock.now += WINDOW
+    store.add('acme', entry(2), WINDOW, 3)
+
+    assert sorted(key[0] for key in store.table.items) == [
+        f"acme#{START}", f"acme#{START + WINDOW}", f"other#{START}"
+    ]
+
+
+def test_only_closed_windows_are_due(store):
+    store.add('acme', entry(0), WINDOW, 3)
+    assert store.due() == []
+
+    store.clock.now = START + WINDOW
+    assert [due['digestKey'] for due in store.due()] == [f"acme#{START}"]
+
+
+def test_send_due_claims_once(store):
+    store.add('acme', entry(0), WINDOW, 3)
+    store.clock.now = START + WINDOW
+    sent = []
+
+    assert store.send_due(sent.append) == {'sent': 1, 'failed': 0, 'skipped': 0}
+    assert window(store)['sentAt'] == START + WINDOW
+    assert 'pending' not in window(store)
+    # Sent windows leave PendingIndex, and a stale copy of one cannot be claimed again
+    assert store.send_due(sent.append) == {'sent': 0, 'failed': 0, 'skipped': 0}
+    assert store.claim(sent[0]) is False
+    assert len(sent) == 1
+
+
+def test_add_after_send_reports_window_closed(store):
+    store.add('acme', entry(0), WINDOW, 3)
+    store.claim(window(store))
+
+    assert store.add('acme', entry(1), WINDOW, 3) is False
+    assert window(store)['itemCount'] == 1
+
+
+def test_failed_send_releases_window_for_retry(store):
+    store.add('acme', entry(0), WINDOW, 3)
+    store.clock.now = START + WINDOW
+
+    def unavailable(due):
+        raise RuntimeError('SES unavailable')
+
+    assert store.send_due(unavailable) == {'sent': 0, 'failed': 1, 'skipped': 0}
+    assert 'sentAt' not in window(store)
+    assert window(store)['pending'] == DIGEST_PENDING
+    # Submissions can still join the released window, and the next run sends it
+    store.clock.now = START + 20
+    assert store.add('acme', entry(1), WINDOW, 3) is True
+    store.clock.now = START + WINDOW
+    sent = []
+    assert store.send_due(sent.append)['sent'] == 1
+    assert sent[0]['itemCount'] == 2
+
+
+def test_render_lists_items_and_hidden_count(store):
+    for index in range(4):
+        store.add('acme', entry(index, email='<b>x</b>@example.com' if index == 0 else None), WINDOW, max_items=2)
+
+    digest = render_digest('Acme & Sons', window(store))
+
+    assert digest['subject'] == '4 new form submission(s) - Acme & Sons'
+    assert '4 new form submission(s) for Acme & Sons' in digest['text']
+    assert 'Window: 2023-11-14 22:15 - 2023-11-14 22:30 UTC' in digest['text']
+    assert 'sub-0' in digest['text'] and 'sub-1' in digest['text'] and 'sub-2' not in digest['text']
+    assert '...and 2 more' in digest['text'] and '...and 2 more' in digest['html']
+    assert '<strong>Client:</strong> Acme & Sons' in digest['html']
+    assert '&lt;b&gt;x&lt;/b&gt;@example.com' in digest['html'] and '<b>x</b>' not in digest['html']
+
+
+def test_render_without_hidden_items():
+    digest = render_digest('Acme', {'itemCount': 1, 'items': [entry(0)], 'windowStart': START,
+                                    'windowEnd': START + WINDOW})
+    assert 'more' not in digest['text']
+    assert digest['html'].count('<tr><td') == 1
@@ -0,0 +1,56 @@
+"""
+Duplicate detection: off by default, turned on by a client's own duplicates block
+"""
+import pytest
+
+from conftest import submit_event
+from duplicates import duplicate_policy
+
+CONTACT = {
+    'client': 'noclient',
+    'type': 'contacts',
+    'data': {'firstName': 'John', 'lastName': 'Doe', 'email': 'john@example.com',
+             'message': 'Please call me back about my order, it has not arrived yet and I need it soon.'}
+}
+
+
+@pytest.fixture
+def defaults(local_handler):
+    handler, _ = local_handler
+    return handler.CONFIG['duplicates']
+
+
+def test_off_without_a_client_block(defaults):
+    assert defaults['enabled'] is False
+    assert duplicate_policy({}, defaults) is None
+    assert duplicate_policy({'duplicates': {'window_seconds': 60}}, defaults) is None
+
+
+def test_client_policy_turns_detection_on(defaults):
+    settings = duplicate_policy({'duplicates': {'policy': 'suppress'}}, defaults)
+    assert settings == {'policy': 'suppress', 'near_policy': 'suppress', 'window_seconds': defaults['window_seconds']}
+
+    assert duplicate_policy({'duplicates': {'enabled': True}}, defaults)['policy'] == defaults['policy']
+    assert duplicate_policy({'duplicates': {'enabled': False, 'policy': 'drop'}}, defaults) is None
+
+
+def stored_tags(stand_ins) -> list:
+    return sorted(str(item.get('tags')) for item in stand_ins['table'].items.values())
+
+
+def test_repeats_are_stored_untouched_by_default(local_handler):
+    handler, stand_ins = local_handler
+
+    for source_ip in ('203.0.113.1', '203.0.113.2'):
+        assert handler.lambda_handler(submit_event(CONTACT, source_ip=source_ip), None)['statusCode'] == 201
+    assert not any('duplicate' in tags for tags in stored_tags(stand_ins))
+
+
+def test_repeats_are_tagged_for_a_client_with_a_policy(local_handler, monkeypatch):
+    handler, stand_ins = local_handler
+    client_config = {**handler.get_client_config('noclient'), 'duplicates': {'policy': 'tag'}}
+    monkeypatch.setattr(handler, 'get_client_config', lambda client: client_config)
+
+    for source_ip in ('203.0.113.1', '203.0.113.2'):
+        assert handler.lambda_handler(submit_event(CONTACT, source_ip=source_ip), None)['statusCode'] == 201
+    assert ['duplicate' in tags for tags in stored_tags(stand_ins)].count(True) == 1
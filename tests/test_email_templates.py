@@ -0,0 +1,113 @@
+"""
+EmailRenderer: compiled subjects and bodies share one placeholder syntax
+"""
+from datetime import datetime
+
+import pytest
+
+import email_templates
+from email_templates import EmailRenderer
+
+TEMPLATES = {
+    'contacts': {'subject': 'New Contact Form - {{client_name}}', 'autoReply': False},
+    'serviceRequests': {'subject': 'Service request {{submission_id}} ({{form_type}})', 'autoReply': True,
+                        'autoReplySubject': 'Thanks from {{client_name}}'}
+}
+CLIENT = {'name': 'Fix <My> Car', 'notification_email': 'fixmycar@example.com'}
+
+
+def test_subject_fills_static_and_per_submission_placeholders():
+    renderer = EmailRenderer(TEMPLATES)
+
+    compiled = renderer.compiled('fixmycar', 'serviceRequests', CLIENT)
+    subject, text, html = renderer.render_notification(compiled, 'sub-1', '2025-12-01T10:00:00', {'email': 'a@b.co'})
+
+    assert subject == 'Service request sub-1 (serviceRequests)'
+    assert 'Client: Fix <My> Car' in text
+    assert 'Fix &lt;My&gt; Car' in html
+
+
+def test_subject_is_plain_text():
+    renderer = EmailRenderer(TEMPLATES)
+
+    compiled = renderer.compiled('fixmycar', 'contacts', CLIENT)
+    assert renderer.render_notification(compiled, 'sub-1', 'now', {})[0] == 'New Contact Form - Fix <My> Car'
+
+
+def test_client_override_with_legacy_placeholder():
+    renderer = EmailRenderer(TEMPLATES)
+    client = dict(CLIENT, email_templates={'contacts': {'subject': 'Lead for {client}'}})
+
+    compiled = renderer.compiled('fixmycar', 'contacts', client)
+    assert renderer.render_notification(compiled, 'sub-1', 'now', {})[0] == 'Lead for Fix <My> Car'
+
+
+def test_auto_reply_subject_uses_templates():
+    renderer = EmailRenderer(TEMPLATES)
+
+    compiled = renderer.compiled('fixmycar', 'serviceRequests', CLIENT)
+    subject, html = renderer.render_auto_reply(compiled, datetime(2025, 12, 1, 10, 0, 0))
+    assert compiled.auto_reply is True
+    assert subject == 'Thanks from Fix <My> Car'
+    assert '2025-12-01 10:00:00' in html
+
+
+ALL_PLACEHOLDERS = ('client_name', 'form_type', 'submission_id', 'timestamp', 'form_data', 'message', 'submitted')
+SUBMITTED = datetime(2025, 12, 1, 10, 0, 0)
+EXPECTED = {
+    'client_name': 'Fix <My> Car',
+    'form_type': 'serviceRequests',
+    'submission_id': 'sub-1',
+    'timestamp': '2025-12-01T09:59:58',
+    'form_data': 'email: a@b.co',
+    'message': 'Thanks, we will call you',
+    'submitted': '2025-12-01 10:00:00'
+}
+
+
+def compile_with(field: str, source: str):
+    renderer = EmailRenderer(TEMPLATES)
+    overrides = {'serviceRequests': {field: source, 'autoReplyMessage': EXPECTED['message']}}
+    client = dict(CLIENT, email_templates=overrides)
+    return renderer, renderer.compiled('fixmycar', 'serviceRequests', client)
+
+
+def render_all(renderer, compiled) -> dict:
+    subject, text, html = renderer.render_notification(
+        compiled, 'sub-1', EXPECTED['timestamp'], {'email': 'a@b.co'}, submitted=SUBMITTED
+    )
+    reply_subject, reply_html = renderer.render_auto_reply(
+        compiled, SUBMITTED, 'sub-1', EXPECTED['timestamp'], {'email': 'a@b.co'}
+    )
+    return {'subject': subject, 'notificationText': text, 'notificationHtml': html,
+            'autoReplySubject': reply_subject, 'autoReplyHtml': reply_html}
+
+
+@pytest.mark.parametrize('name', ALL_PLACEHOLDERS)
+@pytest.mark.parametrize('field', ['subject', 'notificationText', 'notificationHtml', 'autoReplySubject',
+                                   'autoReplyHtml'])
+def test_every_placeholder_renders_in_every_template(field, name):
+    renderer, compiled = compile_with(field, f"[{{{{{name}}}}}]")
+
+    rendered = render_all(renderer, compiled)[field]
+
+    expected = EXPECTED[name]
+    if field.endswith('Html'):
+        expected = {'client_name': 'Fix &lt;My&gt; Car', 'message': 'Thanks, we will call you'}.get(name, expected)
+        if name == 'form_data':
+            assert 'email' in rendered and 'a@b.co' in rendered
+            return
+    assert rendered == f"[{expected}]"
+
+
+def test_unknown_placeholder_is_logged_at_compile_and_renders_empty(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(email_templates.log, 'warning', lambda message, **fields: warnings.append((message, fields)))
+
+    renderer, compiled = compile_with('subject', 'Lead for {{clientName}} {{submission_id}}')
+
+    assert warnings == [('Unknown email template placeholders',
+                         {'client': 'fixmycar', 'formType': 'serviceRequests', 'placeholders': ['clientName']})]
+    assert render_all(renderer, compiled)['subject'] == 'Lead for  sub-1'
+    assert render_all(renderer, compiled)['subject'] == 'Lead for  sub-1'
+    assert len(warnings) == 1
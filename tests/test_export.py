@@ -0,0 +1,40 @@
+"""
+Bulk export: the whole-table scan honours the requested time range
+"""
+import json
+
+import pytest
+
+import local_aws
+from export import export_submissions
+
+BASE = 1700000000
+
+
+@pytest.fixture
+def table():
+    table = local_aws.LocalDynamoDB().Table('form_submissions')
+    for offset, client in enumerate(('acme', 'globex', 'acme', 'initech')):
+        table.put_item(Item={'submissionId': f"sub-{offset}", 'timestamp': BASE + offset * 100,
+                             'timestampIso': '', 'client': client, 'formType': 'contacts'})
+    return table
+
+
+def exported(table, **kwargs) -> list:
+    lines = ''.join(export_submissions(table, segments=1, fields=['submissionId'], **kwargs)).splitlines()
+    return sorted(json.loads(line)['submissionId'] for line in lines)
+
+
+@pytest.mark.parametrize('bounds, expected', [
+    ({}, ['sub-0', 'sub-1', 'sub-2', 'sub-3']),
+    ({'start': BASE + 100, 'end': BASE + 200}, ['sub-1', 'sub-2']),
+    ({'start': BASE + 150}, ['sub-2', 'sub-3']),
+    ({'end': BASE + 100}, ['sub-0', 'sub-1']),
+    ({'start': BASE + 301}, [])
+])
+def test_scan_without_client_keeps_to_the_time_range(table, bounds, expected):
+    assert exported(table, **bounds) == expected
+
+
+def test_client_export_keeps_to_the_time_range(table):
+    assert exported(table, client='acme', start=BASE, end=BASE + 100) == ['sub-0']
@@ -0,0 +1,52 @@
+"""
+Named fan-out pools and deadline-bounded run_parallel
+"""
+import threading
+
+import pytest
+
+from fanout import get_executor, run_parallel
+
+
+def test_pools_are_per_name():
+    first = get_executor('test_pool_a', 2)
+
+    assert get_executor('test_pool_a', 2) is first
+    assert get_executor('test_pool_b', 3) is not first
+
+
+def test_size_mismatch_fails_loudly():
+    get_executor('test_pool_size', 2)
+
+    with pytest.raises(ValueError, match="'test_pool_size' already has 2 workers"):
+        get_executor('test_pool_size', 8)
+
+
+def test_task_can_wait_on_another_pool():
+    inner = get_executor('test_pool_inner', 1)
+    outer = get_executor('test_pool_outer', 1)
+
+    # With one shared single-thread pool this would deadlock
+    assert outer.submit(lambda: inner.submit(lambda: 42).result(timeout=5)).result(timeout=5) == 42
+
+
+def test_run_parallel_reports_outcomes_by_deadline():
+    release = threading.Event()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    results = run_parallel({'ok': lambda: None, 'error': fail, 'slow': release.wait}, timeout=0.2,
+                           max_workers=3, pool='test_pool_parallel')
+    release.set()
+
+    assert results['ok']['outcome'] == 'ok'
+    assert results['error'] == {'outcome': 'error', 'durationMs': results['error']['durationMs'], 'error': 'boom'}
+    assert results['slow']['outcome'] == 'timeout'
+
+
+def test_run_parallel_threads_are_named_by_pool():
+    names = []
+    run_parallel({'task': lambda: names.append(threading.current_thread().name)}, timeout=5, max_workers=1,
+                 pool='test_pool_named')
+    assert names[0].startswith('test_pool_named')
@@ -0,0 +1,131 @@
+"""
+Idempotency: Idempotency-Key replays and conflicts, and content-hash dedupe per source IP
+"""
+import json
+
+import pytest
+
+import local_aws
+from conftest import submit_event
+from idempotency import IdempotencyConflict, IdempotencyStore
+
+CONTACT = {
+    'client': 'noclient',
+    'type': 'contacts',
+    'data': {'firstName': 'John', 'lastName': 'Doe', 'email': 'john@example.com',
+             'message': 'Please call me back about my order, it has not arrived yet and I need it soon.'}
+}
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def submit(local_handler, monkeypatch):
+    """(handler, stand-ins, submit(body, source_ip, headers) -> (status, body)) with idempotency on"""
+    handler, stand_ins = local_handler
+    monkeypatch.setattr(handler, 'IDEMPOTENCY_TABLE', 'form_idempotency')
+
+    def post(body: dict, source_ip: str = '203.0.113.10', headers: dict = None):
+        result = handler.lambda_handler(submit_event(body, source_ip, headers), None)
+        return result['statusCode'], json.loads(result['body'])
+    return handler, stand_ins, post
+
+
+def with_message(message: str) -> dict:
+    return {**CONTACT, 'data': {**CONTACT['data'], 'message': message}}
+
+
+@pytest.mark.parametrize('cold', [False, True])
+def test_same_key_replays_the_first_response(submit, cold):
+    handler, stand_ins, post = submit
+    headers = {'idempotency-key': 'order-42'}
+
+    first = post(CONTACT, headers=headers)
+    assert first[0] == 201
+    if cold:
+        # Another container: the repeat is replayed from the table, not the warm cache
+        handler.get_idempotency_store()._cache.clear()
+    assert post(CONTACT, source_ip='203.0.113.99', headers=headers) == first
+    assert len(stand_ins['table'].items) == 1
+
+
+@pytest.mark.parametrize('cold', [False, True])
+def test_same_key_with_a_different_body_is_rejected(submit, cold):
+    handler, stand_ins, post = submit
+    headers = {'idempotency-key': 'order-42'}
+    assert post(CONTACT, headers=headers)[0] == 201
+    if cold:
+        handler.get_idempotency_store()._cache.clear()
+
+    other = with_message('A different message about a different order, which also has not arrived.')
+    assert post(other, headers=headers) == (
+        422, {'error': 'Idempotency-Key was already used with a different payload'}
+    )
+    assert len(stand_ins['table'].items) == 1
+
+
+def test_keys_are_scoped_to_the_client(submit):
+    _, stand_ins, post = submit
+    headers = {'idempotency-key': 'order-42'}
+
+    assert post(CONTACT, headers=headers)[0] == 201
+    assert post({**CONTACT, 'client': 'fixmycar'}, headers=headers)[0] == 201
+    assert len(stand_ins['table'].items) == 2
+
+
+def test_content_hash_dedupes_repeats_from_the_same_source_ip(submit):
+    _, stand_ins, post = submit
+
+    first = post(CONTACT, source_ip='203.0.113.1')
+    assert first[0] == 201
+    assert post(CONTACT, source_ip='203.0.113.1') == first
+    assert len(stand_ins['table'].items) == 1
+
+    # The same content from another source is a separate submission
+    status, body = post(CONTACT, source_ip='203.0.113.2')
+    assert status == 201 and body['submissionId'] != first[1]['submissionId']
+    assert len(stand_ins['table'].items) == 2
+
+
+def test_content_hash_window_expires():
+    clock = FakeClock(1700000000)
+    store = IdempotencyStore(local_aws.LocalDynamoDB().Table('form_idempotency'), content_hash_ttl_seconds=600,
+                             clock=clock)
+    key = store.key_for({}, 'noclient', 'contacts', CONTACT['data'], '203.0.113.1')
+    assert store.begin(key) is None
+    store.complete(key, 201, {'submissionId': 'sub-1'})
+    assert store.begin(key).body == {'submissionId': 'sub-1'}
+
+    clock.now += 601
+    assert store.begin(key) is None
+
+
+def test_in_progress_key_conflicts_until_released_or_its_lock_runs_out():
+    clock = FakeClock(1700000000)
+    store = IdempotencyStore(local_aws.LocalDynamoDB().Table('form_idempotency'), in_progress_seconds=30,
+                             clock=clock)
+    key = store.key_for({'idempotency-key': 'order-42'}, 'noclient', 'contacts', CONTACT['data'], '203.0.113.1')
+    assert store.begin(key) is None
+
+    with pytest.raises(IdempotencyConflict) as raised:
+        store.begin(key)
+    assert raised.value.status == 409
+
+    store.release(key)
+    assert store.begin(key) is None
+    clock.now += 31
+    assert store.begin(key) is None
+
+
+def test_oversized_key_is_rejected():
+    store = IdempotencyStore(local_aws.LocalDynamoDB().Table('form_idempotency'), max_key_length=8)
+
+    with pytest.raises(IdempotencyConflict) as raised:
+        store.key_for({'idempotency-key': 'x' * 9}, 'noclient', 'contacts', {}, '203.0.113.1')
+    assert raised.value.status == 400
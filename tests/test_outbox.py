@@ -0,0 +1,139 @@
+"""
+Outbox: submissions queued on the item, swept from OutboxIndex and drained with retries
+"""
+import time
+
+import pytest
+
+from conftest import submit_event
+from outbox import OUTBOX_PENDING, OutboxWorker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def contact(index: int) -> dict:
+    return {
+        'client': 'noclient',
+        'type': 'contacts',
+        'data': {'firstName': 'John', 'lastName': 'Doe', 'email': f"john{index}@example.com",
+                 'message': f"Please call me back about order number {index}, it has not arrived."}
+    }
+
+
+@pytest.fixture
+def outbox(local_handler):
+    """(handler, stand-ins, worker with a fake clock) with two queued submissions"""
+    handler, stand_ins = local_handler
+    for index in range(2):
+        result = handler.lambda_handler(submit_event(contact(index), source_ip=f"203.0.113.{index + 1}"), None)
+        assert result['statusCode'] == 201
+    worker = handler.get_outbox_worker()
+    worker.clock = FakeClock()
+    return handler, stand_ins, worker
+
+
+def stored(table) -> list:
+    return sorted(table.items.values(), key=lambda item: item['email'])
+
+
+def test_submission_is_queued_not_sent(outbox):
+    _, stand_ins, _ = outbox
+
+    assert stand_ins['ses'].sent == []
+    for item in stored(stand_ins['table']):
+        assert item['outboxState'] == OUTBOX_PENDING
+        assert item['pendingEffects'] == ['notification']
+        assert item['status'] == 'received'
+
+
+def test_sweep_delivers_and_clears_index_keys(outbox):
+    handler, stand_ins, _ = outbox
+
+    summary = handler.process_outbox({}, None)
+
+    assert summary == {'processed': 2, 'retrying': 0, 'failed': 0, 'skipped': 0}
+    assert len(stand_ins['ses'].sent) == 2
+    for item in stored(stand_ins['table']):
+        assert item['status'] == 'processed'
+        assert item['effectAttempts'] == {'notification': 1}
+        assert 'outboxState' not in item and 'nextAttemptAt' not in item and 'pendingEffects' not in item
+    # Drained items leave the sparse index, so the next sweep finds nothing
+    assert handler.process_outbox({}, None)['processed'] == 0
+
+
+def test_failing_ses_backs_off_then_fails(outbox, monkeypatch):
+    handler, stand_ins, worker = outbox
+
+    def unavailable(**kwargs):
+        raise RuntimeError('SES unavailable')
+    monkeypatch.setattr(stand_ins['ses'], 'send_email', unavailable)
+
+    assert handler.process_outbox({}, None)['retrying'] == 2
+    for item in stored(stand_ins['table']):
+        assert item['status'] == 'retrying'
+        assert item['effectAttempts'] == {'notification': 1}
+        assert item['nextAttemptAt'] == int(worker.clock()) + worker.retry_base_seconds
+        assert item['effectErrors'] == {'notification': 'SES unavailable'}
+
+    # Not due until the backoff has passed
+    assert worker.pending() == []
+    for attempt in range(2, worker.max_attempts + 1):
+        worker.clock.now += worker.retry_base_seconds * 2 ** (attempt - 2)
+        summary = handler.process_outbox({}, None)
+        assert summary['retrying' if attempt < worker.max_attempts else 'failed'] == 2
+
+    for item in stored(stand_ins['table']):
+        assert item['status'] == 'failed'
+        assert item['failedEffects'] == ['notification']
+        assert item['effectAttempts'] == {'notification': worker.max_attempts}
+        assert 'outboxState' not in item
+    assert stand_ins['ses'].sent == []
+
+
+def test_retry_succeeds_once_ses_recovers(outbox, monkeypatch):
+    handler, stand_ins, worker = outbox
+    send_email = stand_ins['ses'].send_email
+
+    def unavailable(**kwargs):
+        raise RuntimeError('SES unavailable')
+    monkeypatch.setattr(stand_ins['ses'], 'send_email', unavailable)
+    handler.process_outbox({}, None)
+
+    monkeypatch.setattr(stand_ins['ses'], 'send_email', send_email)
+    worker.clock.now += worker.retry_base_seconds
+    assert handler.process_outbox({}, None)['processed'] == 2
+    for item in stored(stand_ins['table']):
+        assert item['status'] == 'processed'
+        assert item['effectAttempts'] == {'notification': 2}
+
+
+def test_claimed_item_is_leased(outbox):
+    _, stand_ins, worker = outbox
+    items = worker.pending()
+    other = OutboxWorker(stand_ins['table'], worker.effects, clock=worker.clock)
+
+    assert worker.claim(items[0]) is True
+    # The lease pushed nextAttemptAt out, so a concurrent worker neither claims nor sweeps it
+    assert other.claim(items[0]) is False
+    assert [item['submissionId'] for item in other.pending()] == [items[1]['submissionId']]
+
+    # An expired lease (the worker died) makes the item due again
+    worker.clock.now += worker.lease_seconds
+    assert len(other.pending()) == 2
+    assert other.drain(other.pending())['processed'] == 2
+
+
+def test_stale_sweep_items_are_skipped(outbox):
+    _, stand_ins, worker = outbox
+    items = worker.pending()
+
+    assert worker.drain(items)['processed'] == 2
+    # A second worker holding the same (already drained) sweep result skips them
+    assert worker.drain(items) == {'processed': 0, 'retrying': 0, 'failed': 0, 'skipped': 2}
+    assert len(stand_ins['ses'].sent) == 2
@@ -0,0 +1,160 @@
+"""
+RateLimiter: the local token bucket and the shared WindowCounter against the local DynamoDB stand-in
+"""
+import pytest
+
+import local_aws
+from rate_limiter import RateLimiter, WindowCounter
+
+WINDOW = 3600
+START = 1700000000 - 1700000000 % WINDOW
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def table():
+    return local_aws.LocalDynamoDB().Table('rate_limits')
+
+
+def make_limiter(table, **kwargs) -> RateLimiter:
+    options = {'max_requests_per_ip': 10, 'max_requests_per_client': 100, 'window_seconds': WINDOW,
+               'table': table, 'sync_headroom': 0.5, 'sync_interval_seconds': 60, 'clock': FakeClock(START)}
+    options.update(kwargs)
+    return RateLimiter(**options)
+
+
+def test_counter_adds_expires_and_drops_stale_windows(table):
+    counter = WindowCounter(table, WINDOW)
+    window = START // WINDOW
+    table.items[('ip#1.2.3.4',)] = {'limitKey': 'ip#1.2.3.4', f'w{window - 2}': 7, f'w{window - 1}': 4}
+
+    assert counter.add('ip#1.2.3.4', 2, START + WINDOW / 4) == 2 + 4 * 0.75
+    assert counter.add('ip#1.2.3.4', 1, START + WINDOW / 2) == 3 + 4 * 0.5
+
+    item = table.items[('ip#1.2.3.4',)]
+    assert item[f'w{window}'] == 3
+    assert f'w{window - 2}' not in item
+    assert item['expiresAt'] == (window + 2) * WINDOW
+
+
+def shared(limiter: RateLimiter, key: str) -> tuple:
+    """(requests the container has counted, share of the window it holds reserved)"""
+    state = limiter._shared[key]
+    return state.estimate - state.granted, state.granted
+
+
+def test_reserves_a_share_of_the_remaining_budget(table):
+    limiter = make_limiter(table)
+    window = START // WINDOW
+
+    # The first request of a window only counts itself; the second also reserves half of what is left
+    for _ in range(2):
+        assert limiter.check('1.2.3.4', 'acme') == (True, '')
+    assert table.calls['update_item'] == 4
+    assert table.items[('ip#1.2.3.4',)][f'w{window}'] == 6
+    assert shared(limiter, 'ip#1.2.3.4') == (2, 4)
+
+    # The reservation admits the next four without a write
+    for _ in range(4):
+        assert limiter.check('1.2.3.4', 'acme')[0] is True
+    assert table.calls['update_item'] == 4
+    assert shared(limiter, 'ip#1.2.3.4') == (6, 0)
+
+    # Closer to the limit the reservations shrink, so writes get more frequent
+    for _ in range(4):
+        assert limiter.check('1.2.3.4', 'acme')[0] is True
+    assert table.calls['update_item'] == 7
+    assert table.items[('ip#1.2.3.4',)][f'w{window}'] == 10
+    assert limiter.check('1.2.3.4', 'acme')[0] is False
+
+
+def test_interval_sync_hands_back_the_unused_reservation(table):
+    limiter = make_limiter(table)
+    window = START // WINDOW
+    for _ in range(3):
+        limiter.check('1.2.3.4', 'acme')
+    assert shared(limiter, 'ip#1.2.3.4') == (3, 3)
+
+    limiter.clock.now += 60
+    limiter.check('1.2.3.4', 'acme')
+    assert shared(limiter, 'ip#1.2.3.4') == (4, 3)
+    assert table.items[('ip#1.2.3.4',)][f'w{window}'] == 7
+
+    limiter.clock.now = START + WINDOW
+    calls = table.calls['update_item']
+    limiter.check('1.2.3.4', 'acme')
+    assert table.calls['update_item'] == calls + 2
+    assert table.items[('ip#1.2.3.4',)][f'w{window + 1}'] == 1
+
+
+def test_shared_limit_holds_across_containers(table):
+    containers = [make_limiter(table) for _ in range(5)]
+
+    admitted = sum(container.check('1.2.3.4', 'acme')[0] for _ in range(10) for container in containers)
+    assert admitted == 10
+    # Every admitted request was counted in DynamoDB before it was admitted
+    assert all(container.check('1.2.3.4', 'acme')[0] is False for container in containers)
+
+
+def test_failed_write_keeps_the_reservation(table):
+    limiter = make_limiter(table)
+    for _ in range(3):
+        limiter.check('1.2.3.4', 'acme')
+    limiter.clock.now += 60
+    update_item = table.update_item
+
+    def unavailable(**kwargs):
+        raise RuntimeError('DynamoDB unavailable')
+    table.update_item = unavailable
+    with pytest.raises(RuntimeError):
+        limiter.check('1.2.3.4', 'acme')
+    assert shared(limiter, 'ip#1.2.3.4') == (3, 3)
+
+    table.update_item = update_item
+    assert limiter.check('1.2.3.4', 'acme')[0] is True
+    assert table.items[('ip#1.2.3.4',)][f'w{START // WINDOW}'] == 7
+
+
+def test_client_rejection_does_not_use_ip_quota(table):
+    limiter = make_limiter(table, max_requests_per_client=2)
+    assert limiter.check('1.2.3.4', 'acme')[0] is True
+    assert limiter.check('1.2.3.4', 'acme')[0] is True
+
+    for _ in range(3):
+        assert limiter.check('1.2.3.4', 'acme') == (False, 'Rate limit exceeded. Please try again later.')
+
+    # The IP has used two requests of its quota, not five, including once its reservation is synced
+    assert shared(limiter, 'ip#1.2.3.4') == (2, 4)
+    limiter.clock.now += 60
+    assert limiter.check('1.2.3.4', 'other')[0] is True
+    used, granted = shared(limiter, 'ip#1.2.3.4')
+    assert used == 3
+    assert table.items[('ip#1.2.3.4',)][f'w{START // WINDOW}'] == used + granted
+
+
+def test_local_bucket_rejects_bursts_without_io(table):
+    limiter = make_limiter(table, max_requests_per_ip=3, sync_headroom=1.0)
+
+    for _ in range(3):
+        assert limiter.check('1.2.3.4', 'acme')[0] is True
+    calls = table.calls['update_item']
+    assert limiter.check('1.2.3.4', 'acme')[0] is False
+    assert table.calls['update_item'] == calls
+
+
+def test_local_bucket_refills_over_the_window():
+    limiter = make_limiter(None, max_requests_per_ip=3)
+    for _ in range(3):
+        assert limiter.check('1.2.3.4', 'acme')[0] is True
+    assert limiter.check('1.2.3.4', 'acme')[0] is False
+
+    limiter.clock.now += WINDOW / 3
+    assert limiter.check('1.2.3.4', 'acme')[0] is True
+    assert limiter.check('1.2.3.4', 'acme')[0] is False
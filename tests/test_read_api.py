@@ -0,0 +1,108 @@
+"""
+Read API: paging GET /forms/submissions with cursors, rejecting cursors that don't belong to the query,
+and keeping form type and email queries to the caller's client
+"""
+import json
+
+import pytest
+
+from conftest import submit_event
+from read_api import _fingerprint, encode_cursor, hash_api_key
+
+API_KEY = 'read-key'
+
+
+@pytest.fixture
+def read_api(local_handler, monkeypatch):
+    """(handler, list(params) -> (status, body)) with three stored noclient contacts, and fixmycar's after them"""
+    handler, _ = local_handler
+    for client in ('noclient', 'fixmycar'):
+        for index in range(3):
+            body = {'client': client, 'type': 'contacts',
+                    'data': {'firstName': 'John', 'lastName': 'Doe', 'email': f"john{index}@example.com",
+                             'message': f"Please call me back about order number {index}, it has not arrived."}}
+            event = submit_event(body, source_ip=f"203.0.113.{index + 1}")
+            assert handler.lambda_handler(event, None)['statusCode'] == 201
+    monkeypatch.setattr(handler, 'load_remote_config',
+                        lambda: {'noclient': {'readApiKeySha256': hash_api_key(API_KEY)}})
+
+    def list_page(params: dict):
+        event = {
+            'requestContext': {'http': {'method': 'GET', 'path': '/forms/submissions', 'sourceIp': '203.0.113.9'}},
+            'headers': {'authorization': f"Bearer {API_KEY}"},
+            'queryStringParameters': {'client': 'noclient', **params}
+        }
+        result = handler.lambda_handler(event, None)
+        return result['statusCode'], json.loads(result['body'])
+    return handler, list_page
+
+
+def test_pages_follow_the_cursor(read_api):
+    _, list_page = read_api
+
+    status, first = list_page({'limit': '2', 'fields': 'submissionId'})
+    assert status == 200 and first['count'] == 2 and first['cursor']
+    status, second = list_page({'limit': '2', 'fields': 'submissionId', 'cursor': first['cursor']})
+    assert status == 200 and second['count'] == 1
+    ids = [item['submissionId'] for item in first['items'] + second['items']]
+    assert len(set(ids)) == 3
+
+
+@pytest.mark.parametrize('selector', [{}, {'formType': 'contacts'}])
+def test_pages_hold_only_the_clients_submissions(read_api, selector):
+    _, list_page = read_api
+
+    status, first = list_page({'limit': '2', 'fields': 'submissionId,client', **selector})
+    assert status == 200 and first['count'] == 2
+    status, second = list_page({'limit': '2', 'fields': 'submissionId,client', 'cursor': first['cursor'], **selector})
+    assert status == 200 and second['count'] == 1
+    assert {item['client'] for item in first['items'] + second['items']} == {'noclient'}
+
+
+def test_email_query_is_scoped_to_the_client(read_api):
+    _, list_page = read_api
+
+    status, body = list_page({'email': 'john1@example.com', 'fields': 'client,email'})
+    assert status == 200 and body['items'] == [{'client': 'noclient', 'email': 'john1@example.com'}]
+    assert body['cursor'] is None
+
+
+def test_cursor_for_another_clients_partition_is_rejected(read_api):
+    _, list_page = read_api
+    fingerprint = _fingerprint('FormTypeIndex', 'noclient#contacts', 'noclient', 0, 9999999999, False)
+    key = {'submissionId': 'abc', 'timestamp': 1700000000, 'clientFormType': 'fixmycar#contacts'}
+
+    assert list_page({'formType': 'contacts', 'cursor': encode_cursor(key, fingerprint)}) == (
+        400, {'error': 'Invalid cursor'}
+    )
+
+
+def test_cursor_from_another_query_is_rejected(read_api):
+    _, list_page = read_api
+    _, first = list_page({'limit': '1'})
+
+    assert list_page({'limit': '1', 'order': 'asc', 'cursor': first['cursor']}) == (400, {'error': 'Invalid cursor'})
+
+
+@pytest.mark.parametrize('key', [
+    {'submissionId': 'abc', 'timestamp': 1700000000, 'client': 'other'},
+    {'submissionId': 'abc', 'timestamp': 1700000000},
+    {'submissionId': 'abc', 'timestamp': 1700000000, 'client': 'noclient', 'formType': 'contacts'},
+    {'submissionId': 'abc', 'timestamp': '1700000000', 'client': 'noclient'},
+    {'submissionId': '', 'timestamp': 1700000000, 'client': 'noclient'},
+    {'submissionId': 'abc', 'timestamp': 99999999999, 'client': 'noclient'},
+    ['abc', 1700000000]
+])
+def test_forged_cursor_keys_are_rejected(read_api, key):
+    _, list_page = read_api
+    # Forged with the right query fingerprint; only the key itself is wrong
+    fingerprint = _fingerprint('ClientIndex', 'noclient', 'noclient', 0, 9999999999, False)
+
+    assert list_page({'cursor': encode_cursor(key, fingerprint)}) == (400, {'error': 'Invalid cursor'})
+
+
+@pytest.mark.parametrize('cursor', ['not-base64!', 'e30', 'W10', 'ééé'])
+def test_malformed_cursor_is_rejected(read_api, cursor):
+    _, list_page = read_api
+
+    assert list_page({'cursor': cursor}) == (400, {'error': 'Invalid cursor'})
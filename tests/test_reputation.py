@@ -0,0 +1,153 @@
+"""
+IpReputation: scoring, blocking and merging the shared blocklist
+"""
+import pytest
+
+import local_aws
+from reputation import IpReputation
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingPuts:
+    """Blocklist table whose writes fail (scans still work)"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def put_item(self, **kwargs):
+        raise RuntimeError('throttled')
+
+    def scan(self, **kwargs):
+        return self.table.scan(**kwargs)
+
+
+@pytest.fixture
+def table():
+    return local_aws.LocalDynamoDB().Table('form_blocklist')
+
+
+def tracker(table, clock, **kwargs) -> IpReputation:
+    options = {'weights': {'honeypot': 10}, 'ip_threshold': 20, 'network_threshold': 1000, 'block_seconds': 600,
+               'sync_interval_seconds': 60, 'clock': clock}
+    options.update(kwargs)
+    return IpReputation(table, **options)
+
+
+def test_threshold_blocks_ip_and_shares_it(table):
+    clock = FakeClock()
+    reputation = tracker(table, clock)
+
+    assert reputation.record('203.0.113.7', 'honeypot') is None
+    assert reputation.record('203.0.113.7', 'honeypot') == 'ip#203.0.113.7'
+    assert reputation.blocked('203.0.113.7') == 'ip#203.0.113.7'
+    assert reputation.blocked('203.0.113.8') is None
+    assert table.items[('ip#203.0.113.7',)]['expiresAt'] == int(clock.now) + 600
+
+
+def test_other_containers_pick_up_blocks_on_sync(table):
+    clock = FakeClock()
+    first, second = tracker(table, clock), tracker(table, clock)
+    assert second.blocked('203.0.113.7') is None
+
+    first.record('203.0.113.7', 'honeypot')
+    first.record('203.0.113.7', 'honeypot')
+    assert second.sync() is True
+    assert second.blocked('203.0.113.7') == 'ip#203.0.113.7'
+
+
+def test_unshared_block_survives_sync(table):
+    clock = FakeClock()
+    reputation = tracker(FailingPuts(table), clock)
+
+    reputation.record('203.0.113.7', 'honeypot')
+    with pytest.raises(RuntimeError):
+        reputation.record('203.0.113.7', 'honeypot')
+    assert reputation.sync() is True
+    assert reputation.blocked('203.0.113.7') == 'ip#203.0.113.7'
+
+    # It still expires on schedule
+    clock.now += 600
+    reputation.sync()
+    assert reputation.blocked('203.0.113.7') is None
+
+
+def test_sync_keeps_later_expiry(table):
+    clock = FakeClock()
+    reputation = tracker(table, clock, sync_interval_seconds=3600)
+    table.put_item(Item={'blockKey': 'ip#203.0.113.7', 'expiresAt': int(clock.now) + 3600})
+    reputation.record('203.0.113.9', 'honeypot')
+    reputation.record('203.0.113.9', 'honeypot')
+    # An older, shorter block for the same key must not cut the newer local one short
+    table.items[('ip#203.0.113.9',)]['expiresAt'] = int(clock.now) + 100
+    reputation.sync()
+
+    clock.now += 500
+    assert reputation.blocked('203.0.113.7') == 'ip#203.0.113.7'
+    assert reputation.blocked('203.0.113.9') == 'ip#203.0.113.9'
+    clock.now += 100
+    assert reputation.blocked('203.0.113.9') is None
+
+
+def test_deleting_a_seen_block_lifts_it(table):
+    clock = FakeClock()
+    reputation = tracker(table, clock)
+    reputation.record('203.0.113.7', 'honeypot')
+    reputation.record('203.0.113.7', 'honeypot')
+    reputation.sync()
+
+    del table.items[('ip#203.0.113.7',)]
+    reputation.sync()
+    assert reputation.blocked('203.0.113.7') is None
+
+
+def test_network_blocks_from_table(table):
+    clock = FakeClock()
+    reputation = tracker(table, clock)
+    table.put_item(Item={'blockKey': 'net#198.51.100.0/24', 'expiresAt': int(clock.now) + 600})
+
+    assert reputation.blocked('198.51.100.42') == 'net#198.51.100.0/24'
+    assert reputation.blocked('198.51.101.42') is None
+
+
+def test_first_load_is_synchronous_then_refreshes_in_background(table, monkeypatch):
+    clock = FakeClock()
+    reputation = tracker(table, clock)
+    table.put_item(Item={'blockKey': 'ip#203.0.113.7', 'expiresAt': int(clock.now) + 600})
+
+    assert reputation.blocked('203.0.113.7') == 'ip#203.0.113.7'
+    assert table.calls['scan'] == 1
+
+    started = []
+    monkeypatch.setattr('reputation.threading.Thread',
+                        lambda target, **kwargs: type('T', (), {'start': lambda self: started.append(target)})())
+    clock.now += 60
+    assert reputation.blocked('203.0.113.8') is None
+    assert table.calls['scan'] == 1 and len(started) == 1
+    # Only one refresh is in flight at a time
+    assert reputation.blocked('203.0.113.8') is None
+    clock.now += 60
+    assert reputation.blocked('203.0.113.8') is None
+    assert len(started) == 1
+
+    started[0]()
+    assert table.calls['scan'] == 2
+
+
+def test_failed_sync_keeps_blocks(table, monkeypatch):
+    clock = FakeClock()
+    reputation = tracker(table, clock)
+    table.put_item(Item={'blockKey': 'ip#203.0.113.7', 'expiresAt': int(clock.now) + 600})
+    reputation.sync()
+
+    def unavailable(**kwargs):
+        raise RuntimeError('unavailable')
+    monkeypatch.setattr(table, 'scan', unavailable)
+    assert reputation.sync() is False
+    assert reputation.blocked('203.0.113.7') == 'ip#203.0.113.7'
@@ -0,0 +1,145 @@
+"""
+Stats: hourly and daily rollups recorded by the outbox, and GET /forms/stats
+"""
+import json
+
+import pytest
+
+import local_aws
+from conftest import submit_event
+from read_api import hash_api_key
+from stats import StatsStore, parse_stats_query
+
+API_KEY = 'read-key'
+HOUR = 1700000000 - 1700000000 % 3600
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def submission(client: str, form_type: str, index: int) -> dict:
+    data = {'email': f"john{index}@example.com"}
+    if form_type == 'feedback':
+        data['comments'] = f"The delivery of order {index} was quick and the packaging was fine."
+    else:
+        data.update(firstName='John', lastName='Doe',
+                    message=f"Please call me back about order number {index}, it has not arrived.")
+    return {'client': client, 'type': form_type, 'data': data}
+
+
+@pytest.fixture
+def stats_api(local_handler, monkeypatch):
+    """(handler, stand-ins, get(params) -> (status, body)) after three noclient and one fixmycar submission"""
+    handler, _ = local_handler
+    clients = {name: dict(record) for name, record in local_aws.DEFAULT_CLIENTS.items()}
+    clients['noclient']['readApiKeySha256'] = hash_api_key(API_KEY)
+    stand_ins = local_aws.install(handler, clients)
+    monkeypatch.setattr(handler, 'STATS_TABLE', 'form_stats')
+
+    sent = [('noclient', 'contacts'), ('noclient', 'contacts'), ('noclient', 'feedback'), ('fixmycar', 'contacts')]
+    for index, (client, form_type) in enumerate(sent):
+        event = submit_event(submission(client, form_type, index), source_ip=f"203.0.113.{index + 1}")
+        assert handler.lambda_handler(event, None)['statusCode'] == 201
+    assert handler.process_outbox({}, None)['processed'] == len(sent)
+
+    def get(params: dict, api_key: str = API_KEY):
+        event = {
+            'requestContext': {'http': {'method': 'GET', 'path': '/forms/stats', 'sourceIp': '203.0.113.9'}},
+            'headers': {'authorization': f"Bearer {api_key}"},
+            'queryStringParameters': params
+        }
+        result = handler.lambda_handler(event, None)
+        return result['statusCode'], json.loads(result['body'])
+    return handler, stand_ins, get
+
+
+@pytest.mark.parametrize('granularity', ['hour', 'day'])
+def test_counts_by_bucket_and_form_type(stats_api, granularity):
+    _, _, get = stats_api
+
+    status, body = get({'client': 'noclient', 'granularity': granularity})
+    assert status == 200 and body['granularity'] == granularity
+    assert body['total'] == 3
+    bucket, = body['buckets']
+    assert bucket['formTypes'] == {'contacts': 2, 'feedback': 1}
+    assert body['from'] <= bucket['start'] < body['to']
+
+
+def test_form_type_filter(stats_api):
+    _, _, get = stats_api
+
+    status, body = get({'client': 'noclient', 'granularity': 'hour', 'formType': 'feedback'})
+    assert status == 200 and body['total'] == 1
+    assert body['buckets'][0]['formTypes'] == {'feedback': 1}
+
+    status, body = get({'client': 'noclient', 'granularity': 'hour', 'formType': 'survey'})
+    assert status == 200 and (body['total'], body['buckets']) == (0, [])
+
+
+def test_range_outside_the_submissions_is_empty(stats_api):
+    _, _, get = stats_api
+
+    status, body = get({'client': 'noclient', 'granularity': 'day', 'from': '1600000000', 'to': '1600086400'})
+    assert status == 200 and (body['total'], body['buckets']) == (0, [])
+
+
+@pytest.mark.parametrize('params, api_key, expected', [
+    ({'client': 'noclient'}, '', (401, {'error': 'Missing API key'})),
+    ({'client': 'noclient'}, 'wrong', (403, {'error': 'Invalid API key for client'})),
+    ({'client': 'fixmycar'}, API_KEY, (403, {'error': 'Invalid API key for client'})),
+    ({'client': 'noclient', 'granularity': 'minute'}, API_KEY,
+     (400, {'error': 'granularity must be one of: hour, day'})),
+    ({'client': 'noclient', 'from': '1700086400', 'to': '1700000000'}, API_KEY,
+     (400, {'error': 'from must not be after to'})),
+    ({'client': 'noclient', 'granularity': 'hour', 'from': '1600000000', 'to': '1700000000'}, API_KEY,
+     (400, {'error': 'Range spans more than 744 hour buckets'}))
+])
+def test_rejected_requests(stats_api, params, api_key, expected):
+    _, _, get = stats_api
+
+    assert get(params, api_key) == expected
+
+
+def test_disabled_without_a_stats_table(local_handler):
+    handler, _ = local_handler
+    event = {'requestContext': {'http': {'method': 'GET', 'path': '/forms/stats', 'sourceIp': '203.0.113.9'}},
+             'headers': {}, 'queryStringParameters': {'client': 'noclient'}}
+
+    assert handler.lambda_handler(event, None)['statusCode'] == 404
+
+
+@pytest.fixture
+def store():
+    return StatsStore(local_aws.LocalDynamoDB().Table('form_stats'), retention_days={'hour': 35, 'day': 400},
+                      cache_ttl_seconds=30, clock=FakeClock(HOUR))
+
+
+def test_record_adds_to_hour_and_day_buckets(store):
+    for offset in (0, 60, 3600):
+        store.record({'client': 'acme', 'formType': 'contacts', 'timestamp': HOUR + offset})
+
+    hour = store.table.items[('acme#hour', HOUR)]
+    assert (hour['total'], hour['type:contacts']) == (2, 2)
+    assert hour['expiresAt'] == HOUR + 3600 + 35 * 86400
+    day = store.table.items[('acme#day', HOUR - HOUR % 86400)]
+    assert day['total'] == 3
+
+    query = parse_stats_query({'client': 'acme', 'granularity': 'hour', 'to': str(HOUR + 3600)},
+                              {'max_buckets': 744}, HOUR)
+    assert [bucket['total'] for bucket in store.read(query)['buckets']] == [2, 1]
+
+
+def test_reads_are_cached_for_the_ttl(store):
+    query = parse_stats_query({'client': 'acme', 'granularity': 'day'}, {'max_buckets': 744}, HOUR)
+    store.record({'client': 'acme', 'formType': 'contacts', 'timestamp': HOUR})
+    assert store.read(query)['total'] == 1
+
+    store.record({'client': 'acme', 'formType': 'contacts', 'timestamp': HOUR})
+    assert store.read(query)['total'] == 1
+    store.clock.now += 31
+    assert store.read(query)['total'] == 2
@@ -0,0 +1,85 @@
+"""
+Storage encoding: encode_item / decode_item round trips, including compressed formData and timestampIso
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import submit_event
+from storage import COMPRESSED_FIELD, MICROSECONDS_FIELD, StorageEncoder, decode_item, stored_attributes
+
+TIMESTAMP = 1700000000
+
+
+def submission(timestamp_iso: str, form_data: dict) -> dict:
+    return {'submissionId': 'sub-1', 'timestamp': TIMESTAMP, 'timestampIso': timestamp_iso, 'client': 'acme',
+            'formType': 'contacts', 'email': 'john@example.com', 'formData': form_data, 'status': 'received'}
+
+
+SMALL = {'firstName': 'John', 'message': 'Short'}
+LARGE = {'firstName': 'John', 'message': 'Please call me back about my order. ' * 100}
+
+
+@pytest.mark.parametrize('form_data, compressed', [(SMALL, False), (LARGE, True)])
+@pytest.mark.parametrize('timestamp_iso, microseconds', [
+    ('2023-11-14T22:13:20.123456', 123456),
+    ('2023-11-14T22:13:20.000001', 1),
+    ('2023-11-14T22:13:20', None)
+])
+def test_round_trip_restores_the_item(form_data, compressed, timestamp_iso, microseconds):
+    item = submission(timestamp_iso, form_data)
+
+    stored = StorageEncoder(compress_threshold_bytes=1024).encode(item)
+    assert (COMPRESSED_FIELD in stored) is compressed and ('formData' in stored) is not compressed
+    assert 'timestampIso' not in stored
+    assert stored.get(MICROSECONDS_FIELD) == microseconds
+    assert (stored['clientFormType'], stored['clientEmail']) == ('acme#contacts', 'acme#john@example.com')
+    assert decode_item(stored) == item
+
+
+@pytest.mark.parametrize('timestamp_iso', [
+    '2023-11-14T22:13:20.5+00:00',
+    '2023-11-14T22:13:21.000000',
+    '2023-11-14 22:13:20',
+    'yesterday'
+])
+def test_timestamp_iso_that_cannot_be_rebuilt_is_kept(timestamp_iso):
+    item = submission(timestamp_iso, LARGE)
+
+    stored = StorageEncoder().encode(item)
+    assert stored['timestampIso'] == timestamp_iso and MICROSECONDS_FIELD not in stored
+    assert decode_item(stored) == item
+
+
+def test_items_from_earlier_layouts_decode():
+    legacy = submission('2023-11-14T22:13:20.123456', SMALL)
+    assert decode_item(legacy) is legacy
+
+    first_version = {key: value for key, value in legacy.items() if key != 'timestampIso'}
+    assert decode_item({**first_version, 'enc': 1})['timestampIso'] == '2023-11-14T22:13:20'
+
+
+def test_items_without_an_email_stay_out_of_the_email_index():
+    stored = StorageEncoder().encode({**submission('2023-11-14T22:13:20', SMALL), 'email': ''})
+    assert 'clientEmail' not in stored and stored['clientFormType'] == 'acme#contacts'
+
+
+def test_projection_reads_what_timestamp_iso_is_rebuilt_from():
+    assert stored_attributes(['submissionId', 'timestampIso']) == [
+        'submissionId', 'timestamp', MICROSECONDS_FIELD, 'timestampIso'
+    ]
+
+
+def test_submission_time_is_stored_to_the_microsecond(local_handler):
+    handler, stand_ins = local_handler
+    body = {'client': 'noclient', 'type': 'contacts',
+            'data': {'firstName': 'John', 'lastName': 'Doe', 'email': 'john@example.com',
+                     'message': 'Please call me back about my order, it has not arrived yet.'}}
+    assert handler.lambda_handler(submit_event(body), None)['statusCode'] == 201
+
+    stored, = stand_ins['table'].items.values()
+    item = decode_item(stored)
+    submitted = datetime.fromisoformat(item['timestampIso']).replace(tzinfo=timezone.utc)
+    assert int(submitted.timestamp()) == item['timestamp']
+    assert stored.get(MICROSECONDS_FIELD, 0) == submitted.microsecond
+    assert 'timestampIso' not in stored
@@ -0,0 +1,177 @@
+"""
+WebhookClient against a local http.server: retries, signatures, keep-alive and the circuit breaker
+"""
+import hashlib
+import hmac
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from webhooks import (
+    SIGNATURE_HEADER, TIMESTAMP_HEADER, CircuitOpenError, WebhookClient, WebhookError, sign_payload
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            server.received.append((dict(self.headers), body))
+            status = server.statuses.pop(0) if server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        # Close without announcing it, as a server timing out an idle keep-alive connection does
+        self.close_connection = server.drop_connections
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.received = []
+    httpd.statuses = []
+    httpd.drop_connections = False
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/hook?source=forms"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(**kwargs) -> WebhookClient:
+    options = {'timeout_seconds': 2, 'max_attempts': 3, 'use_requests': False, 'sleep': lambda seconds: None}
+    options.update(kwargs)
+    return WebhookClient(**options)
+
+
+def test_retries_server_errors_then_succeeds(server):
+    server.statuses = [500, 503, 200]
+    client = make_client()
+
+    assert client.deliver('acme', server.url, {'submissionId': 'abc'}) == 200
+    assert len(server.received) == 3
+    assert client.circuit_state('acme') == 'closed'
+
+
+def test_final_client_error_is_not_retried(server):
+    server.statuses = [400]
+    client = make_client()
+
+    with pytest.raises(WebhookError, match='HTTP 400'):
+        client.deliver('acme', server.url, {'submissionId': 'abc'})
+    assert len(server.received) == 1
+
+
+def test_gives_up_after_max_attempts(server):
+    server.statuses = [500, 500, 500, 200]
+    client = make_client()
+
+    with pytest.raises(WebhookError, match='after 3 attempts'):
+        client.deliver('acme', server.url, {'submissionId': 'abc'})
+    assert len(server.received) == 3
+
+
+def test_signature_header_matches_body(server):
+    client = make_client()
+
+    client.deliver('acme', server.url, {'submissionId': 'abc', 'name': 'Jürgen'}, secret='s3cret')
+    headers, body = server.received[0]
+    timestamp = headers[TIMESTAMP_HEADER]
+    expected = hmac.new(b's3cret', timestamp.encode('ascii') + b'.' + body, hashlib.sha256).hexdigest()
+    assert headers[SIGNATURE_HEADER] == f"sha256={expected}"
+    assert sign_payload(body, 's3cret', int(timestamp))[SIGNATURE_HEADER] == headers[SIGNATURE_HEADER]
+
+
+def test_unsigned_without_secret(server):
+    make_client().deliver('acme', server.url, {'submissionId': 'abc'})
+    headers, _ = server.received[0]
+    assert SIGNATURE_HEADER not in headers and TIMESTAMP_HEADER not in headers
+
+
+def test_reuses_keep_alive_connection(server):
+    client = make_client()
+
+    for _ in range(3):
+        client.deliver('acme', server.url, {'submissionId': 'abc'})
+    pool = next(iter(client.transport._pools.values()))
+    assert len(pool) == 1
+
+
+def test_retries_once_when_idle_connection_was_dropped(server):
+    server.drop_connections = True
+    client = make_client(max_attempts=1)
+
+    assert client.deliver('acme', server.url, {'submissionId': 'first'}) == 200
+    # The pooled connection is now closed server-side; the second delivery must reconnect, not fail
+    assert client.deliver('acme', server.url, {'submissionId': 'second'}) == 200
+    assert [body for _, body in server.received][-1] == b'{"submissionId":"second"}'
+
+
+def test_circuit_opens_and_recovers(server):
+    clock = FakeClock()
+    client = make_client(max_attempts=1, failure_threshold=2, reset_timeout_seconds=30, clock=clock)
+    server.statuses = [500, 500]
+
+    for _ in range(2):
+        with pytest.raises(WebhookError):
+            client.deliver('acme', server.url, {'submissionId': 'abc'})
+    assert client.circuit_state('acme') == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        client.deliver('acme', server.url, {'submissionId': 'abc'})
+    assert len(server.received) == 2
+    # Other clients have their own breaker
+    assert client.deliver('other', server.url, {'submissionId': 'abc'}) == 200
+
+    clock.now += 30
+    assert client.deliver('acme', server.url, {'submissionId': 'abc'}) == 200
+    assert client.circuit_state('acme') == 'closed'
+
+
+def test_failed_trial_reopens_circuit(server):
+    clock = FakeClock()
+    client = make_client(max_attempts=1, failure_threshold=1, reset_timeout_seconds=30, clock=clock)
+    server.statuses = [500, 502]
+
+    with pytest.raises(WebhookError):
+        client.deliver('acme', server.url, {'submissionId': 'abc'})
+    clock.now += 30
+    with pytest.raises(WebhookError):
+        client.deliver('acme', server.url, {'submissionId': 'abc'})
+    assert client.circuit_state('acme') == 'open'
+
+    # The trial failure restarted the reset timeout
+    clock.now += 10
+    with pytest.raises(CircuitOpenError):
+        client.deliver('acme', server.url, {'submissionId': 'abc'})
+    assert len(server.received) == 2
+
+
+def test_half_open_lets_one_trial_through():
+    clock = FakeClock()
+    client = make_client(failure_threshold=1, reset_timeout_seconds=30, clock=clock)
+    breaker = client._breaker('acme')
+    breaker.record_failure(clock())
+
+    clock.now += 30
+    assert breaker.allow(clock()) is True
+    assert client.circuit_state('acme') == 'half_open'
+    assert breaker.allow(clock()) is False